@@ -5,4 +5,68 @@ load_dotenv()  # carga variables del archivo .env
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 NASA_USERNAME = os.getenv("NASA_USERNAME")
-NASA_PASSWORD = os.getenv("NASA_PASSWORD")
\ No newline at end of file
+NASA_PASSWORD = os.getenv("NASA_PASSWORD")
+# Pool de procesos para descargas de NASA (se crea al arrancar la app)
+NASA_POOL_SIZE = int(os.getenv("NASA_POOL_SIZE", "2"))
+NASA_POOL_MAX_TASKS = int(os.getenv("NASA_POOL_MAX_TASKS", "50"))  # Reciclar cada proceso tras N tareas
+
+# Caché local de granulos de NASA (0 desactiva la caché)
+GRANULE_CACHE_DIR = os.getenv("GRANULE_CACHE_DIR", os.path.join(".cache", "granules"))
+GRANULE_CACHE_MAX_BYTES = int(os.getenv("GRANULE_CACHE_MAX_BYTES", str(2 * 1024**3)))
+
+# Caché en memoria de series por celda de la malla GLDAS
+POINT_CACHE_TTL = int(os.getenv("POINT_CACHE_TTL", str(6 * 3600)))  # segundos
+POINT_CACHE_MAX_BYTES = int(os.getenv("POINT_CACHE_MAX_BYTES", str(64 * 1024**2)))
+
+# Índice de chunks (byte ranges) para leer solo la celda pedida de cada granulo
+CHUNK_INDEX_ENABLED = os.getenv("CHUNK_INDEX_ENABLED", "1") == "1"
+CHUNK_INDEX_DIR = os.getenv("CHUNK_INDEX_DIR", os.path.join(".cache", "chunk_index"))
+
+# Búsquedas de granulos en CMR
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "3600"))  # segundos
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(4 * 1024**2)))
+GRANULE_RESOLVE_MIN_AGE_DAYS = int(os.getenv("GRANULE_RESOLVE_MIN_AGE_DAYS", "60"))  # Datos más recientes se buscan en CMR
+
+# Proveedor de series en vivo: "granules" (GLDAS vía earthaccess) o "giovanni"
+# (API de series de tiempo de Giovanni, sin descargar granulos)
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "granules")
+GIOVANNI_MAX_CONNECTIONS = int(os.getenv("GIOVANNI_MAX_CONNECTIONS", "8"))  # Conexiones keep-alive y variables en paralelo
+GIOVANNI_TIMEOUT = float(os.getenv("GIOVANNI_TIMEOUT", "60"))  # segundos por petición
+GIOVANNI_TOKEN_TTL = int(os.getenv("GIOVANNI_TOKEN_TTL", "3600"))  # segundos antes de renovar el token
+
+# Climatología precalculada (ver src/climatology.py para construirla)
+CLIMATOLOGY_STORE_DIR = os.getenv("CLIMATOLOGY_STORE_DIR", os.path.join("data", "climatology"))
+
+# Concurrencia máxima desde el event loop de la API
+NASA_MAX_CONCURRENT_FETCHES = int(os.getenv("NASA_MAX_CONCURRENT_FETCHES", "4"))
+OPENAI_MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", "8"))
+
+# Teselas de campos 2-D para /predict/area
+AREA_CACHE_TTL = int(os.getenv("AREA_CACHE_TTL", str(24 * 3600)))  # segundos
+AREA_CACHE_MAX_BYTES = int(os.getenv("AREA_CACHE_MAX_BYTES", str(32 * 1024**2)))
+
+# Datos de /predict/weather reutilizables por /chat/weather/ (data_handle)
+DATA_HANDLE_TTL = int(os.getenv("DATA_HANDLE_TTL", "3600"))  # segundos
+DATA_HANDLE_MAX_BYTES = int(os.getenv("DATA_HANDLE_MAX_BYTES", str(32 * 1024**2)))
+
+# Sesiones de /chat/simple: contexto e historial en el servidor con prompt acotado
+CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", str(2 * 3600)))  # segundos sin actividad
+CHAT_SESSION_MAX_BYTES = int(os.getenv("CHAT_SESSION_MAX_BYTES", str(16 * 1024**2)))
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "1500"))  # Tokens máximos por prompt
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "800"))  # Historial guardado antes de resumir
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "200"))  # Tamaño máximo del resumen
+
+# Caché de respuestas de ChatGPT en SQLite (0 desactiva la caché)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))  # segundos
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024**2)))
+
+# Presupuesto de tokens para los datos meteorológicos dentro de los prompts
+PROMPT_DATA_TOKEN_BUDGET = int(os.getenv("PROMPT_DATA_TOKEN_BUDGET", "600"))
+
+# Enrutado de modelos de ChatGPT: plazos, hedging y circuit breaker
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "20"))  # segundos por intento
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))  # segundos por llamada (todos los intentos)
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "8"))  # 0 desactiva el hedging
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))  # segundos
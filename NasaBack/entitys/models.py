@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Literal
 import re
-from typing import Dict
+from typing import Dict, List, Optional
 
 """
 Timestamp / fecha:hora
@@ -40,8 +40,33 @@ class ChatRequest(BaseModel):
     prompt: str
     time: Time
     location: Location
+    data_handle: Optional[str] = None  # Devuelto por /predict/weather: evita volver a descargar los datos
 
 class WeatherPredictionRequest(BaseModel):
     time: Time
     location: Location
     plan: str = ""  # Plan del usuario para generar recomendaciones personalizadas
+
+class BatchPredictionRequest(BaseModel):
+    items: List[WeatherPredictionRequest] = Field(..., min_length=1, max_length=100)
+    recommendations: bool = False  # Una llamada a ChatGPT por item si es True
+
+class AreaRequest(BaseModel):
+    lat_min: float = Field(..., ge=-90, le=90)
+    lat_max: float = Field(..., ge=-90, le=90)
+    lon_min: float = Field(..., ge=-180, le=180)
+    lon_max: float = Field(..., ge=-180, le=180)
+    day: int = Field(..., ge=1, le=31)
+    month: int = Field(..., ge=1, le=12)
+    hour: int = Field(12, ge=0, le=23)
+    variables: Optional[List[str]] = None  # Nombres de WEATHER_DATASETS (todas si se omite)
+    max_size: int = Field(64, ge=8, le=256)  # Celdas máximas por lado tras reducir
+
+class ProbabilityRequest(BaseModel):
+    location: Location
+    day: int = Field(..., ge=1, le=31)
+    month: int = Field(..., ge=1, le=12)
+    start_year: int = Field(2005, ge=2000)
+    end_year: int = Field(2024, ge=2000)
+    window_days: int = Field(3, ge=0, le=15)  # Días antes y después del día pedido
+    thresholds: Optional[Dict[str, float]] = None  # Sobrescribe DEFAULT_THRESHOLDS por nombre
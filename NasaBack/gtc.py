@@ -9,6 +9,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from config import NASA_USERNAME,NASA_PASSWORD
+from src.giovanni import parse_time_series
 
 # Setup the signin and time series URLs
 signin_url = "https://api.giovanni.earthdata.nasa.gov/signin"
@@ -280,40 +281,9 @@ def parse_csv(ts):
     OUTPUTS:
     headers,df - the headers from the CSV as a dict and the values in a pandas dataframe
     """
-    # Verificar si la respuesta contiene un error
-    if "Error" in ts or "error" in ts or len(ts) < 100:
-        raise ValueError(f"Error en la respuesta del servidor: {ts[:200]}...")
-    
-    with io.StringIO(ts) as f:
-        # the first 13 rows are header
-        headers = {}
-        for i in range(13):
-            line = f.readline().strip()
-            if not line:
-                raise ValueError(f"Línea vacía en el header en la fila {i}")
-            
-            # Manejar líneas que pueden no tener coma
-            if "," in line:
-                parts = line.split(",", 1)  # Split solo en la primera coma
-                if len(parts) == 2:
-                    key, value = parts
-                    headers[key] = value.strip()
-                else:
-                    print(f"Advertencia: línea de header malformada: {line}")
-            else:
-                print(f"Advertencia: línea sin coma en header: {line}")
-
-        # Verificar que tenemos el nombre del parámetro
-        if "param_name" not in headers:
-            raise ValueError("No se encontró 'param_name' en los headers")
-
-        # Read the csv proper
-        df = pandas.read_csv(
-            f,
-            header=1,
-            names=("Timestamp", headers["param_name"]),
-            converters={"Timestamp": pandas.Timestamp}
-        )
+    # Parser vectorizado del servicio (src/giovanni.py): tiempos datetime64 y valores float32
+    headers, times, values = parse_time_series(ts)
+    df = pandas.DataFrame({"Timestamp": times, headers["param_name"]: values})
 
     return headers, df
 
@@ -1,10 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.prediction.prediction_controller import prediction_router
 from src.chat.chat_controller import chat_router
 from src.csv.csv_controller import csv_router
+from src import nasa_pool
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pool de procesos autenticados para NASA: se crea una vez por app.
+    # No se espera el login de los procesos: el worker atiende peticiones
+    # desde el arranque y las descargas esperan en la cola del pool
+    nasa_pool.start_pool(wait=False)
+    yield
+    nasa_pool.shutdown_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "*"
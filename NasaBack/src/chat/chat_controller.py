@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, Request, UploadFile, File, Form
 from entitys.models import *
-from src.chat.chat_service import clima_feedback, simple_chat
+from fastapi.responses import StreamingResponse
+from src.chat.chat_service import clima_feedback, simple_chat, simple_chat_stream
+from src.sse import SSE_HEADERS
 from pydantic import BaseModel
 from typing import Optional
 
@@ -11,15 +13,26 @@ class SimpleChatRequest(BaseModel):
     location: Optional[dict] = None  # {"lat": float, "lon": float, "address": str}
     current_time: Optional[str] = None  # ISO string o formato legible
     weather_data: Optional[dict] = None  # Datos meteorológicos completos del prediction service
+    session_id: Optional[str] = None  # Sesión devuelta por la respuesta anterior: el contexto ya está en el servidor
 
 @chat_router.post("/weather/")
 async def predictLocateTime(
     chatRequest: ChatRequest
 ):
-    return clima_feedback(chatRequest.prompt, chatRequest.time, chatRequest.location)
+    return await clima_feedback(chatRequest.prompt, chatRequest.time, chatRequest.location, chatRequest.data_handle)
 
 @chat_router.post("/simple/")
 async def simple_chat_endpoint(
     chatRequest: SimpleChatRequest
 ):
-    return simple_chat(chatRequest.prompt, chatRequest.location, chatRequest.current_time, chatRequest.weather_data)
\ No newline at end of file
+    return await simple_chat(chatRequest.prompt, chatRequest.location, chatRequest.current_time, chatRequest.weather_data, chatRequest.session_id)
+
+@chat_router.post("/simple/stream")
+async def simple_chat_stream_endpoint(
+    chatRequest: SimpleChatRequest
+):
+    return StreamingResponse(
+        simple_chat_stream(chatRequest.prompt, chatRequest.location, chatRequest.current_time, chatRequest.weather_data, chatRequest.session_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
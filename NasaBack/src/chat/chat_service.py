@@ -1,55 +1,60 @@
-from src.prediction.prediction_service import weather, get_weather_data
 from entitys.models import *
 import json
-import pandas as pd
-from src.chatgpt_querys import chatgpt_query
+from config import CHAT_PROMPT_TOKEN_BUDGET
+from src.chatgpt_querys import achatgpt_query, achatgpt_query_stream, ERROR_MESSAGE
+from src.chat.chat_sessions import get_or_create_session, record_turn, truncate_tokens
+from src.sse import sse_event
+from src.prompt_data import encode_weather_data, estimate_tokens
+from src.weather_stats import weather_stats
+from src.weather_handles import load_weather_data
+from src.prediction.prediction_service import load_day_data
 
-def simple_chat(prompt: str, location: dict = None, current_time: str = None, weather_data: dict = None):
+def build_chat_context(location: dict = None, current_time: str = None, weather_data: dict = None):
     """
-    Función que envía el prompt a ChatGPT con contexto de ubicación, tiempo y datos meteorológicos
+    Texto de contexto (ubicación, tiempo y datos meteorológicos); en las
+    sesiones se construye una sola vez y se guarda.
     """
-    try:
-        # Construir contexto adicional
-        context = ""
-        if location:
-            lat = location.get('lat')
-            lon = location.get('lon')
-            address = location.get('address', 'Unknown location')
-            context += f"\nUser's current location: {address} (Latitude: {lat}, Longitude: {lon})"
+    # Construir contexto adicional
+    context = ""
+    if location:
+        lat = location.get('lat')
+        lon = location.get('lon')
+        address = location.get('address', 'Unknown location')
+        context += f"\nUser's current location: {address} (Latitude: {lat}, Longitude: {lon})"
+    
+    if current_time:
+        context += f"\nCurrent date and time: {current_time}"
+    
+    # Añadir contexto meteorológico si está disponible
+    weather_context = ""
+    if weather_data:
+        weather_context += "\n\nWEATHER DATA CONTEXT:"
         
-        if current_time:
-            context += f"\nCurrent date and time: {current_time}"
+        # Agregar summary del clima
+        if 'data' in weather_data and 'summary' in weather_data['data']:
+            summary = weather_data['data']['summary']
+            weather_context += f"\nWeather Summary:"
+            weather_context += f"\n- Temperature: {summary.get('temperatura', 'N/A')} K"
+            weather_context += f"\n- Min Temperature: {summary.get('temperatura_min', 'N/A')} K"
+            weather_context += f"\n- Max Temperature: {summary.get('temperatura_max', 'N/A')} K"
+            weather_context += f"\n- Cloudiness: {summary.get('nubosidad', 'N/A')}"
+            weather_context += f"\n- Precipitation: {summary.get('precipitacion', 'N/A')} mm"
+            weather_context += f"\n- Humidity: {summary.get('humedad', 'N/A')} kg/kg"
+            weather_context += f"\n- Solar Radiation: {summary.get('radiacion_solar', 'N/A')} W/m²"
+            weather_context += f"\n- Wind Speed: {summary.get('velocidad_viento', 'N/A')} m/s"
         
-        # Añadir contexto meteorológico si está disponible
-        weather_context = ""
-        if weather_data:
-            weather_context += "\n\nWEATHER DATA CONTEXT:"
-            
-            # Agregar summary del clima
-            if 'data' in weather_data and 'summary' in weather_data['data']:
-                summary = weather_data['data']['summary']
-                weather_context += f"\nWeather Summary:"
-                weather_context += f"\n- Temperature: {summary.get('temperatura', 'N/A')} K"
-                weather_context += f"\n- Min Temperature: {summary.get('temperatura_min', 'N/A')} K"
-                weather_context += f"\n- Max Temperature: {summary.get('temperatura_max', 'N/A')} K"
-                weather_context += f"\n- Cloudiness: {summary.get('nubosidad', 'N/A')}"
-                weather_context += f"\n- Precipitation: {summary.get('precipitacion', 'N/A')} mm"
-                weather_context += f"\n- Humidity: {summary.get('humedad', 'N/A')} kg/kg"
-                weather_context += f"\n- Solar Radiation: {summary.get('radiacion_solar', 'N/A')} W/m²"
-                weather_context += f"\n- Wind Speed: {summary.get('velocidad_viento', 'N/A')} m/s"
-            
-            # Agregar recomendaciones previas
-            if 'recomendations' in weather_data:
-                recommendations = weather_data['recomendations']
-                if isinstance(recommendations, list) and recommendations:
-                    weather_context += f"\n\nPrevious Weather Recommendations:"
-                    for i, rec in enumerate(recommendations, 1):
-                        weather_context += f"\n{i}. {rec}"
-        
-        # Añadir contexto al prompt si existe
-        enhanced_prompt = prompt
-        if context or weather_context:
-            enhanced_prompt = f"""Context information:  
+        # Agregar recomendaciones previas
+        if 'recomendations' in weather_data:
+            recommendations = weather_data['recomendations']
+            if isinstance(recommendations, list) and recommendations:
+                weather_context += f"\n\nPrevious Weather Recommendations:"
+                for i, rec in enumerate(recommendations, 1):
+                    weather_context += f"\n{i}. {rec}"
+
+    return context + weather_context
+
+def _chat_template(prompt: str, context: str = "", conversation: str = ""):
+    return f"""Context information:  
 Please provide a helpful response considering the user's location, current time, and weather data when relevant.
 Write ALL text content in ENGLISH language only. The text should be friendly and engaging. The response should be tailored to the user's specific situation and needs.
 CRITICAL: Base your recommendations on the ACTUAL weather data provided, not generic examples. Speak with a kind and friendly tone.
@@ -60,33 +65,101 @@ The format of the response should be:
 the response should be a single text block without sections or titles.
 
 MANDATORY: Write ALL text content in ENGLISH language only. Use the provided weather data to give specific, actionable advice.
-{context}{weather_context}
+{context}{conversation}
 
 User's question: {prompt}
 """
 
-        response = chatgpt_query(prompt=enhanced_prompt)
+def build_session_prompt(session, prompt: str):
+    """
+    Prompt de un mensaje de la sesión dentro de CHAT_PROMPT_TOKEN_BUDGET:
+    contexto guardado (recortado a lo que quepa junto a la plantilla, el
+    resumen y la pregunta), resumen de los turnos antiguos y los turnos
+    recientes que quepan en lo que sobra.
+    """
+    if not (session.context or session.summary or session.turns):
+        return prompt
+
+    summary = f"\n\nSummary of the earlier conversation:\n{session.summary}" if session.summary else ""
+    fixed_tokens = estimate_tokens(_chat_template(prompt, "", summary + "\n\nRecent conversation:\n"))
+    context = truncate_tokens(session.context, CHAT_PROMPT_TOKEN_BUDGET - fixed_tokens)
+    history = session.recent_history(CHAT_PROMPT_TOKEN_BUDGET - fixed_tokens - estimate_tokens(context))
+
+    conversation = summary + (f"\n\nRecent conversation:\n{history}" if history else "")
+    return _chat_template(prompt, context, conversation)
+
+def _session_expired_reply():
+    """
+    Respuesta cuando session_id no existe (expiró, fue desalojada o vive en
+    otro worker) y la petición no trae contexto: el cliente debe reenviar
+    location, current_time y weather_data en lugar de seguir sin contexto.
+    """
+    return {"response": "", "status": "session_expired", "session_expired": True, "session_id": None}
+
+async def simple_chat(prompt: str, location: dict = None, current_time: str = None, weather_data: dict = None, session_id: str = None):
+    """
+    Función que envía el prompt a ChatGPT con contexto de ubicación, tiempo y datos meteorológicos.
+    El contexto y el historial se guardan en la sesión (session_id); si no
+    se envía, se crea una sesión nueva y su id va en la respuesta (solo si
+    ChatGPT respondió: sin turno no se guarda la sesión).
+    Si session_id ya no existe la respuesta lo indica con session_expired.
+    """
+    session = None
+    try:
+        context = build_chat_context(location, current_time, weather_data)
+        session = get_or_create_session(session_id, context)
+        expired = bool(session_id) and session.id != session_id
+        if expired and not context:
+            return _session_expired_reply()
+
+        enhanced_prompt = build_session_prompt(session, prompt)
+        # Respuestas de una conversación: no se repiten, no van a la caché del LLM
+        response = await achatgpt_query(prompt=enhanced_prompt, use_cache=False)
+        if response != ERROR_MESSAGE:
+            record_turn(session, prompt, response)
         return {
             "response": response,
-            "status": "success"
+            "status": "success",
+            "session_id": session.id,
+            "session_expired": expired
         }
     except Exception as e:
         return {
             "response": f"Error: {str(e)}",
-            "status": "error"
+            "status": "error",
+            "session_id": session.id if session else None
         }
 
-def getStats(data):
-    df = pd.DataFrame(data)
-    valores = df.iloc[:, 1]
-    
-    return {
-        'min': float(valores.min()),
-        'max': float(valores.max()),
-        'mean': float(valores.mean())
-    }
-    
-def feedback(data,start_time,end_time,prompt):
+async def simple_chat_stream(prompt: str, location: dict = None, current_time: str = None, weather_data: dict = None, session_id: str = None):
+    """
+    Versión en streaming de simple_chat: genera eventos SSE 'token' a medida
+    que llega la respuesta y un evento 'done' con la respuesta completa y el
+    session_id. Si session_id ya no existe y no se envió contexto, genera
+    solo un evento 'session_expired'.
+    """
+    session = None
+    try:
+        context = build_chat_context(location, current_time, weather_data)
+        session = get_or_create_session(session_id, context)
+        expired = bool(session_id) and session.id != session_id
+        if expired and not context:
+            yield sse_event(_session_expired_reply(), event="session_expired")
+            return
+
+        enhanced_prompt = build_session_prompt(session, prompt)
+        parts = []
+        async for delta in achatgpt_query_stream(prompt=enhanced_prompt, use_cache=False):
+            parts.append(delta)
+            yield sse_event(delta, event="token")
+
+        response = "".join(parts)
+        if response and response != ERROR_MESSAGE:
+            record_turn(session, prompt, response)
+        yield sse_event({"response": response, "status": "success", "session_id": session.id, "session_expired": expired}, event="done")
+    except Exception as e:
+        yield sse_event({"response": f"Error: {str(e)}", "status": "error", "session_id": session.id if session else None}, event="error")
+
+async def feedback(data,start_time,end_time,prompt):
     
     prompt = f"""
     Se desea hacer una predicción meteorológica de las siguientes variables:
@@ -100,7 +173,8 @@ def feedback(data,start_time,end_time,prompt):
 
     Las variables meteorológicas de cada uno se describen a continuación:
 
-    Datos del día (con estadísticas): {data}
+    Datos del día (con estadísticas), en JSON columnar
+    ("d": fecha, "t": horas UTC, "v": valores por variable en el orden de "t", "s": estadísticas): {data}
 
     Hora de inicio del período: {start_time}
     Hora de fin del período: {end_time}
@@ -128,30 +202,22 @@ def feedback(data,start_time,end_time,prompt):
     MANDATORY: Write ALL text content in ENGLISH language only.
     """
     
-    return chatgpt_query(prompt=prompt)
+    return await achatgpt_query(prompt=prompt)
     
-def clima_feedback(prompt: str, time: Time,location: Location):
+async def clima_feedback(prompt: str, time: Time,location: Location, data_handle: str = None):
     start_time = f'2024-{str(time.month).zfill(2)}-{str(time.day).zfill(2)}T00:00:00'
     end_time = f'2024-{str(time.month).zfill(2)}-{str(time.day).zfill(2)}T{time.start_time}:00'
     
-    weather_data = get_weather_data(
-                        location.lat,
-                        location.lon,
-                        start_time,
-                        end_time
-                        )
+    # Datos del día que ya descargó /predict/weather (si el cliente envía su
+    # handle); si no, el mismo frame del día que carga predict
+    day_data = load_weather_data(data_handle, location, time)
+    if day_data is None:
+        day_data = await load_day_data(time, location)
+    weather_data = day_data.window(start_time, end_time)
     
-    simplified_data = {}
-
-    for variable, details in weather_data.items():
-        data_values = details['data']
-        
-        simplified_data[variable] = {
-            'stats': getStats(data_values),
-            'data': data_values.to_dict(orient='records')
-        }
-        
-    res = feedback(simplified_data,time.start_time,time.end_time,prompt)
+    # Estadísticas de todas las variables en una sola pasada
+    data_text, _ = encode_weather_data(weather_data, weather_stats(weather_data))
+    res = await feedback(data_text,time.start_time,time.end_time,prompt)
     
     return {
         "res" : res
@@ -0,0 +1,170 @@
+import asyncio
+import secrets
+
+from config import (
+    CHAT_SESSION_TTL, CHAT_SESSION_MAX_BYTES, CHAT_HISTORY_TOKENS, CHAT_SUMMARY_TOKENS
+)
+from src.chatgpt_querys import achatgpt_query, ERROR_MESSAGE
+from src.prompt_data import CHARS_PER_TOKEN, estimate_tokens
+from src.result_cache import MemoryTTLCache
+
+"""
+Sesiones de chat en el servidor para /chat/simple.
+
+La sesión guarda una sola vez el contexto (ubicación, hora y datos
+meteorológicos ya formateados) y el historial, así que el cliente solo
+envía session_id y su pregunta. El historial se acota:
+- Los turnos recientes entran en el prompt mientras quepan en
+  CHAT_PROMPT_TOKEN_BUDGET (los más nuevos primero).
+- Cuando los turnos guardados superan CHAT_HISTORY_TOKENS, los más
+  antiguos se resumen con ChatGPT (en segundo plano, después de responder)
+  en un resumen de a lo sumo CHAT_SUMMARY_TOKENS.
+Así el tamaño del prompt se mantiene plano aunque la conversación crezca.
+Las sesiones viven en la memoria del worker (CHAT_SESSION_TTL sin
+actividad, CHAT_SESSION_MAX_BYTES con desalojo LRU) y solo se guardan al
+registrar su primer turno: una petición que falla no ocupa el store.
+"""
+
+# Turnos más recientes que nunca se resumen
+KEEP_RECENT_TURNS = 2
+
+
+def _format_turn(question, answer):
+    return f"User: {question}\nAssistant: {answer}"
+
+
+class ChatSession:
+    __slots__ = ("id", "context", "summary", "turns", "summarizing")
+
+    def __init__(self, session_id=None, context=""):
+        self.id = session_id
+        self.context = context
+        self.summary = ""
+        self.turns = []  # [(pregunta, respuesta)] que todavía no están en el resumen
+        self.summarizing = False
+
+    @property
+    def nbytes(self):
+        chars = len(self.context) + len(self.summary) + sum(len(q) + len(a) for q, a in self.turns)
+        return chars + 128 * len(self.turns) + 512
+
+    def history_tokens(self):
+        return sum(estimate_tokens(_format_turn(q, a)) for q, a in self.turns)
+
+    def recent_history(self, token_budget):
+        """
+        Turnos más recientes que caben en token_budget, en orden cronológico.
+        """
+        lines = []
+        used = 0
+        for question, answer in reversed(self.turns):
+            text = _format_turn(question, answer)
+            tokens = estimate_tokens(text)
+            if used + tokens > token_budget:
+                break
+            lines.append(text)
+            used += tokens
+        return "\n".join(reversed(lines))
+
+
+session_store = MemoryTTLCache(CHAT_SESSION_MAX_BYTES, CHAT_SESSION_TTL, sizeof=lambda session: session.nbytes)
+
+# Resúmenes en curso (referencia para que no los recolecte el GC)
+_background_tasks = set()
+
+
+def get_or_create_session(session_id=None, context=""):
+    """
+    Sesión guardada con session_id o una nueva si no existe o expiró.
+    La nueva no tiene id ni se guarda hasta record_turn.
+    Si el cliente envía contexto nuevo reemplaza al guardado.
+    """
+    session = session_store.get(session_id) if session_id else None
+    if session is None:
+        if session_id:
+            print(f"⚠️  Sesión de chat {session_id} no encontrada o expirada; se crea una nueva")
+        return ChatSession(context=context)
+
+    if context:
+        session.context = context
+    return session
+
+
+def record_turn(session, question, answer):
+    """
+    Agrega el turno al historial y, si el historial superó
+    CHAT_HISTORY_TOKENS, resume los turnos antiguos en segundo plano.
+    Una sesión nueva recibe aquí su id y se guarda.
+    """
+    if session.id is None:
+        session.id = secrets.token_urlsafe(12)
+    session.turns.append((question, answer))
+    session_store.set(session.id, session)  # Renueva el TTL y el tamaño
+
+    if session.history_tokens() > CHAT_HISTORY_TOKENS and not session.summarizing:
+        session.summarizing = True
+        task = asyncio.get_running_loop().create_task(_summarize_old_turns(session))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+def _turns_to_fold(turns):
+    """
+    Cuántos turnos antiguos resumir para que los restantes ocupen a lo
+    sumo la mitad de CHAT_HISTORY_TOKENS (sin tocar los más recientes).
+    """
+    tokens = [estimate_tokens(_format_turn(q, a)) for q, a in turns]
+    remaining = sum(tokens)
+    count = 0
+    while count < len(turns) - KEEP_RECENT_TURNS and remaining > CHAT_HISTORY_TOKENS // 2:
+        remaining -= tokens[count]
+        count += 1
+    return count
+
+
+def truncate_tokens(text, token_budget):
+    """
+    text recortado (en un espacio) para ocupar a lo sumo token_budget tokens.
+    """
+    if token_budget <= 0:
+        return ""
+    max_chars = token_budget * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+async def _summarize(previous, turns):
+    conversation = "\n".join(_format_turn(q, a) for q, a in turns)
+    prompt = f"""Summarize the following conversation between a user and a weather assistant in at most {CHAT_SUMMARY_TOKENS * 3 // 4} words.
+Keep the user's plans, preferences and the advice already given. Write plain text in ENGLISH, without titles.
+
+Previous summary: {previous or "None"}
+
+Conversation:
+{conversation}
+"""
+    summary = await achatgpt_query(prompt=prompt, use_cache=False)  # Único por sesión
+    if summary == ERROR_MESSAGE:
+        # Sin ChatGPT: conservar al menos las preguntas del usuario
+        summary = " ".join([previous] + [f"User asked: {q}" for q, _ in turns]).strip()
+        max_chars = CHAT_SUMMARY_TOKENS * CHARS_PER_TOKEN
+        return summary[-max_chars:]
+
+    return truncate_tokens(summary, CHAT_SUMMARY_TOKENS)
+
+
+async def _summarize_old_turns(session):
+    try:
+        count = _turns_to_fold(session.turns)
+        if count == 0:
+            return
+
+        summary = await _summarize(session.summary, session.turns[:count])
+        # Mientras tanto solo se agregan turnos al final: los primeros count son los resumidos
+        session.summary = summary
+        del session.turns[:count]
+        session_store.set(session.id, session)
+        print(f"🧾 Sesión {session.id}: {count} turnos resumidos (~{estimate_tokens(summary)} tokens)")
+    except Exception as e:
+        print(f"❌ Error al resumir la sesión {session.id}: {e}")
+    finally:
+        session.summarizing = False
@@ -1,23 +1,243 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY
+import asyncio
+import time
+from config import (
+    OPENAI_API_KEY, OPENAI_MAX_CONCURRENT_REQUESTS,
+    LLM_ATTEMPT_TIMEOUT, LLM_DEADLINE, LLM_HEDGE_DELAY,
+    LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN,
+)
+from src.llm_cache import get_llm_cache, cache_key
+from src.model_router import ModelRouter
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+MODELS_FALLBACK = ["gpt-3.5-turbo", "gpt-4o-mini", "gpt-4"]
+ERROR_MESSAGE = "Error: No se pudo acceder a ningún modelo de ChatGPT. Verifica tu API key y permisos."
 
-def chatgpt_query(prompt, model="gpt-4o-mini"):
-    models_to_try = [model, "gpt-3.5-turbo", "gpt-4o-mini", "gpt-4", "text-davinci-003"] 
-    
-    for current_model in models_to_try:
+model_router = ModelRouter(
+    MODELS_FALLBACK,
+    failure_threshold=LLM_BREAKER_FAILURES,
+    cooldown=LLM_BREAKER_COOLDOWN,
+)
+
+# Clientes de OpenAI: el SDK se importa y los clientes se crean en el primer
+# uso (no al importar la app). Sin reintentos internos del SDK: el router
+# decide los reintentos y el fallback entre modelos dentro de un plazo acotado
+_client = None
+_async_client = None
+
+def _import_openai():
+    import openai
+
+    # Modelo inexistente o sin permiso: el router lo salta desde el primer fallo
+    model_router.permanent_errors = (openai.NotFoundError, openai.PermissionDeniedError)
+    return openai
+
+def get_client():
+    global _client
+
+    if _client is None:
+        _client = _import_openai().OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+    return _client
+
+def get_async_client():
+    global _async_client
+
+    if _async_client is None:
+        _async_client = _import_openai().AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+    return _async_client
+
+# Tokens consumidos por este proceso (para métricas)
+token_usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+def _record_usage(model, response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    token_usage["calls"] += 1
+    token_usage["prompt_tokens"] += usage.prompt_tokens or 0
+    token_usage["completion_tokens"] += usage.completion_tokens or 0
+    print(f"🧾 [{model}] Tokens: prompt {usage.prompt_tokens}, respuesta {usage.completion_tokens}")
+
+def _cached_response(prompt, model, use_cache):
+    """
+    Retorna (cache, key, respuesta_en_caché). cache es None si no se usa.
+    """
+    cache = get_llm_cache() if use_cache else None
+    if cache is None:
+        return None, None, None
+
+    key = cache_key(model, prompt)
+    response = cache.get(key)
+    if response is not None:
+        print(f"♻️  Respuesta de ChatGPT en caché ({model})")
+    return cache, key, response
+
+async def _acached_response(prompt, model, use_cache):
+    """
+    Como _cached_response pero la consulta a SQLite corre en un hilo.
+    """
+    cache = get_llm_cache() if use_cache else None
+    if cache is None:
+        return None, None, None
+
+    key = cache_key(model, prompt)
+    response = await cache.aget(key)
+    if response is not None:
+        print(f"♻️  Respuesta de ChatGPT en caché ({model})")
+    return cache, key, response
+
+def chatgpt_query(prompt, model="gpt-4o-mini", use_cache=True):
+    cache, key, cached = _cached_response(prompt, model, use_cache)
+    if cached is not None:
+        return cached
+
+    def call(current_model, timeout):
+        response = get_client().chat.completions.create(
+            model=current_model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            timeout=timeout
+        )
+        _record_usage(current_model, response)
+        return response.choices[0].message.content.strip()
+
+    try:
+        used_model, content = model_router.run_sync(model, call, LLM_ATTEMPT_TIMEOUT, LLM_DEADLINE)
+    except Exception:
+        return ERROR_MESSAGE
+
+    if cache is not None:
+        cache.set(key, used_model, content)
+    return content
+
+# Límite de llamadas simultáneas a OpenAI desde el event loop
+_openai_semaphore = None
+
+def _get_openai_semaphore():
+    global _openai_semaphore
+
+    if _openai_semaphore is None:
+        _openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_REQUESTS)
+    return _openai_semaphore
+
+async def achatgpt_query(prompt, model="gpt-4o-mini", use_cache=True):
+    """
+    Versión asíncrona de chatgpt_query (cliente AsyncOpenAI): no bloquea el
+    event loop mientras espera al modelo.
+    use_cache=False ignora la caché de respuestas para esta llamada.
+    """
+    cache, key, cached = await _acached_response(prompt, model, use_cache)
+    if cached is not None:
+        return cached
+
+    async def call(current_model, timeout):
+        response = await get_async_client().chat.completions.create(
+            model=current_model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            timeout=timeout
+        )
+        _record_usage(current_model, response)
+        return response.choices[0].message.content.strip()
+
+    async with _get_openai_semaphore():
         try:
-            print(f"Intentando con modelo: {current_model}")
-            response = client.chat.completions.create(
-                model=current_model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            used_model, content = await model_router.run(
+                model, call, LLM_ATTEMPT_TIMEOUT, LLM_DEADLINE, hedge_delay=LLM_HEDGE_DELAY
             )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error con modelo {current_model}: {str(e)}")
-            continue
-    
-    return "Error: No se pudo acceder a ningún modelo de ChatGPT. Verifica tu API key y permisos."
+        except Exception:
+            return ERROR_MESSAGE
+
+    if cache is not None:
+        await cache.aset(key, used_model, content)
+    return content
+
+class StreamTruncatedError(RuntimeError):
+    """
+    El modelo falló después de enviar fragmentos: la respuesta quedó incompleta.
+    """
+
+async def achatgpt_query_stream(prompt, model="gpt-4o-mini", use_cache=True):
+    """
+    Versión en streaming de achatgpt_query: genera los fragmentos de texto a
+    medida que llegan. Si un modelo falla antes del primer fragmento se
+    intenta con el siguiente; la respuesta completa se guarda en la caché.
+    El plazo por intento acota la espera hasta el primer fragmento (sin
+    hedging) y LLM_DEADLINE acota todo el stream, incluida su lectura.
+    Si falla después de enviar fragmentos lanza StreamTruncatedError.
+    """
+    cache, key, cached = await _acached_response(prompt, model, use_cache)
+    if cached is not None:
+        yield cached
+        return
+
+    loop = asyncio.get_running_loop()
+    end = loop.time() + LLM_DEADLINE
+
+    async with _get_openai_semaphore():
+        for current_model in model_router.candidates(model):
+            if end - loop.time() <= 0:
+                break
+            if not model_router.acquire(current_model):
+                continue
+
+            parts = []
+            stream = None
+            started = time.monotonic()
+            # Hasta el primer fragmento: plazo por intento; después, el plazo total
+            first_end = min(loop.time() + LLM_ATTEMPT_TIMEOUT, end)
+            try:
+                print(f"Intentando con modelo (stream): {current_model}")
+                stream = await asyncio.wait_for(
+                    get_async_client().chat.completions.create(
+                        model=current_model,
+                        messages=[
+                            {"role": "user", "content": prompt}
+                        ],
+                        stream=True,
+                        stream_options={"include_usage": True}
+                    ),
+                    max(first_end - loop.time(), 0)
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    limit = first_end if not parts else end
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(limit - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    if chunk.usage is not None:
+                        _record_usage(current_model, chunk)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            except (asyncio.CancelledError, GeneratorExit):
+                # El cliente se desconectó: sin resultado para el breaker
+                model_router.release(current_model)
+                raise
+            except Exception as e:
+                print(f"Error con modelo {current_model}: {str(e) or type(e).__name__}")
+                model_router.record_failure(current_model, e)
+                if parts:
+                    # Ya se enviaron fragmentos: no mezclar modelos
+                    raise StreamTruncatedError(
+                        f"La respuesta de {current_model} se interrumpió: {str(e) or type(e).__name__}"
+                    ) from e
+                continue
+            finally:
+                if stream is not None and hasattr(stream, "close"):
+                    try:
+                        await stream.close()
+                    except Exception:
+                        pass
+
+            model_router.record_success(current_model, time.monotonic() - started)
+            content = "".join(parts).strip()
+            if cache is not None and content:
+                await cache.aset(key, current_model, content)
+            return
+
+    yield ERROR_MESSAGE
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from config import CHUNK_INDEX_DIR
+
+"""
+Índice de chunks HDF5/NetCDF4 para lecturas parciales de granulos GLDAS.
+
+Parecido a las referencias de kerchunk: para cada variable se guarda la
+posición (offset, tamaño) en bytes de cada chunk dentro del archivo remoto,
+junto con el dtype, la forma de los chunks y los filtros de compresión.
+Con el índice, leer un punto solo requiere una petición HTTP Range por
+variable (el chunk que contiene la celda) en lugar del granulo completo.
+
+El índice se construye una vez por granulo leyendo únicamente los metadatos
+del archivo con h5py y se guarda como JSON en CHUNK_INDEX_DIR.
+"""
+
+# Códigos de filtros HDF5 soportados
+H5Z_FILTER_DEFLATE = 1
+H5Z_FILTER_SHUFFLE = 2
+H5Z_FILTER_FLETCHER32 = 3
+SUPPORTED_FILTERS = {H5Z_FILTER_DEFLATE, H5Z_FILTER_SHUFFLE, H5Z_FILTER_FLETCHER32}
+
+# Versión del formato del índice; los guardados con otra se reconstruyen
+# (v2: fill_values solo de _FillValue/missing_value)
+INDEX_VERSION = 2
+
+# Lecturas pequeñas para no traer el granulo entero al leer metadatos
+METADATA_BLOCK_SIZE = 256 * 1024
+
+TIME_UNITS = {
+    "seconds": "s",
+    "minutes": "min",
+    "hours": "h",
+    "days": "D",
+}
+
+
+def _json_value(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, np.ndarray):
+        return [_json_value(v) for v in value.tolist()]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode_times(values, units):
+    """
+    Convierte valores CF ('minutes since 2000-01-01 00:00:00') a ISO 8601.
+    """
+    unit, _, origin = units.partition(" since ")
+    offsets = pd.to_timedelta(np.asarray(values, dtype="int64"), unit=TIME_UNITS[unit.strip().lower()])
+    times = pd.Timestamp(origin.strip()) + offsets
+    return [t.isoformat() for t in times]
+
+
+def _dataset_filters(dataset):
+    plist = dataset.id.get_create_plist()
+    return [plist.get_filter(k)[0] for k in range(plist.get_nfilters())]
+
+
+def _index_variable(dataset):
+    filters = _dataset_filters(dataset)
+    unsupported = [f for f in filters if f not in SUPPORTED_FILTERS]
+    if unsupported:
+        raise ValueError(f"Filtros HDF5 no soportados en {dataset.name}: {unsupported}")
+
+    refs = {}
+    if dataset.chunks is None:
+        # Almacenamiento contiguo: un solo "chunk" con toda la variable
+        chunks = list(dataset.shape)
+        refs[".".join("0" for _ in dataset.shape)] = [
+            int(dataset.id.get_offset()), int(dataset.id.get_storage_size()), 0
+        ]
+    else:
+        chunks = list(dataset.chunks)
+        for k in range(dataset.id.get_num_chunks()):
+            info = dataset.id.get_chunk_info(k)
+            key = ".".join(str(offset // size) for offset, size in zip(info.chunk_offset, chunks))
+            refs[key] = [int(info.byte_offset), int(info.size), int(info.filter_mask)]
+
+    # Como xarray: solo los atributos CF. El fillvalue de almacenamiento de
+    # HDF5 vale 0 si no se definió y borraría los ceros reales (lluvia)
+    attrs = dataset.attrs
+    fill_values = []
+    for name in ("_FillValue", "missing_value"):
+        if name in attrs:
+            fill_values.extend(np.atleast_1d(attrs[name]).tolist())
+
+    return {
+        "shape": list(dataset.shape),
+        "dtype": dataset.dtype.str,
+        "chunks": chunks,
+        "filters": filters,
+        "fill_values": [_json_value(v) for v in fill_values],
+        "scale_factor": _json_value(attrs["scale_factor"]) if "scale_factor" in attrs else None,
+        "add_offset": _json_value(attrs["add_offset"]) if "add_offset" in attrs else None,
+        "refs": refs,
+    }
+
+
+def build_chunk_index(fileobj, granule_id, url):
+    """
+    Construye el índice de chunks de un granulo abierto como archivo
+    (local o remoto con fsspec). Solo lee metadatos y coordenadas.
+    """
+    import h5py
+
+    with h5py.File(fileobj, "r") as f:
+        lat = f["lat"][:].astype("float64")
+        lon = f["lon"][:].astype("float64")
+        time_ds = f["time"]
+        units = _json_value(time_ds.attrs["units"])
+        times = _decode_times(time_ds[:], units)
+
+        variables = {}
+        for name, dataset in f.items():
+            if not isinstance(dataset, h5py.Dataset) or dataset.ndim != 3:
+                continue
+            if dataset.dtype.kind not in "fiu":
+                continue
+            variables[name] = _index_variable(dataset)
+
+    return {
+        "version": INDEX_VERSION,
+        "granule_id": granule_id,
+        "url": url,
+        "coords": {
+            "lat": lat.tolist(),
+            "lon": lon.tolist(),
+            "time": times,
+        },
+        "variables": variables,
+    }
+
+
+def _index_path(granule_id):
+    digest = hashlib.sha256(granule_id.encode("utf-8")).hexdigest()
+    return os.path.join(CHUNK_INDEX_DIR, digest + ".json")
+
+
+def load_chunk_index(granule_id):
+    try:
+        with open(_index_path(granule_id), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return index if index.get("version") == INDEX_VERSION else None
+
+
+def save_chunk_index(index):
+    """
+    Guarda el índice de forma atómica (seguro con varios procesos).
+    """
+    os.makedirs(CHUNK_INDEX_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CHUNK_INDEX_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, _index_path(index["granule_id"]))
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def get_chunk_index(granule_id, url, fs):
+    """
+    Retorna el índice del granulo, construyéndolo desde el archivo remoto
+    (fs: sistema de archivos fsspec autenticado) si aún no existe.
+    """
+    index = load_chunk_index(granule_id)
+    if index is not None:
+        return index
+
+    print(f"[INDEX] 🗂️  Construyendo índice de chunks: {granule_id}")
+    with fs.open(url, "rb", block_size=METADATA_BLOCK_SIZE, cache_type="blockcache") as fileobj:
+        index = build_chunk_index(fileobj, granule_id, url)
+
+    save_chunk_index(index)
+    return index
+
+
+def _decode_chunk(raw, meta, filter_mask):
+    """
+    Deshace el pipeline de filtros HDF5 (en orden inverso al de escritura).
+    """
+    dtype = np.dtype(meta["dtype"])
+    data = raw
+    for position, code in reversed(list(enumerate(meta["filters"]))):
+        if filter_mask & (1 << position):
+            continue  # Filtro omitido para este chunk
+        if code == H5Z_FILTER_FLETCHER32:
+            data = data[:-4]
+        elif code == H5Z_FILTER_DEFLATE:
+            data = zlib.decompress(data)
+        elif code == H5Z_FILTER_SHUFFLE:
+            data = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, -1).T.tobytes()
+
+    return np.frombuffer(data, dtype=dtype).reshape(meta["chunks"])
+
+
+def _fetch_range(session, url, offset, size):
+    response = session.get(url, headers={"Range": f"bytes={offset}-{offset + size - 1}"}, timeout=60)
+    response.raise_for_status()
+    content = response.content
+    if response.status_code != 206 and len(content) != size:
+        # El servidor ignoró el Range: recortar la respuesta completa
+        content = content[offset:offset + size]
+    return content
+
+
+def read_point(index, session, variable_names, i, j):
+    """
+    Lee las variables pedidas en la celda (i, j) de la malla (índices de
+    gcts.grid_cell) usando solo HTTP Range.
+    Retorna {variable: (tiempos, valores)} con el mismo formato que
+    extract_point_data_multi.
+    """
+    nlat = len(index["coords"]["lat"])
+    nlon = len(index["coords"]["lon"])
+    if not (0 <= i < nlat and 0 <= j < nlon):
+        raise ValueError(f"Celda ({i}, {j}) fuera de la malla del granulo ({nlat}x{nlon})")
+    times = pd.to_datetime(index["coords"]["time"]).to_numpy(dtype="datetime64[ns]")
+
+    results = {}
+    for name in variable_names:
+        meta = index["variables"].get(name)
+        if meta is None:
+            print(f"[INDEX] ⚠️  Variable '{name}' no encontrada en el índice")
+            continue
+
+        _, chunk_lat, chunk_lon = meta["chunks"]
+        values = np.full(meta["shape"][0], np.nan, dtype="float64")
+        for t in range(meta["shape"][0]):
+            key = f"{t // meta['chunks'][0]}.{i // chunk_lat}.{j // chunk_lon}"
+            ref = meta["refs"].get(key)
+            if ref is None:
+                continue  # Chunk sin escribir: todo es valor de relleno
+            offset, size, filter_mask = ref
+            chunk = _decode_chunk(_fetch_range(session, index["url"], offset, size), meta, filter_mask)
+            values[t] = chunk[t % meta["chunks"][0], i % chunk_lat, j % chunk_lon]
+
+        for fill in meta["fill_values"]:
+            if fill is not None:
+                values[values == fill] = np.nan
+        if meta["scale_factor"] is not None:
+            values = values * meta["scale_factor"]
+        if meta["add_offset"] is not None:
+            values = values + meta["add_offset"]
+
+        valid = ~np.isnan(values)
+        if valid.any():
+            results[name] = (times[valid], values[valid].astype(np.float32))
+
+    return results
@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import CLIMATOLOGY_STORE_DIR
+from src.weather_frame import WeatherFrame
+
+"""
+Climatología precalculada de GLDAS indexada por (celda, día del año, slot de 3 horas).
+
+El almacén es un directorio con:
+- meta.json: variables, cuantización, años usados y forma del arreglo.
+- cells.npy: malla GLDAS (600 x 1440) con el número de fila de cada celda
+  de tierra o -1 para océano.
+- values.dat: arreglo int16 (celdas, 366, 8, variables) memory-mapped; los
+  8 slots x variables de un día de una celda son contiguos (una sola
+  lectura de 128 bytes).
+
+Cada valor es el promedio de todos los años construidos para ese día y
+slot, cuantizado a int16 con escala/desplazamiento por variable.
+
+Construcción (offline, descarga granulos completos):
+    python -m src.climatology build --years 2015-2024
+    python -m src.climatology info
+"""
+
+COLLECTION = "GLDAS_NOAH025_3H"
+DAYS = 366  # Índice de día en calendario bisiesto (29 de febrero incluido)
+SLOTS = 8   # Slots de 3 horas: 00, 03, ..., 21 UTC
+SLOT_HOURS = 3
+FILL = np.iinfo(np.int16).min
+
+# Rango físico por variable para cuantizar a int16
+QUANTIZATION_RANGES = {
+    "Wind_f_inst": (0.0, 60.0),
+    "Rainf_f_tavg": (0.0, 0.05),
+    "Qair_f_inst": (0.0, 0.05),
+    "Tair_f_inst": (180.0, 340.0),
+    "Snowf_tavg": (0.0, 0.02),
+    "Psurf_f_inst": (40000.0, 110000.0),
+    "SWdown_f_tavg": (0.0, 1400.0),
+    "LWdown_f_tavg": (0.0, 700.0),
+}
+
+
+def day_index(month, day):
+    """
+    Índice 0-365 del día en un calendario bisiesto, igual para todos los años.
+    """
+    return pd.Timestamp(2024, month, day).dayofyear - 1
+
+
+def _quantization(variable):
+    low, high = QUANTIZATION_RANGES[variable]
+    scale = (high - low) / (np.iinfo(np.int16).max - FILL - 1)
+    return low, scale
+
+
+def _quantize(values, variable):
+    low, scale = _quantization(variable)
+    q = np.round((np.clip(values, *QUANTIZATION_RANGES[variable]) - low) / scale) + FILL + 1
+    q = np.where(np.isnan(values), FILL, q)
+    return q.astype(np.int16)
+
+
+def _dequantize(q, variable):
+    low, scale = _quantization(variable)
+    values = (q.astype(np.float32) - (FILL + 1)) * scale + low
+    return np.where(q == FILL, np.nan, values).astype(np.float32)
+
+
+class ClimatologyStore:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.variables = self.meta["variables"]
+        self.cells = np.load(os.path.join(path, "cells.npy"), mmap_mode="r")
+        self.values = np.memmap(
+            os.path.join(path, "values.dat"),
+            dtype=np.int16,
+            mode="r",
+            shape=tuple(self.meta["shape"]),
+        )
+
+    def read_day(self, lat, lon, month, day):
+        """
+        Retorna la matriz (8 slots x variables) del día en la celda del punto,
+        o None si la celda es océano.
+        """
+        from src.gcts import grid_cell
+
+        i, j = grid_cell(lat, lon)
+        row = int(self.cells[i, j])
+        if row < 0:
+            return None
+
+        q = np.asarray(self.values[row, day_index(month, day)])
+        return np.stack([_dequantize(q[:, k], name) for k, name in enumerate(self.variables)], axis=1)
+
+
+_store = None
+
+
+def get_store():
+    """
+    Abre (una vez) el almacén de CLIMATOLOGY_STORE_DIR, o None si no existe.
+    """
+    global _store
+
+    if _store is None and os.path.exists(os.path.join(CLIMATOLOGY_STORE_DIR, "meta.json")):
+        _store = ClimatologyStore(CLIMATOLOGY_STORE_DIR)
+    return _store
+
+
+def get_climatology_data(lat, lon, start_date, end_date):
+    """
+    Datos climatológicos del punto para el período, como el WeatherFrame de
+    gcts.get_weather_data. Retorna None si no hay almacén o la celda no
+    está cubierta (se usa entonces la descarga en vivo).
+    """
+    from src.gcts import WEATHER_DATASETS, GLDAS_LAT_ORIGIN, GLDAS_LON_ORIGIN, GLDAS_RESOLUTION, grid_cell
+
+    store = get_store()
+    if store is None:
+        return None
+
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    matrix = store.read_day(lat, lon, start.month, start.day)
+    if matrix is None:
+        return None
+
+    times = pd.date_range(start.normalize(), periods=SLOTS, freq=f"{SLOT_HOURS}h")
+    in_window = (times >= start.floor(f"{SLOT_HOURS}h")) & (times <= end)
+
+    # Columnas del almacén en el orden de WEATHER_DATASETS
+    names = [
+        var_name for var_name, config in WEATHER_DATASETS.items()
+        if config["variable"] in store.variables
+    ]
+    positions = [store.variables.index(WEATHER_DATASETS[name]["variable"]) for name in names]
+    values = matrix[in_window][:, positions]
+    if not in_window.any() or np.isnan(values).all():
+        return None
+
+    i, j = grid_cell(lat, lon)
+    return WeatherFrame(
+        times[in_window].to_numpy(dtype="datetime64[ns]"),
+        names,
+        values,
+        meta={name: WEATHER_DATASETS[name] for name in names},
+        lat=GLDAS_LAT_ORIGIN + i * GLDAS_RESOLUTION,
+        lon=GLDAS_LON_ORIGIN + j * GLDAS_RESOLUTION,
+    )
+
+
+# --- CONSTRUCCIÓN OFFLINE ---
+
+def _parse_years(text):
+    if "-" in text:
+        first, last = text.split("-", 1)
+        return list(range(int(first), int(last) + 1))
+    return [int(y) for y in text.split(",")]
+
+
+def _read_fields(moment, variables):
+    """
+    Campos globales (600 x 1440) de cada variable en el granulo del momento,
+    o None si el granulo no está disponible.
+    """
+    from src.gcts import open_granules, resolve_granules
+
+    granules = resolve_granules(COLLECTION, moment, moment)
+    if not granules:
+        return None
+
+    datasets = open_granules(COLLECTION, granules)
+    if not datasets:
+        return None
+    ds = datasets[0]
+    try:
+        return {name: np.asarray(ds[name].values[0], dtype=np.float64) for name in variables}
+    finally:
+        ds.close()
+
+
+def build_store(years, out_dir):
+    """
+    Construye el almacén promediando todos los años para cada día y slot.
+    Reporta el progreso y el tamaño final.
+    """
+    from src.gcts import WEATHER_DATASETS, GLDAS_NLAT, GLDAS_NLON, ensure_authenticated
+
+    ensure_authenticated()
+    variables = [config["variable"] for config in WEATHER_DATASETS.values()]
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Máscara de tierra: celdas con temperatura válida en el primer granulo
+    fields = _read_fields(pd.Timestamp(years[0], 1, 1), variables)
+    if fields is None:
+        raise RuntimeError(f"No se pudo leer el primer granulo de {years[0]} para la máscara de tierra")
+    land = np.isfinite(fields["Tair_f_inst"]).ravel()
+
+    cells = np.full(GLDAS_NLAT * GLDAS_NLON, -1, dtype=np.int32)
+    land_idx = np.flatnonzero(land)
+    cells[land_idx] = np.arange(land_idx.size, dtype=np.int32)
+    np.save(os.path.join(out_dir, "cells.npy"), cells.reshape(GLDAS_NLAT, GLDAS_NLON))
+
+    shape = (land_idx.size, DAYS, SLOTS, len(variables))
+    values = np.memmap(os.path.join(out_dir, "values.dat"), dtype=np.int16, mode="w+", shape=shape)
+    values[:] = FILL
+
+    total = DAYS * SLOTS * len(years)
+    done = 0
+    started = time.monotonic()
+    print(f"🏗️  Construyendo climatología: {land_idx.size} celdas de tierra, años {years[0]}-{years[-1]}")
+
+    for day in range(DAYS):
+        date = pd.Timestamp(2024, 1, 1) + pd.Timedelta(days=day)
+        for slot in range(SLOTS):
+            sums = np.zeros((land_idx.size, len(variables)))
+            counts = np.zeros((land_idx.size, len(variables)))
+
+            for year in years:
+                done += 1
+                try:
+                    moment = pd.Timestamp(year, date.month, date.day, slot * SLOT_HOURS)
+                except ValueError:
+                    continue  # 29 de febrero en año no bisiesto
+
+                fields = _read_fields(moment, variables)
+                if fields is None:
+                    print(f"⚠️  Granulo faltante: {moment}")
+                    continue
+
+                for k, name in enumerate(variables):
+                    column = fields[name].ravel()[land_idx]
+                    valid = np.isfinite(column)
+                    sums[valid, k] += column[valid]
+                    counts[valid, k] += 1
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = sums / counts
+            for k, name in enumerate(variables):
+                values[:, day, slot, k] = _quantize(means[:, k], name)
+
+            elapsed = time.monotonic() - started
+            eta = elapsed / done * (total - done)
+            print(f"📈 [{done}/{total}] {done / total * 100:.1f}% - día {day + 1}, slot {slot} - ETA {eta / 60:.1f} min")
+
+        values.flush()
+
+    meta = {
+        "collection": COLLECTION,
+        "variables": variables,
+        "years": years,
+        "shape": list(shape),
+        "dtype": "int16",
+        "quantization": {name: list(QUANTIZATION_RANGES[name]) for name in variables},
+        "created": pd.Timestamp.now().isoformat(),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"✅ Climatología construida en {out_dir} ({store_size(out_dir) / 1024**3:.2f} GB)")
+
+
+def store_size(path):
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in ("meta.json", "cells.npy", "values.dat")
+        if os.path.exists(os.path.join(path, name))
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Climatología GLDAS precalculada")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Construir el almacén desde los granulos de NASA")
+    build.add_argument("--years", required=True, help="Rango '2015-2024' o lista '2020,2022'")
+    build.add_argument("--out", default=CLIMATOLOGY_STORE_DIR)
+
+    info = sub.add_parser("info", help="Mostrar información del almacén")
+    info.add_argument("--path", default=CLIMATOLOGY_STORE_DIR)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        build_store(_parse_years(args.years), args.out)
+    else:
+        store = ClimatologyStore(args.path)
+        print(json.dumps(store.meta, indent=2))
+        print(f"Tamaño: {store_size(args.path) / 1024**3:.2f} GB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
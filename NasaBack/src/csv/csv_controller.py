@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import Literal
 # Cambiar FileResponse e importar StreamingResponse
 from fastapi.responses import StreamingResponse 
+from starlette.concurrency import run_in_threadpool
 from entitys.models import Location, WeatherData
-from src.csv.csv_service import generate_weather_csv
-import io # Solo necesario si se usa StringIO aquí, pero mejor si el servicio lo maneja
+from src.csv.csv_service import generate_weather_export
 # Eliminar las importaciones de os y tempfile
 
 csv_router = APIRouter()
@@ -11,30 +12,33 @@ csv_router = APIRouter()
 @csv_router.post("/generate/")
 async def generate_csv_endpoint(
     location: Location,
-    data: WeatherData
+    data: WeatherData,
+    format: Literal["csv", "parquet", "arrow"] = Query("csv")
 ):
     """
-    Genera un archivo CSV con datos meteorológicos para una ubicación y período específicos
-    y lo retorna directamente.
+    Genera un archivo CSV (o Parquet / Arrow con format=parquet|arrow) con
+    datos meteorológicos para una ubicación y período específicos y lo
+    retorna directamente.
     """
     try:
-        # Generar CSV usando la función. Recibe el nombre y el contenido CSV como string.
-        filename, csv_content = generate_weather_csv(
+        # Alinear los datos (numpy) en el threadpool para no bloquear el event loop
+        filename, media_type, chunks = await run_in_threadpool(
+            generate_weather_export,
             lat=location.lat,
             lon=location.lon,
-            weather_data=data
+            weather_data=data,
+            file_format=format
         )
-        
-        # --- MODIFICACIÓN CLAVE: Usar StreamingResponse para retornar el contenido directamente ---
-        # El contenido debe ser un iterable (como una lista con la cadena CSV)
-        # Se añaden los headers de Content-Disposition para que el navegador lo descargue con el nombre correcto
-        return StreamingResponse(
-            iter([csv_content]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Si hay un error, devolvemos un mensaje de error
-        # Se elimina el manejo de borrado de archivos temporales
-        raise HTTPException(status_code=500, detail=f"Error generando CSV: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error generando CSV: {str(e)}")
+
+    # El generador escribe por bloques: StreamingResponse lo consume en el
+    # threadpool y envía cada bloque en cuanto está listo
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -1,52 +1,124 @@
-import netrc
-import requests
-from requests.auth import HTTPBasicAuth
-import os
-import io
-import sys
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from entitys.models import WeatherData
+from src.weather_frame import WeatherFrame
 
-from src.gcts import get_weather_data
+# Filas por bloque al escribir: la memoria de la exportación no crece con el tamaño
+CHUNK_ROWS = 5000
 
-def generate_weather_csv(lat: float, lon: float, weather_data: WeatherData):
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.stream"),
+}
+
+def weather_frame_from_data(weather_data: WeatherData):
     """
-    Transforma un objeto WeatherData a un archivo CSV.
-    Retorna el nombre del archivo y el *contenido CSV como una cadena*.
+    Un solo frame columnar: eje de timestamps compartido (ordenado) y una
+    columna por variable, sin un DataFrame ni un merge por variable.
+    Los valores quedan en float64 (la precisión con que llegan), así el
+    CSV sale con los mismos dígitos que escribían los DataFrames.
     """
-    # Convertir el modelo WeatherData en un diccionario
     weather_data_dict = weather_data.model_dump()
-    
-    # Crear una lista para almacenar los DataFrames de cada variable
-    data_frames = []
-    timestamps = set() 
-    
-    for var_name, var_info in weather_data_dict.items():
-        # Para cada variable meteorológica, crear un DataFrame
-        df = pd.DataFrame(var_info.items(), columns=["Timestamp", var_name])
-        timestamps.update(df["Timestamp"]) # Añadir los timestamps al conjunto de timestamps
-        
-        data_frames.append(df) # Añadir el DataFrame de la variable a la lista
-    
-    # Convertir el set de timestamps a lista y ordenar las fechas
-    timestamps = sorted(list(timestamps))
-    
-    # Crear un DataFrame vacío con la columna 'Timestamp'
-    consolidated_df = pd.DataFrame(timestamps, columns=["Timestamp"])
-    
-    # Unir los DataFrames de cada variable por la columna 'Timestamp'
-    for df in data_frames:
-        consolidated_df = pd.merge(consolidated_df, df, on="Timestamp", how="left")
-    
-    # Generar el nombre del archivo CSV
-    filename = f'datos_meteorologicos_lat{lat}_lon{lon}.csv'
-    
-    # --- MODIFICACIÓN CLAVE: Guardar el DataFrame a un buffer en memoria (StringIO) ---
-    csv_buffer = io.StringIO()
-    consolidated_df.to_csv(csv_buffer, index=False)
-    csv_content = csv_buffer.getvalue()
-    
-    # Retornar el nombre del archivo y el CONTENIDO CSV
-    return filename, csv_content # <--- Retorna el contenido como string, NO el DataFrame
+    return WeatherFrame.from_columns({
+        var_name: (np.array(list(var_info.keys())), np.array(list(var_info.values()), dtype=np.float64))
+        for var_name, var_info in weather_data_dict.items()
+    })
+
+def iter_weather_csv(frame: WeatherFrame, chunk_rows: int = CHUNK_ROWS):
+    """
+    Genera el CSV por bloques de chunk_rows filas (cabecera en el primero).
+    """
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        chunk = WeatherFrame(
+            frame.times[start:start + chunk_rows],
+            frame.variables,
+            frame.values[start:start + chunk_rows]
+        )
+        yield chunk.to_dataframe(time_column="Timestamp").to_csv(index=False, header=start == 0)
+
+class _BufferSink:
+    """
+    Destino de escritura para pyarrow que acumula los bytes escritos hasta
+    que el generador los entrega (drain).
+    """
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Los formatos parquet y arrow requieren pyarrow (pip install pyarrow)")
+    return pa, pq
+
+def iter_weather_arrow(frame: WeatherFrame, file_format: str, chunk_rows: int = CHUNK_ROWS):
+    """
+    Genera el archivo Parquet o Arrow (IPC stream) por bloques: cada bloque
+    de filas se escribe como un record batch y se entrega en cuanto se escribe.
+    """
+    pa, pq = _import_pyarrow()
+
+    time_type = pa.from_numpy_dtype(frame.times.dtype) if frame.times.dtype.kind == "M" else pa.string()
+    value_type = pa.from_numpy_dtype(frame.values.dtype)
+    schema = pa.schema(
+        [("Timestamp", time_type)] + [(name, value_type) for name in frame.variables]
+    )
+
+    sink = _BufferSink()
+    writer = pq.ParquetWriter(sink, schema) if file_format == "parquet" else pa.ipc.new_stream(sink, schema)
+    try:
+        for start in range(0, len(frame), chunk_rows):
+            times = frame.times[start:start + chunk_rows]
+            values = frame.values[start:start + chunk_rows]
+            columns = [pa.array(times if time_type != pa.string() else times.astype(str), type=time_type)]
+            columns += [
+                pa.array(values[:, k], type=value_type, from_pandas=True)  # NaN -> null
+                for k in range(values.shape[1])
+            ]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def generate_weather_export(lat: float, lon: float, weather_data: WeatherData, file_format: str = "csv"):
+    """
+    Prepara la exportación de un objeto WeatherData en el formato pedido.
+    Retorna (nombre de archivo, media type, generador de bloques).
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {file_format}. Disponibles: {list(EXPORT_FORMATS)}")
+    extension, media_type = EXPORT_FORMATS[file_format]
+    if file_format != "csv":
+        _import_pyarrow()  # Falla aquí (antes de empezar la respuesta) si no está instalado
+
+    frame = weather_frame_from_data(weather_data)
+    filename = f'datos_meteorologicos_lat{lat}_lon{lon}.{extension}'
+
+    if file_format == "csv":
+        return filename, media_type, iter_weather_csv(frame)
+    return filename, media_type, iter_weather_arrow(frame, file_format)
@@ -1,19 +1,26 @@
-import earthaccess
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import xarray as xr
 from datetime import datetime, timedelta
 import warnings
 import os
-# CLAVE: Cambiar threading por multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed 
-import sys # Necesario para redireccionar stdout si es necesario para print()
+import asyncio
+# Pool temporal solo para uso como script; la app usa el pool de nasa_pool
+from concurrent.futures import ProcessPoolExecutor
 
 
 warnings.filterwarnings('ignore')
 
-from config import NASA_USERNAME, NASA_PASSWORD
+from config import (
+    NASA_USERNAME, NASA_PASSWORD, POINT_CACHE_TTL, POINT_CACHE_MAX_BYTES, CHUNK_INDEX_ENABLED,
+    SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_BYTES, GRANULE_RESOLVE_MIN_AGE_DAYS, NASA_MAX_CONCURRENT_FETCHES,
+    WEATHER_PROVIDER
+)
+from src import nasa_pool
+from src.chunk_index import get_chunk_index, read_point
+from src.granule_cache import get_granule_cache
+from src.result_cache import MemoryTTLCache
+from src.singleflight import SingleFlight
+from src.weather_frame import WeatherFrame
 
 # Configuración de ubicación y tiempo
 lat = 31.8578
@@ -81,6 +88,42 @@ WEATHER_DATASETS = {
     }
 }
 
+# Malla de GLDAS 0.25°: centros de celda desde -59.875 (lat) y -179.875 (lon)
+GLDAS_RESOLUTION = 0.25
+GLDAS_LAT_ORIGIN = -59.875
+GLDAS_LON_ORIGIN = -179.875
+GLDAS_NLAT = 600
+GLDAS_NLON = 1440
+
+def _nearest_index(value, origin, size):
+    """
+    Índice del centro más cercano a value en la malla origin + k * resolución.
+    Igual que sel(method='nearest') de xarray (pandas): en un empate a media
+    celda gana el índice mayor.
+    """
+    k = min(max(int(np.floor((value - origin) / GLDAS_RESOLUTION)), 0), size - 1)
+    if k + 1 < size:
+        left = abs(value - (origin + k * GLDAS_RESOLUTION))
+        right = abs(origin + (k + 1) * GLDAS_RESOLUTION - value)
+        if right <= left:
+            k += 1
+    return k
+
+def grid_cell(lat, lon):
+    """
+    Índice (fila, columna) de la celda GLDAS más cercana al punto,
+    el mismo punto que elige sel(method='nearest'). Es la única regla de
+    celda: la lectura por byte ranges recibe estos índices.
+    """
+    return (
+        _nearest_index(lat, GLDAS_LAT_ORIGIN, GLDAS_NLAT),
+        _nearest_index(lon, GLDAS_LON_ORIGIN, GLDAS_NLON),
+    )
+
+
+# Series ya extraídas por (celda, ventana de tiempo): un WeatherFrame por entrada
+point_cache = MemoryTTLCache(POINT_CACHE_MAX_BYTES, POINT_CACHE_TTL, sizeof=lambda frame: frame.nbytes)
+
 def authenticate_earthdata():
     """
     Autenticación con earthaccess usando la estrategia 'environment' 
@@ -89,6 +132,8 @@ def authenticate_earthdata():
     CLAVE: Esta función ahora se llamará dentro de cada PROCESO, 
     asegurando una sesión limpia e independiente.
     """
+    import earthaccess
+
 
     if not NASA_USERNAME or not NASA_PASSWORD:
         raise Exception("❌ Error: NASA_USERNAME o NASA_PASSWORD no se cargaron correctamente desde .env/config.")
@@ -115,35 +160,137 @@ def authenticate_earthdata():
         raise Exception("❌ Error en la autenticación. No se pudo iniciar sesión.")
 
 
-def search_and_open_data(collection_name, start_date, end_date, lat, lon, max_files=2):
+# Sesión de Earthdata del proceso actual (se reutiliza entre tareas del pool)
+_auth = None
+
+def ensure_authenticated():
     """
-    Busca y abre datos como datasets de xarray.
+    Autentica solo si este proceso aún no tiene una sesión válida.
+    Los procesos del pool hacen login una vez y la conservan.
     """
-    try:
-       
-        authenticate_earthdata()
+    global _auth
+
+    if _auth is None or not _auth.authenticated:
+        _auth = authenticate_earthdata()
+    return _auth
+
+
+# Colecciones cuyos granulos se pueden resolver directamente desde el
+# timestamp (nombre y URL predecibles), sin consultar CMR.
+GRANULE_NAMING = {
+    "GLDAS_NOAH025_3H": {
+        "step_hours": 3,
+        "granule_ur": "GLDAS_NOAH025_3H.2.1:GLDAS_NOAH025_3H.A{time:%Y%m%d}.{time:%H%M}.021.nc4",
+        "url": "https://data.gesdisc.earthdata.nasa.gov/data/GLDAS/GLDAS_NOAH025_3H.2.1/{time:%Y}/{time:%j}/GLDAS_NOAH025_3H.A{time:%Y%m%d}.{time:%H%M}.021.nc4",
+    }
+}
+
+# Resultados de búsqueda en CMR por (colección, ventana de tiempo)
+search_cache = MemoryTTLCache(SEARCH_CACHE_MAX_BYTES, SEARCH_CACHE_TTL, sizeof=lambda refs: 64 + 512 * len(refs))
+
+
+def _granule_ref(granule):
+    """
+    Referencia mínima (y serializable) de un granulo de earthaccess:
+    ID estable (GranuleUR de CMR) y URL HTTPS de descarga.
+    """
+    granule_ur = granule['umm']['GranuleUR']
+    links = granule.data_links(access="external")
+    if not links:
+        raise ValueError(f"El granulo {granule_ur} no tiene enlaces de descarga")
+    return {'id': granule_ur, 'url': links[0]}
+
+
+def resolve_granules(collection_name, start_date, end_date):
+    """
+    Construye las referencias de granulos a partir de los timestamps cuando
+    la colección tiene nombres predecibles (ver GRANULE_NAMING).
+    Retorna None si la colección no se puede resolver así o si el período es
+    demasiado reciente (los granulos podrían no estar publicados aún).
+    """
+    naming = GRANULE_NAMING.get(collection_name)
+    if naming is None:
+        return None
+
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    if end > pd.Timestamp.now() - pd.Timedelta(days=GRANULE_RESOLVE_MIN_AGE_DAYS):
+        return None
+
+    step = pd.Timedelta(hours=naming['step_hours'])
+    first = start.floor(step)
+    times = pd.date_range(first, end, freq=step)
+
+    return [
+        {'id': naming['granule_ur'].format(time=t), 'url': naming['url'].format(time=t)}
+        for t in times
+    ]
+
 
+def search_granules(collection_name, start_date, end_date, lat, lon, max_files=2):
+    """
+    Busca los granulos de la colección en el período.
+    Primero intenta resolverlos desde el timestamp; si no se puede, consulta
+    CMR (memoizado en search_cache). Los granulos de GLDAS son globales, así
+    que la búsqueda no depende de lat/lon.
+    Retorna la lista de referencias {'id', 'url'} limitada a max_files o
+    None si no hay resultados.
+    """
+    import earthaccess
+
+    ensure_authenticated()
+
+    key = (collection_name, start_date, end_date)
+    results = resolve_granules(collection_name, start_date, end_date)
+
+    if results is not None:
+        print(f"[{collection_name}] 🧭 Granulos resueltos desde el timestamp")
+    else:
+        results = search_cache.get(key)
+
+    if results is not None:
+        if results:
+            print(f"[{collection_name}] ♻️  Búsqueda en caché: {len(results)} archivos")
+    else:
         print(f"[{collection_name}] 🔍 Buscando datos...")
         
-        # Buscar archivos
-        results = earthaccess.search_data(
-            short_name=collection_name,
-            temporal=(start_date, end_date),
-            bounding_box=(lon-5.0, lat-5.0, lon+5.0, lat+5.0)
-        )
-        
-        if not results:
-            print(f"[{collection_name}] ⚠️  No se encontraron datos")
-            return None
-            
-        print(f"[{collection_name}] 📦 Encontrados {len(results)} archivos")
-        
-        # Limitar archivos para evitar problemas de memoria
-        limited_results = results[:max_files]
-        print(f"[{collection_name}] 📥 Procesando {len(limited_results)} archivos")
+        # Buscar archivos (colección global: sin bounding box)
+        results = [
+            _granule_ref(granule)
+            for granule in earthaccess.search_data(
+                short_name=collection_name,
+                temporal=(start_date, end_date)
+            )
+        ]
+        search_cache.set(key, results)
+    
+    if not results:
+        print(f"[{collection_name}] ⚠️  No se encontraron datos")
+        return None
         
+    print(f"[{collection_name}] 📦 Encontrados {len(results)} archivos")
+    
+    # Limitar archivos para evitar problemas de memoria
+    limited_results = results[:max_files]
+    print(f"[{collection_name}] 📥 Procesando {len(limited_results)} archivos")
+    return limited_results
+
+
+def open_granules(collection_name, granules):
+    """
+    Abre los granulos como datasets de xarray (desde la caché en disco si
+    está activa, o por streaming con earthaccess.open).
+    """
+    import earthaccess
+    import xarray as xr
+
+    cache = get_granule_cache()
+    if cache is not None:
+        # Granulos desde la caché en disco (se descargan solo si faltan)
+        datasets = _open_cached_datasets(cache, collection_name, granules)
+    else:
         # CLAVE: earthaccess.open debe ejecutarse dentro de cada proceso
-        files = earthaccess.open(limited_results)
+        files = earthaccess.open([granule['url'] for granule in granules])
         
         if not files:
             print(f"[{collection_name}] ⚠️  No se pudieron abrir los archivos")
@@ -158,171 +305,717 @@ def search_and_open_data(collection_name, start_date, end_date, lat, lon, max_fi
             except Exception as e:
                 print(f"[{collection_name}] ❌ Error convirtiendo archivo {i+1}: {str(e)}")
                 continue
-        
-        if datasets:
-            print(f"[{collection_name}] ✅ {len(datasets)} datasets cargados como xarray exitosamente")
-            return datasets
-        else:
-            print(f"[{collection_name}] ❌ No se pudieron convertir archivos a datasets")
-            return None
-        
+    
+    if datasets:
+        print(f"[{collection_name}] ✅ {len(datasets)} datasets cargados como xarray exitosamente")
+        return datasets
+    else:
+        print(f"[{collection_name}] ❌ No se pudieron convertir archivos a datasets")
+        return None
+
+
+def _concat_columns(collected):
+    """
+    Une las series parciales {variable: [(tiempos, valores), ...]} de cada
+    granulo en {variable: (tiempos, valores)}, sin NaN y ordenadas por tiempo.
+    """
+    results = {}
+    for name, parts in collected.items():
+        if not parts:
+            continue
+        times = np.concatenate([t for t, _ in parts])
+        values = np.concatenate([v for _, v in parts]).astype(np.float32)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            continue
+        order = np.argsort(times[valid], kind='stable')
+        results[name] = (times[valid][order], values[valid][order])
+    return results
+
+
+def read_points_with_index(collection_name, granules, variable_names, points):
+    """
+    Lee los puntos de cada granulo usando el índice de chunks y peticiones
+    HTTP Range (solo los chunks que contienen cada celda); el índice de cada
+    granulo se carga una vez para todos los puntos.
+    Retorna una lista (una entrada por punto) de {variable: (tiempos, valores)}
+    o None si no se pudo (se usa entonces la lectura completa del granulo).
+    """
+    import earthaccess
+
+    cells = [grid_cell(lat, lon) for lat, lon in points]
+    try:
+        fs = earthaccess.get_fsspec_https_session()
+        session = earthaccess.get_requests_https_session()
+
+        collected = [{name: [] for name in variable_names} for _ in points]
+        for granule in granules:
+            index = get_chunk_index(granule['id'], granule['url'], fs)
+            for (i, j), point_collected in zip(cells, collected):
+                for name, column in read_point(index, session, variable_names, i, j).items():
+                    point_collected[name].append(column)
+
     except Exception as e:
-        # Redirigir el error más claro para el diagnóstico
-        print(f"[{collection_name}] ❌ Error general procesando: {type(e).__name__}: {str(e)}")
+        print(f"[{collection_name}] ⚠️  Lectura por byte ranges no disponible: {type(e).__name__}: {str(e)}")
         return None
 
+    results = [_concat_columns(point_collected) for point_collected in collected]
+    print(f"[{collection_name}] ✅ {len(points)} puntos leídos por byte ranges de {len(granules)} granulos")
+    return results
+
+
+def read_point_with_index(collection_name, granules, variable_names, lat, lon):
+    """
+    read_points_with_index para un solo punto: {variable: (tiempos, valores)}
+    o None si no se pudo.
+    """
+    results = read_points_with_index(collection_name, granules, variable_names, [(lat, lon)])
+    return None if results is None else results[0]
+
+
+def _split_cached_granules(granules):
+    """
+    Separa los granulos en (rutas locales de los que ya están en la caché en
+    disco, granulos que faltan). Sin caché todos faltan.
+    """
+    cache = get_granule_cache()
+    if cache is None:
+        return [], list(granules)
+
+    cached, missing = [], []
+    for granule in granules:
+        path = cache.get(granule['id'])
+        if path is None:
+            missing.append(granule)
+        else:
+            cached.append(path)
+    return cached, missing
+
+
+def _open_cached_paths(collection_name, paths):
+    import xarray as xr
+
+    datasets = []
+    for path in paths:
+        try:
+            datasets.append(xr.open_dataset(path))
+        except Exception as e:
+            print(f"[{collection_name}] ❌ Error abriendo granulo desde caché: {str(e)}")
+
+    print(f"[{collection_name}] ♻️  {len(datasets)} granulos leídos desde la caché en disco")
+    return datasets
 
 
-def extract_point_data_fixed(datasets, variable_name, lat, lon):
+def _read_cached_point(collection_name, paths, variable_names, lat, lon):
     """
-    Extrae datos para un punto específico - Función sin cambios
+    Extrae el punto de granulos que ya están en la caché en disco.
     """
-    var_name_tag = variable_name.split('_')[0] 
+    datasets = _open_cached_paths(collection_name, paths)
     try:
-        print(f"[{var_name_tag}] 🔧 Extrayendo variable '{variable_name}'")
-        
-        all_data = []
-        
-        for i, ds in enumerate(datasets):
-            try:
-                if not isinstance(ds, xr.Dataset):
-                    print(f"[{var_name_tag}] ❌ Dataset {i+1} no es xarray.Dataset válido")
-                    continue
-                
-                if variable_name not in ds.data_vars:
-                    print(f"[{var_name_tag}] ⚠️  Variable '{variable_name}' no encontrada")
-                    continue
-                
-                lat_coords = [c for c in ds.coords if 'lat' in c.lower()]
-                lon_coords = [c for c in ds.coords if 'lon' in c.lower()]
-                
-                if not lat_coords or not lon_coords:
-                    print(f"[{var_name_tag}] ⚠️  Coordenadas lat/lon no encontradas")
-                    continue
-                
-                lat_coord = lat_coords[0]
-                lon_coord = lon_coords[0]
-                
-                try:
-                    point_data = ds.sel({lat_coord: lat, lon_coord: lon}, method='nearest')
-                    
-                    if variable_name in point_data:
-                        var_data = point_data[variable_name]
-                        
-                        df = var_data.to_dataframe().reset_index()
-                        
-                        if not df.empty and variable_name in df.columns:
-                            valid_data = df[df[variable_name].notna()]
-                            if not valid_data.empty:
-                                all_data.append(valid_data)
-                        
-                except Exception as e:
-                    print(f"[{var_name_tag}] ❌ Error seleccionando punto: {str(e)}")
-                    continue
-                    
-            except Exception as e:
-                print(f"[{var_name_tag}] ❌ Error en dataset {i+1}: {str(e)}")
+        return extract_point_data_multi(datasets, variable_names, lat, lon)
+    finally:
+        for ds in datasets:
+            ds.close()
+
+
+def _read_cached_points(collection_name, paths, variable_names, points):
+    """
+    Extrae varios puntos de granulos que ya están en la caché en disco.
+    """
+    datasets = _open_cached_paths(collection_name, paths)
+    try:
+        return extract_points_data_multi(datasets, variable_names, points)
+    finally:
+        for ds in datasets:
+            ds.close()
+
+
+def _open_cached_datasets(cache, collection_name, granules):
+    """
+    Abre los granulos desde la caché en disco como datasets de xarray.
+    """
+    import earthaccess
+    import xarray as xr
+
+    session = earthaccess.get_requests_https_session()
+
+    datasets = []
+    for i, granule in enumerate(granules):
+        try:
+            path = cache.fetch(granule['id'], granule['url'], session)
+            datasets.append(xr.open_dataset(path))
+        except Exception as e:
+            print(f"[{collection_name}] ❌ Error abriendo granulo {i+1} desde caché: {str(e)}")
+            continue
+
+    stats = cache.stats()
+    print(f"[{collection_name}] 💾 Caché de granulos: {stats['hits']} hits, {stats['misses']} misses, {stats['bytes'] / 1024**2:.1f} MB")
+    return datasets
+
+
+def extract_point_data_multi(datasets, variable_names, lat, lon):
+    """
+    Extrae varias variables para un punto específico en una sola pasada.
+    Cada dataset se selecciona en el punto una sola vez y de ahí se toman
+    todas las variables pedidas.
+    Retorna un diccionario {variable: (tiempos, valores)} (solo variables con datos).
+    """
+    import xarray as xr
+
+    collected = {name: [] for name in variable_names}
+
+    for i, ds in enumerate(datasets):
+        try:
+            if not isinstance(ds, xr.Dataset):
+                print(f"[MULTI] ❌ Dataset {i+1} no es xarray.Dataset válido")
                 continue
-        
-        if all_data:
-            combined_df = pd.concat(all_data, ignore_index=True)
-            time_cols = [col for col in combined_df.columns if 'time' in col.lower()]
-            if time_cols:
-                combined_df = combined_df.sort_values(time_cols[0]).reset_index(drop=True)
-            
-            print(f"[{var_name_tag}] ✅ Datos combinados: {len(combined_df)} registros totales")
-            return combined_df
+
+            present = [name for name in variable_names if name in ds.data_vars]
+            missing = [name for name in variable_names if name not in ds.data_vars]
+            for name in missing:
+                print(f"[MULTI] ⚠️  Variable '{name}' no encontrada en dataset {i+1}")
+            if not present:
+                continue
+
+            lat_coords = [c for c in ds.coords if 'lat' in c.lower()]
+            lon_coords = [c for c in ds.coords if 'lon' in c.lower()]
+
+            if not lat_coords or not lon_coords:
+                print(f"[MULTI] ⚠️  Coordenadas lat/lon no encontradas")
+                continue
+
+            # Una sola selección del punto para todas las variables
+            point_data = ds[present].sel({lat_coords[0]: lat, lon_coords[0]: lon}, method='nearest').load()
+            times = np.atleast_1d(point_data['time'].values)
+
+            for name in present:
+                collected[name].append((times, np.atleast_1d(point_data[name].values)))
+
+        except Exception as e:
+            print(f"[MULTI] ❌ Error en dataset {i+1}: {str(e)}")
+            continue
+
+    results = _concat_columns(collected)
+    for name in variable_names:
+        if name in results:
+            print(f"[{name.split('_')[0]}] ✅ Datos combinados: {len(results[name][0])} registros totales")
         else:
-            print(f"[{var_name_tag}] ❌ No se extrajeron datos válidos")
-            return None
-            
-    except Exception as e:
-        print(f"[{var_name_tag}] ❌ Error extrayendo datos: {str(e)}")
-        return None
+            print(f"[{name.split('_')[0]}] ❌ No se extrajeron datos válidos")
+
+    return results
+
+def extract_points_data_multi(datasets, variable_names, points):
+    """
+    Extrae varias variables para varios puntos. De cada dataset se leen
+    todos los puntos con un solo isel vectorizado (arrays de índices de la
+    celda más cercana), en lugar de un sel por punto.
+    points es una lista de (lat, lon).
+    Retorna una lista (una entrada por punto) de {variable: (tiempos, valores)}.
+    """
+    import xarray as xr
+
+    collected = [{name: [] for name in variable_names} for _ in points]
+    lats = np.array([p[0] for p in points], dtype=float)
+    lons = np.array([p[1] for p in points], dtype=float)
+
+    for i, ds in enumerate(datasets):
+        try:
+            present = [name for name in variable_names if name in ds.data_vars]
+            if not present:
+                print(f"[BATCH] ⚠️  Ninguna variable pedida en dataset {i+1}")
+                continue
+
+            lat_coords = [c for c in ds.coords if 'lat' in c.lower()]
+            lon_coords = [c for c in ds.coords if 'lon' in c.lower()]
+            if not lat_coords or not lon_coords:
+                print(f"[BATCH] ⚠️  Coordenadas lat/lon no encontradas")
+                continue
+            lat_name, lon_name = lat_coords[0], lon_coords[0]
+
+            lat_idx = ds.indexes[lat_name].get_indexer(lats, method='nearest')
+            lon_idx = ds.indexes[lon_name].get_indexer(lons, method='nearest')
+
+            # Un solo isel para todos los puntos: dimensiones (..., point)
+            selected = ds[present].isel({
+                lat_name: xr.DataArray(lat_idx, dims='point'),
+                lon_name: xr.DataArray(lon_idx, dims='point'),
+            }).load()
+
+            times = np.atleast_1d(selected['time'].values)
+            for name in present:
+                values = selected[name].transpose('point', ...).values.reshape(len(points), -1)
+                for j in range(len(points)):
+                    collected[j][name].append((times, values[j]))
+
+        except Exception as e:
+            print(f"[BATCH] ❌ Error en dataset {i+1}: {str(e)}")
+            continue
+
+    print(f"[BATCH] ✅ {len(points)} puntos extraídos de {len(datasets)} datasets")
+    return [_concat_columns(point_collected) for point_collected in collected]
 
 # --- IMPLEMENTACIÓN DE PROCESOS ---
 
-def _process_get_data(var_name, config, lat, lon, start_date, end_date):
+def _group_by_collection(datasets_config):
+    """
+    Agrupa las variables de WEATHER_DATASETS por colección, para que cada
+    colección se busque y se abra una sola vez.
+    """
+    groups = {}
+    for var_name, config in datasets_config.items():
+        groups.setdefault(config['collection'], {})[var_name] = config
+    return groups
+
+def _collection_frame(configs, columns, lat, lon):
+    """
+    WeatherFrame de una colección a partir de {código GLDAS: (tiempos, valores)},
+    con los nombres y metadatos de WEATHER_DATASETS.
+    """
+    frame_columns = {}
+    for var_name, config in configs.items():
+        column = columns.get(config['variable'])
+        if column is not None:
+            frame_columns[var_name] = column
+
+    i, j = grid_cell(lat, lon)
+    return WeatherFrame.from_columns(
+        frame_columns,
+        meta={var_name: configs[var_name] for var_name in frame_columns},
+        lat=GLDAS_LAT_ORIGIN + i * GLDAS_RESOLUTION,
+        lon=GLDAS_LON_ORIGIN + j * GLDAS_RESOLUTION,
+    )
+
+def _merge_parts(parts, variable_names):
+    """
+    Une las lecturas {variable: (tiempos, valores)} de los distintos grupos
+    de granulos (caché en disco, byte ranges, granulos completos).
+    """
+    if len(parts) == 1:
+        return parts[0]
+    return _concat_columns({name: [part[name] for part in parts if name in part] for name in variable_names})
+
+def _process_get_collection_data(collection_name, configs, lat, lon, start_date, end_date, max_files=2):
     """
     Función auxiliar para ser ejecutada por cada PROCESO.
-    Retorna (var_name, data_dict) o (var_name, None).
+    Busca los archivos de una colección UNA sola vez y extrae todas sus
+    variables en una pasada (por byte ranges o abriendo el granulo).
+    Retorna un WeatherFrame con las variables de la colección.
     """
     try:
-        # Nota: La autenticación se realiza dentro de search_and_open_data 
-        # para asegurar que cada proceso hijo tiene su propia sesión.
+        # Nota: La autenticación se realiza dentro de search_granules;
+        # los procesos del pool reutilizan la sesión iniciada al arrancar.
         
-        print(f"\n📊 [PROCESS: {var_name}] Procesando: {var_name}")
+        print(f"\n📊 [PROCESS: {collection_name}] Procesando {len(configs)} variables")
         
-        # 1. Buscar y abrir datos
-        datasets = search_and_open_data(
-            config['collection'], 
+        # 1. Buscar los granulos (una vez por colección)
+        granules = search_granules(
+            collection_name, 
             start_date, 
             end_date, 
             lat, 
             lon,
-            max_files=2
+            max_files=max_files
         )
         
-        if datasets:
-            # 2. Extraer datos del punto
-            point_data = extract_point_data_fixed(datasets, config['variable'], lat, lon)
-            
-            if point_data is not None and not point_data.empty:
-                result_data = {
-                    'data': point_data,
-                    'variable': config['variable'],
-                    'description': config['description'],
-                    'units': config['units'],
-                    'collection': config['collection']
-                }
-                print(f"🎉 [PROCESS: {var_name}] EXITOSO: {len(point_data)} registros")
-                return var_name, result_data
+        if not granules:
+            print(f"❌ [PROCESS: {collection_name}] No se encontraron granulos")
+            return WeatherFrame.empty()
+
+        variable_names = [config['variable'] for config in configs.values()]
+
+        # 2. Los granulos que ya están en la caché en disco se leen de ahí
+        parts = []
+        cached, missing = _split_cached_granules(granules)
+        if cached:
+            parts.append(_read_cached_point(collection_name, cached, variable_names, lat, lon))
+
+        # 3. Los que faltan: solo los chunks de la celda mediante byte ranges
+        if missing and CHUNK_INDEX_ENABLED:
+            point_data = read_point_with_index(collection_name, missing, variable_names, lat, lon)
+            if point_data is not None:
+                parts.append(point_data)
+                missing = []
+
+        # 4. Si no se pudo, abrir los granulos completos y extraer en una pasada
+        if missing:
+            datasets = open_granules(collection_name, missing)
+            if datasets:
+                parts.append(extract_point_data_multi(datasets, variable_names, lat, lon))
+                for ds in datasets:
+                    ds.close()
+            elif not parts:
+                print(f"❌ [PROCESS: {collection_name}] No se abrieron datasets")
+                return WeatherFrame.empty()
+
+        point_data_by_variable = _merge_parts(parts, variable_names)
+
+        frame = _collection_frame(configs, point_data_by_variable, lat, lon)
+        for var_name in configs:
+            if var_name in frame:
+                print(f"🎉 [PROCESS: {collection_name}] {var_name} EXITOSO: {len(frame.valid(var_name)[0])} registros")
             else:
-                print(f"❌ [PROCESS: {var_name}] No se extrajeron datos para {var_name}")
-                return var_name, None
-        else:
-            print(f"❌ [PROCESS: {var_name}] No se abrieron datasets para {var_name}")
-            return var_name, None
+                print(f"❌ [PROCESS: {collection_name}] No se extrajeron datos para {var_name}")
+
+        return frame
             
     except Exception as e:
-        print(f"❌ [PROCESS: {var_name}] Error procesando: {str(e)}")
-        return var_name, None
+        print(f"❌ [PROCESS: {collection_name}] Error procesando: {str(e)}")
+        return WeatherFrame.empty()
+
+def _process_get_collection_points(collection_name, configs, points, start_date, end_date, max_files=2):
+    """
+    Como _process_get_collection_data pero para varios puntos: los granulos
+    se buscan una sola vez y se leen en el mismo orden (caché en disco, byte
+    ranges de las celdas, granulos completos solo como último recurso),
+    cada uno para todos los puntos.
+    Retorna una lista de WeatherFrame (uno por punto).
+    """
+    try:
+        print(f"\n📊 [PROCESS: {collection_name}] {len(points)} puntos, {len(configs)} variables")
+
+        lat, lon = points[0]
+        granules = search_granules(collection_name, start_date, end_date, lat, lon, max_files=max_files)
+        if not granules:
+            print(f"❌ [PROCESS: {collection_name}] No se encontraron granulos")
+            return [WeatherFrame.empty() for _ in points]
+
+        variable_names = [config['variable'] for config in configs.values()]
+
+        # Cada parte es una lista (una entrada por punto) de {variable: (tiempos, valores)}
+        parts = []
+        cached, missing = _split_cached_granules(granules)
+        if cached:
+            parts.append(_read_cached_points(collection_name, cached, variable_names, points))
+
+        if missing and CHUNK_INDEX_ENABLED:
+            points_data = read_points_with_index(collection_name, missing, variable_names, points)
+            if points_data is not None:
+                parts.append(points_data)
+                missing = []
+
+        if missing:
+            datasets = open_granules(collection_name, missing)
+            if datasets:
+                parts.append(extract_points_data_multi(datasets, variable_names, points))
+                for ds in datasets:
+                    ds.close()
+            elif not parts:
+                print(f"❌ [PROCESS: {collection_name}] No se abrieron datasets")
+                return [WeatherFrame.empty() for _ in points]
+
+        return [
+            _collection_frame(configs, _merge_parts([part[k] for part in parts], variable_names), lat, lon)
+            for k, (lat, lon) in enumerate(points)
+        ]
+
+    except Exception as e:
+        print(f"❌ [PROCESS: {collection_name}] Error procesando puntos: {str(e)}")
+        return [WeatherFrame.empty() for _ in points]
 
-def get_weather_data(lat, lon, start_date, end_date):
+def _block_mean(values, stride):
+    """
+    Reduce una matriz 2-D promediando bloques de stride x stride (ignora NaN).
+    Los bordes se completan con NaN hasta un múltiplo de stride.
     """
-    Función principal para obtener datos meteorológicos, optimizada con PROCESOS.
+    if stride == 1:
+        return values.astype(np.float32)
+
+    rows = -(-values.shape[0] // stride) * stride
+    cols = -(-values.shape[1] // stride) * stride
+    padded = np.full((rows, cols), np.nan, dtype=np.float32)
+    padded[:values.shape[0], :values.shape[1]] = values
+
+    blocks = padded.reshape(rows // stride, stride, cols // stride, stride)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Bloques sin datos (océano)
+        return np.nanmean(blocks, axis=(1, 3)).astype(np.float32)
+
+def _process_read_area(collection_name, moment, variable_names, rows, cols, stride):
+    """
+    Lee un rectángulo de la malla (rows y cols son rangos de índices
+    [inicio, fin)) del granulo del momento con un solo isel, y lo reduce
+    por bloques de stride celdas.
+    Retorna {variable: matriz float32} (filas de sur a norte).
+    """
+    granules = search_granules(collection_name, moment, moment, 0, 0, max_files=1)
+    if not granules:
+        raise ValueError(f"No hay datos de {collection_name} para {moment}")
+
+    datasets = open_granules(collection_name, granules)
+    if not datasets:
+        raise ValueError(f"No se pudo abrir el granulo de {collection_name} para {moment}")
+    ds = datasets[0]
+
+    try:
+        present = [name for name in variable_names if name in ds.data_vars]
+        subset = ds[present].isel(
+            time=0,
+            lat=slice(rows[0], rows[1]),
+            lon=slice(cols[0], cols[1]),
+        ).load()
+        print(f"[{collection_name}] 🗺️  Área {rows[1] - rows[0]}x{cols[1] - cols[0]} celdas, stride {stride}")
+        return {name: _block_mean(subset[name].values, stride) for name in present}
+    finally:
+        ds.close()
+
+def _giovanni_frame(columns, lat, lon):
+    """
+    WeatherFrame desde las series de Giovanni ({código completo: (tiempos, valores)}).
+    """
+    by_variable = {
+        config['variable']: columns[config['full_code']]
+        for config in WEATHER_DATASETS.values()
+        if config['full_code'] in columns
+    }
+    return _collection_frame(WEATHER_DATASETS, by_variable, lat, lon)
+
+def _fetch_weather_data_giovanni(lat, lon, start_date, end_date):
+    """
+    Series de todas las variables desde la API de Giovanni (WEATHER_PROVIDER=giovanni):
+    una petición por variable, en paralelo, sin descargar granulos.
+    Siempre cubre toda la ventana (max_files no aplica).
+    """
+    from src import giovanni
+
+    print(f"\n🛰️  Obteniendo datos meteorológicos (Giovanni): Lat {lat}, Lon {lon}, {start_date} a {end_date}")
+    codes = [config['full_code'] for config in WEATHER_DATASETS.values()]
+    return _giovanni_frame(giovanni.get_time_series(lat, lon, start_date, end_date, codes), lat, lon)
+
+async def _fetch_weather_data_giovanni_async(lat, lon, start_date, end_date):
     """
-    weather_data = {}
+    Versión asíncrona de _fetch_weather_data_giovanni: las peticiones corren
+    en el pool de hilos de giovanni y se esperan sin bloquear el event loop.
+    """
+    from src import giovanni
+
+    print(f"\n🛰️  Obteniendo datos meteorológicos (Giovanni, async): Lat {lat}, Lon {lon}, {start_date} a {end_date}")
+    codes = [config['full_code'] for config in WEATHER_DATASETS.values()]
+    columns = {}
+    for future, code in giovanni.submit_time_series(lat, lon, start_date, end_date, codes).items():
+        try:
+            columns[code] = await asyncio.wrap_future(future)
+        except Exception as e:
+            print(f"❌ [GIOVANNI] Error en {code}: {e}")
+
+    return _giovanni_frame(columns, lat, lon)
+
+def _get_cached_weather_data(cell, start_date, end_date, max_files):
+    """
+    Retorna el WeatherFrame de la celda desde point_cache, o None.
+    """
+    cached = point_cache.get((cell, start_date, end_date, max_files))
+    if cached is not None:
+        print(f"♻️  Datos en caché para la celda {cell} ({start_date} a {end_date})")
+    return cached
+
+def _cache_weather_data(cell, start_date, end_date, max_files, weather_data):
+    # Solo se guardan resultados completos: si faltó alguna variable se reintenta
+    if all(var_name in weather_data for var_name in WEATHER_DATASETS):
+        point_cache.set((cell, start_date, end_date, max_files), weather_data)
+
+def get_weather_data(lat, lon, start_date, end_date, max_files=2):
+    """
+    Función principal para obtener datos meteorológicos.
+    Como GLDAS es una malla de 0.25° y la extracción usa el vecino más
+    cercano, todos los puntos de una misma celda dan los mismos valores:
+    primero se consulta point_cache por (celda, ventana) y solo se descarga
+    de NASA si no está.
+    max_files limita los granulos por colección (None: todos los del período).
+    Retorna un WeatherFrame con las variables de WEATHER_DATASETS.
+    """
+    cell = grid_cell(lat, lon)
+    cached = _get_cached_weather_data(cell, start_date, end_date, max_files)
+    if cached is not None:
+        return cached
+
+    weather_data = _fetch_weather_data(lat, lon, start_date, end_date, max_files)
+    _cache_weather_data(cell, start_date, end_date, max_files, weather_data)
+    return weather_data
+
+# Descargas en vuelo por (celda, ventana), compartidas entre peticiones
+weather_flight = SingleFlight()
+
+# Límite de descargas de NASA simultáneas desde el event loop
+_nasa_semaphore = None
+
+def _get_nasa_semaphore():
+    global _nasa_semaphore
+
+    if _nasa_semaphore is None:
+        _nasa_semaphore = asyncio.Semaphore(NASA_MAX_CONCURRENT_FETCHES)
+    return _nasa_semaphore
+
+async def get_weather_data_async(lat, lon, start_date, end_date, max_files=2, cache=True):
+    """
+    Versión asíncrona de get_weather_data para los endpoints: el trabajo se
+    envía al pool de procesos y se espera sin bloquear el event loop.
+    Peticiones concurrentes para la misma (celda, ventana) comparten una
+    sola descarga (weather_flight).
+    Con cache=False el resultado no se guarda en point_cache (ventanas que
+    no se repiten, p. ej. cada año de /predict/probability).
+    """
+    cell = grid_cell(lat, lon)
+    cached = _get_cached_weather_data(cell, start_date, end_date, max_files)
+    if cached is not None:
+        return cached
+
+    return await weather_flight.do(
+        (cell, start_date, end_date, max_files),
+        lambda: _fetch_weather_data_async(cell, lat, lon, start_date, end_date, max_files, cache)
+    )
+
+async def _fetch_weather_data_async(cell, lat, lon, start_date, end_date, max_files, cache=True):
+    """
+    Descarga asíncrona: el número de descargas simultáneas está acotado
+    por NASA_MAX_CONCURRENT_FETCHES. Con WEATHER_PROVIDER=giovanni se usa
+    la API de series de tiempo y los granulos solo si no devuelve datos.
+    """
+    if WEATHER_PROVIDER == "giovanni":
+        weather_data = await _fetch_weather_data_giovanni_async(lat, lon, start_date, end_date)
+        if not weather_data.is_empty:
+            if cache:
+                _cache_weather_data(cell, start_date, end_date, max_files, weather_data)
+            return weather_data
+        print("⚠️  Giovanni no devolvió datos; se usan los granulos de NASA")
+
+    frames = []
+    async with _get_nasa_semaphore():
+        print(f"\n🌍 Obteniendo datos meteorológicos (async): Lat {lat}, Lon {lon}, {start_date} a {end_date}")
+        future_to_collection = submit_weather_tasks(lat, lon, start_date, end_date, max_files)
+
+        for future, collection_name in future_to_collection.items():
+            try:
+                frames.append(await asyncio.wrap_future(future))
+            except Exception as e:
+                print(f"❌ [MAIN] El proceso de {collection_name} generó una excepción: {e}")
+
+    weather_data = WeatherFrame.merge(frames)
+    if cache:
+        _cache_weather_data(cell, start_date, end_date, max_files, weather_data)
+    return weather_data
+
+async def get_weather_data_batch_async(points, start_date, end_date, max_files=2):
+    """
+    Datos meteorológicos para varios puntos en la misma ventana.
+    Los puntos se agrupan por celda GLDAS; las celdas que no están en
+    point_cache se leen juntas (una tarea por colección que lee cada granulo
+    una vez para todas: de la caché en disco o por byte ranges de cada celda). Con una sola celda pendiente, o con WEATHER_PROVIDER=giovanni
+    (series por punto), se usa get_weather_data_async por celda.
+    Retorna una lista de WeatherFrame en el mismo orden que points.
+    """
+    cells = [grid_cell(lat, lon) for lat, lon in points]
+
+    by_cell = {}
+    pending = {}
+    for cell, point in zip(cells, points):
+        if cell in by_cell or cell in pending:
+            continue
+        cached = _get_cached_weather_data(cell, start_date, end_date, max_files)
+        if cached is not None:
+            by_cell[cell] = cached
+        else:
+            pending[cell] = point
+
+    if len(pending) == 1 or (pending and WEATHER_PROVIDER == "giovanni"):
+        fetched = await asyncio.gather(*(
+            get_weather_data_async(lat, lon, start_date, end_date, max_files)
+            for lat, lon in pending.values()
+        ))
+        by_cell.update(zip(pending, fetched))
+    elif pending:
+        pending_cells = list(pending)
+        pending_points = [pending[cell] for cell in pending_cells]
+        fetched = {cell: [] for cell in pending_cells}
+
+        async with _get_nasa_semaphore():
+            print(f"\n🌍 Obteniendo datos meteorológicos (batch): {len(pending_points)} celdas, {start_date} a {end_date}")
+            future_to_collection = {
+                nasa_pool.submit(_process_get_collection_points, collection_name, configs, pending_points, start_date, end_date, max_files): collection_name
+                for collection_name, configs in _group_by_collection(WEATHER_DATASETS).items()
+            }
+
+            for future, collection_name in future_to_collection.items():
+                try:
+                    for cell, frame in zip(pending_cells, await asyncio.wrap_future(future)):
+                        fetched[cell].append(frame)
+                except Exception as e:
+                    print(f"❌ [MAIN] El proceso de {collection_name} generó una excepción: {e}")
+
+        for cell, frames in fetched.items():
+            weather_data = WeatherFrame.merge(frames)
+            _cache_weather_data(cell, start_date, end_date, max_files, weather_data)
+            by_cell[cell] = weather_data
+
+    return [by_cell[cell] for cell in cells]
+
+async def get_area_data_async(collection_name, moment, variable_names, rows, cols, stride):
+    """
+    Versión asíncrona de _process_read_area: se ejecuta en el pool de
+    procesos, dentro del límite de descargas simultáneas.
+    """
+    async with _get_nasa_semaphore():
+        future = nasa_pool.submit(_process_read_area, collection_name, moment, variable_names, rows, cols, stride)
+        return await asyncio.wrap_future(future)
+
+def _fetch_weather_data(lat, lon, start_date, end_date, max_files=2):
+    """
+    Descarga los datos meteorológicos de NASA, optimizada con PROCESOS.
+    Se lanza una tarea por colección (no por variable): todas las variables
+    de GLDAS_NOAH025_3H comparten los mismos archivos.
+    Las tareas se ejecutan en el pool de larga vida de la app (nasa_pool);
+    si no hay pool (uso como script) se crea uno temporal.
+    Con WEATHER_PROVIDER=giovanni se usa primero la API de series de tiempo.
+    """
+    if WEATHER_PROVIDER == "giovanni":
+        weather_data = _fetch_weather_data_giovanni(lat, lon, start_date, end_date)
+        if not weather_data.is_empty:
+            return weather_data
+        print("⚠️  Giovanni no devolvió datos; se usan los granulos de NASA")
+
+    frames = []
     
     print(f"\n🌍 Obteniendo datos meteorológicos (CON PROCESOS):")
-    print(f"   📍 Ubicación: Lat {lat}, Lon {lon}")
-    print(f"   📅 Período: {start_date} a {end_date}")
+    print(f"   📍 Ubicación: Lat {lat}, Lon {lon}")
+    print(f"   📅 Período: {start_date} a {end_date}")
     print("-" * 50)
     
-    MAX_PROCESSES = len(WEATHER_DATASETS)
-    
-    # CLAVE: Usar ProcessPoolExecutor en lugar de ThreadPoolExecutor
-    with ProcessPoolExecutor(max_workers=MAX_PROCESSES) as executor:
-        
-        future_to_var = {
-            executor.submit(_process_get_data, var_name, config, lat, lon, start_date, end_date): var_name
-            for var_name, config in WEATHER_DATASETS.items()
-        }
-        
-        # Recolectar resultados a medida que los procesos terminan
-        for future in as_completed(future_to_var):
-            var_name = future_to_var[future]
-            try:
-                # El resultado es una tupla: (var_name, result_data)
-                _, result_data = future.result() 
-                if result_data:
-                    # Almacenar el resultado en el diccionario principal
-                    weather_data[var_name] = result_data
-            except Exception as e:
-                print(f"❌ [MAIN] El proceso de {var_name} generó una excepción: {e}")
+    if nasa_pool.get_pool() is not None:
+        future_to_collection = submit_weather_tasks(lat, lon, start_date, end_date, max_files)
+        _collect_results(future_to_collection, frames)
+    else:
+        groups = _group_by_collection(WEATHER_DATASETS)
+        # Sin el pool de la app (uso como script): pool temporal para esta descarga
+        with ProcessPoolExecutor(max_workers=len(groups)) as executor:
+            future_to_collection = {
+                executor.submit(_process_get_collection_data, collection_name, configs, lat, lon, start_date, end_date, max_files): collection_name
+                for collection_name, configs in groups.items()
+            }
+            _collect_results(future_to_collection, frames)
 
 
     print("\n" + "="*50)
     print("✅ Todos los procesos finalizados. Recolección de datos terminada.")
     print("="*50)
-    return weather_data
+    return WeatherFrame.merge(frames)
+
+def submit_weather_tasks(lat, lon, start_date, end_date, max_files=2):
+    """
+    Envía al pool de la app una tarea por colección.
+    Retorna {future: collection_name}; cada future produce el WeatherFrame
+    de la colección. max_files=None procesa todos los granulos.
+    """
+    return {
+        nasa_pool.submit(_process_get_collection_data, collection_name, configs, lat, lon, start_date, end_date, max_files): collection_name
+        for collection_name, configs in _group_by_collection(WEATHER_DATASETS).items()
+    }
+
+def _collect_results(future_to_collection, frames):
+    """
+    Recolecta los resultados de cada proceso (en el orden de envío).
+    """
+    for future, collection_name in future_to_collection.items():
+        try:
+            # El resultado es el WeatherFrame de la colección
+            frames.append(future.result())
+        except Exception as e:
+            print(f"❌ [MAIN] El proceso de {collection_name} generó una excepción: {e}")
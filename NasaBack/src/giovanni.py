@@ -0,0 +1,328 @@
+import io
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+
+from config import (
+    NASA_USERNAME, NASA_PASSWORD, GIOVANNI_MAX_CONNECTIONS, GIOVANNI_TIMEOUT, GIOVANNI_TOKEN_TTL
+)
+
+"""
+Cliente de la API de series de tiempo de Giovanni (proveedor "giovanni").
+
+Giovanni devuelve la serie de un punto como CSV sin descargar granulos:
+una petición por variable. Para que sea un proveedor de producción:
+- Una sola requests.Session con pool de conexiones keep-alive
+  (GIOVANNI_MAX_CONNECTIONS) y reintentos con backoff para 429/5xx.
+- Las variables se piden en paralelo en un pool de hilos del mismo tamaño.
+- El token de signin se guarda y se renueva al vencer GIOVANNI_TOKEN_TTL o
+  cuando la API responde 401/403 (un solo signin aunque fallen varias
+  peticiones a la vez).
+- El CSV se parsea mientras llega (TimeSeriesParser), de forma vectorizada.
+
+gcts usa este módulo cuando WEATHER_PROVIDER=giovanni y construye el
+WeatherFrame con los metadatos de WEATHER_DATASETS.
+"""
+
+SIGNIN_URL = "https://api.giovanni.earthdata.nasa.gov/signin"
+TIME_SERIES_URL = "https://api.giovanni.earthdata.nasa.gov/timeseries"
+
+# Lectura del cuerpo en streaming y tamaño de los bloques que se parsean juntos
+STREAM_CHUNK_BYTES = 64 * 1024
+PARSE_BLOCK_BYTES = 1024 * 1024
+
+_session = None
+_executor = None
+_token = None
+_token_expires = 0.0
+_lock = threading.Lock()
+_token_lock = threading.Lock()
+_counters_lock = threading.Lock()
+
+counters = {"requests": 0, "failures": 0, "signins": 0, "token_refreshes": 0}
+
+
+def _count(name):
+    with _counters_lock:
+        counters[name] += 1
+
+
+def get_session():
+    """
+    Sesión HTTP compartida (keep-alive) con reintentos para errores transitorios.
+    """
+    global _session
+
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GIOVANNI_MAX_CONNECTIONS, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _get_executor():
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=GIOVANNI_MAX_CONNECTIONS, thread_name_prefix="giovanni")
+        return _executor
+
+
+def get_token(stale=None):
+    """
+    Token de Giovanni vigente. stale es un token que la API rechazó: si
+    todavía es el guardado se pide uno nuevo; si otro hilo ya lo renovó se
+    usa el nuevo sin volver a hacer signin.
+    """
+    global _token, _token_expires
+
+    with _token_lock:
+        expired = time.monotonic() >= _token_expires
+        if _token is not None and not expired and (stale is None or stale != _token):
+            return _token
+
+        response = get_session().get(
+            SIGNIN_URL,
+            auth=HTTPBasicAuth(NASA_USERNAME, NASA_PASSWORD),
+            allow_redirects=True,
+            timeout=GIOVANNI_TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"No se pudo obtener el token de Giovanni ({response.status_code}): {response.text[:200]}")
+
+        _count("signins")
+        if _token is not None:
+            _count("token_refreshes")
+        _token = response.text.replace('"', '').strip()
+        _token_expires = time.monotonic() + GIOVANNI_TOKEN_TTL
+        return _token
+
+
+def call_time_series(lat, lon, time_start, time_end, data):
+    """
+    Respuesta en streaming (cuerpo sin leer) con la serie de tiempo de la
+    variable data (código completo de GLDAS, p. ej.
+    GLDAS_NOAH025_3H_2_1_Tair_f_inst) en el punto. El llamador la cierra.
+    time_start/time_end en formato YYYY-MM-DDThh:mm:ss (UTC).
+    """
+    params = {
+        "data": data,
+        "location": "[{},{}]".format(lat, lon),
+        "time": "{}/{}".format(time_start, time_end),
+    }
+    session = get_session()
+    token = get_token()
+
+    _count("requests")
+    response = session.get(TIME_SERIES_URL, params=params, headers={"authorizationtoken": token},
+                           timeout=GIOVANNI_TIMEOUT, stream=True)
+    if response.status_code in (401, 403):
+        # Token vencido o revocado: renovarlo una vez y repetir
+        response.close()
+        token = get_token(stale=token)
+        _count("requests")
+        response = session.get(TIME_SERIES_URL, params=params, headers={"authorizationtoken": token},
+                               timeout=GIOVANNI_TIMEOUT, stream=True)
+
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return response
+
+
+class TimeSeriesParser:
+    """
+    Parser incremental del CSV de Giovanni.
+
+    feed() recibe el cuerpo por pedazos (bytes) y close() retorna
+    (headers, tiempos datetime64[ns], valores float32). Las líneas de
+    metadatos (clave,valor) se leen una sola vez hasta la primera fila de
+    datos; las filas se parsean por bloques de PARSE_BLOCK_BYTES con el
+    lector C de pandas y una conversión vectorizada de los tiempos, así que
+    en memoria solo queda un bloque de texto y los arreglos ya convertidos.
+    """
+
+    def __init__(self):
+        self.headers = None
+        self._header_lines = []
+        self._pending = bytearray()
+        self._times = []
+        self._values = []
+
+    def feed(self, chunk):
+        self._pending += chunk
+        if self.headers is None and not self._read_header():
+            return
+
+        if len(self._pending) >= PARSE_BLOCK_BYTES:
+            # Solo líneas completas; el resto espera al siguiente pedazo
+            cut = self._pending.rfind(b"\n") + 1
+            if cut:
+                self._parse_block(bytes(self._pending[:cut]))
+                del self._pending[:cut]
+
+    def close(self):
+        if self.headers is None:
+            self._read_header(final=True)
+        if self._pending:
+            self._parse_block(bytes(self._pending))
+            self._pending.clear()
+
+        if not self._times:
+            return self.headers, np.array([], dtype="datetime64[ns]"), np.array([], dtype=np.float32)
+        return self.headers, np.concatenate(self._times), np.concatenate(self._values)
+
+    def _read_header(self, final=False):
+        """
+        Consume líneas de metadatos hasta la primera fila de datos (empieza
+        con un dígito). Retorna True cuando el header está completo.
+        """
+        while True:
+            end = self._pending.find(b"\n")
+            if end < 0:
+                if not final:
+                    return False
+                if not self._pending:
+                    break
+                end = len(self._pending)
+            line = self._pending[:end].decode("utf-8", "replace").strip()
+
+            if line[:1].isdigit():
+                break
+            del self._pending[:end + 1]
+            if line:
+                self._header_lines.append(line)
+
+        headers = {}
+        for line in self._header_lines:
+            key, _, value = line.partition(",")
+            headers[key.strip()] = value.strip()
+
+        if "param_name" not in headers:
+            preview = " ".join(self._header_lines)[:200]
+            raise ValueError(f"Error en la respuesta del servidor: {preview}...")
+
+        self.headers = headers
+        return True
+
+    def _parse_block(self, block):
+        na_values = [self.headers["fill_value"]] if self.headers.get("fill_value") else None
+        df = pd.read_csv(
+            io.BytesIO(block),
+            header=None,
+            names=("time", "value"),
+            usecols=(0, 1),
+            dtype={"time": str, "value": np.float32},
+            na_values=na_values,
+        )
+        times = _to_datetime64(df["time"])
+        valid = ~np.isnat(times)
+        self._times.append(times[valid])
+        self._values.append(df["value"].to_numpy(dtype=np.float32)[valid])
+
+
+def _to_datetime64(strings):
+    """
+    Tiempos ISO 8601 (UTC, con o sin 'Z') a datetime64[ns] en una sola
+    conversión de numpy; si algún valor no tiene ese formato se usa la
+    conversión tolerante de pandas (NaT donde no se puede leer).
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # Desfases explícitos (+00:00)
+            return np.char.rstrip(strings.to_numpy(dtype=str), "Z").astype("datetime64[ns]")
+    except ValueError:
+        times = pd.to_datetime(strings, format="ISO8601", utc=True, errors="coerce").dt.tz_localize(None)
+        return times.to_numpy(dtype="datetime64[ns]")
+
+
+def parse_time_series_stream(chunks):
+    """
+    (headers, tiempos, valores) desde un iterable de pedazos del cuerpo (bytes).
+    """
+    parser = TimeSeriesParser()
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+    return parser.close()
+
+
+def parse_time_series(text):
+    """
+    (headers, tiempos, valores) desde el CSV completo como texto.
+    """
+    return parse_time_series_stream([text.encode("utf-8")])
+
+
+def fetch_time_series(lat, lon, time_start, time_end, data):
+    """
+    Descarga y parsea la serie de la variable: el cuerpo se lee por
+    pedazos de STREAM_CHUNK_BYTES sin guardar el texto completo.
+    """
+    with call_time_series(lat, lon, time_start, time_end, data) as response:
+        return parse_time_series_stream(response.iter_content(STREAM_CHUNK_BYTES))
+
+
+def _fetch_series(lat, lon, time_start, time_end, data):
+    try:
+        _, times, values = fetch_time_series(lat, lon, time_start, time_end, data)
+    except Exception:
+        _count("failures")
+        raise
+    return times, values
+
+
+def submit_time_series(lat, lon, time_start, time_end, codes):
+    """
+    Envía una petición por variable al pool de hilos.
+    Retorna {future: código}; cada future produce (tiempos, valores).
+    """
+    executor = _get_executor()
+    return {
+        executor.submit(_fetch_series, lat, lon, time_start, time_end, code): code
+        for code in codes
+    }
+
+
+def get_time_series(lat, lon, time_start, time_end, codes):
+    """
+    Series de todas las variables en paralelo: {código: (tiempos, valores)}.
+    Las variables que fallan se omiten (y se reportan).
+    """
+    columns = {}
+    future_to_code = submit_time_series(lat, lon, time_start, time_end, codes)
+    for future in as_completed(future_to_code):
+        code = future_to_code[future]
+        try:
+            columns[code] = future.result()
+        except Exception as e:
+            print(f"❌ [GIOVANNI] Error en {code}: {e}")
+    return columns
+
+
+def stats():
+    with _counters_lock:
+        snapshot = dict(counters)
+    return {
+        **snapshot,
+        "token_age_s": None if _token is None else round(GIOVANNI_TOKEN_TTL - (_token_expires - time.monotonic()), 1),
+    }
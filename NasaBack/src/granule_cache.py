@@ -0,0 +1,153 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+from config import GRANULE_CACHE_DIR, GRANULE_CACHE_MAX_BYTES
+
+"""
+Caché en disco de granulos (archivos NetCDF) de NASA.
+
+Los granulos de GLDAS no cambian una vez publicados, así que se guardan
+localmente con el nombre derivado del ID del granulo (hash SHA-256).
+- Escrituras atómicas: se descarga a un archivo temporal en el mismo
+  directorio y se renombra con os.replace, por lo que varios procesos
+  pueden compartir la caché sin ver archivos a medias.
+- LRU: cada acceso actualiza el mtime del archivo; al pasar el presupuesto
+  de bytes se borran los archivos con mtime más antiguo.
+"""
+
+CACHE_SUFFIX = ".nc4"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class GranuleCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, granule_id):
+        digest = hashlib.sha256(granule_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + CACHE_SUFFIX)
+
+    def get(self, granule_id):
+        """
+        Retorna la ruta local del granulo o None si no está en caché.
+        """
+        path = self.path_for(granule_id)
+        try:
+            # Marcar como usado recientemente (LRU por mtime)
+            os.utime(path, None)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, granule_id, url, session):
+        """
+        Descarga el granulo a la caché de forma atómica y retorna su ruta.
+        """
+        path = self.path_for(granule_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with session.get(url, stream=True, timeout=120) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self.evict(keep=path)
+        return path
+
+    def fetch(self, granule_id, url, session):
+        """
+        Retorna la ruta local del granulo, descargándolo solo si hace falta.
+        """
+        path = self.get(granule_id)
+        if path is not None:
+            print(f"[CACHE] ♻️  Granulo en caché: {granule_id}")
+            return path
+
+        print(f"[CACHE] 📥 Descargando granulo: {granule_id}")
+        return self.put(granule_id, url, session)
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Borra los granulos menos usados hasta quedar dentro del presupuesto.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Otro proceso ya lo borró o el archivo sigue abierto (Windows)
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+_cache = None
+
+
+def get_granule_cache():
+    """
+    Retorna la caché del proceso actual, o None si está desactivada.
+    """
+    global _cache
+
+    if GRANULE_CACHE_MAX_BYTES <= 0:
+        return None
+    if _cache is None:
+        _cache = GranuleCache(GRANULE_CACHE_DIR, GRANULE_CACHE_MAX_BYTES)
+    return _cache
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES
+
+"""
+Caché en disco (SQLite) de respuestas de ChatGPT.
+
+La clave es el hash de (modelo, prompt normalizado, parámetros): el prompt
+se normaliza colapsando espacios, así que prompts que solo difieren en
+indentación comparten respuesta. Cada entrada expira tras LLM_CACHE_TTL y,
+al superar LLM_CACHE_MAX_BYTES, se borran las de acceso más antiguo (LRU).
+SQLite en modo WAL permite compartir el archivo entre workers de uvicorn.
+
+Desde el event loop se usan aget/aset, que corren las consultas en un hilo
+(asyncio.to_thread). El tamaño total se lleva en memoria y se recalcula
+con SUM (junto con el borrado de expiradas) solo cada SYNC_INTERVAL
+segundos, para incluir lo que escriben otros workers.
+"""
+
+SYNC_INTERVAL = 60  # segundos
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+
+def normalize_prompt(prompt):
+    return " ".join(prompt.split())
+
+
+def cache_key(model, prompt, params=None):
+    payload = json.dumps(
+        {"model": model, "prompt": normalize_prompt(prompt), "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path, ttl_seconds, max_bytes):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        with self._lock:
+            self._sync(time.time())
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or row[1] + self.ttl_seconds <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._bytes -= row[2]
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, model, response):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._bytes += size - (previous[0] if previous else 0)
+            self._evict(now)
+
+    async def aget(self, key):
+        """
+        get sin bloquear el event loop.
+        """
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, model, response):
+        """
+        set sin bloquear el event loop.
+        """
+        await asyncio.to_thread(self.set, key, model, response)
+
+    def _sync(self, now):
+        """
+        Borra las expiradas y recalcula el tamaño total desde la base.
+        """
+        self._conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,))
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._synced_at = time.monotonic()
+
+    def _evict(self, now):
+        if time.monotonic() - self._synced_at >= SYNC_INTERVAL:
+            self._sync(now)
+        if self._bytes <= self.max_bytes:
+            return
+
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if self._bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_cache = None
+
+
+def get_llm_cache():
+    """
+    Retorna la caché del proceso actual, o None si está desactivada.
+    """
+    global _cache
+
+    if LLM_CACHE_MAX_BYTES <= 0:
+        return None
+    if _cache is None:
+        _cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+    return _cache
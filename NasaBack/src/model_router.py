@@ -0,0 +1,296 @@
+import asyncio
+import threading
+import time
+
+"""
+Enrutador de modelos de ChatGPT.
+
+- Circuit breaker por modelo: tras varios fallos seguidos el modelo se salta
+  durante un tiempo de espera (que se duplica si la prueba posterior falla).
+  En half_open solo un llamador hace la prueba; los demás lo siguen
+  saltando hasta que la prueba termina. Los errores permanentes (modelo
+  inexistente o sin permiso) lo abren con la espera máxima desde el primer
+  fallo.
+- Plazo por intento y plazo total por llamada: la latencia queda acotada
+  aunque el modelo preferido esté caído o colgado.
+- Hedging (solo asíncrono): si el primer intento no responde en hedge_delay
+  segundos se lanza el siguiente modelo en paralelo y gana el primero que
+  responda; el otro se cancela. Si el cancelado es el intento original
+  (o se agota el plazo total) cuenta como timeout para su breaker.
+"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, cooldown=30.0, max_cooldown=600.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None  # Inicio de la prueba en curso (half_open)
+
+    def state(self, now=None):
+        if self.opened_at is None:
+            return "closed"
+        now = time.monotonic() if now is None else now
+        if now - self.opened_at >= self.cooldown:
+            return "half_open"  # Se permite un intento de prueba
+        return "open"
+
+    def available(self, now=None):
+        """
+        True si un intento podría pasar ahora (sin reservar la prueba).
+        """
+        now = time.monotonic() if now is None else now
+        state = self.state(now)
+        if state == "half_open":
+            # Una prueba que no reportó en todo un cooldown se da por perdida
+            return self.probe_at is None or now - self.probe_at >= self.cooldown
+        return state == "closed"
+
+    def allow(self):
+        """
+        Reserva el intento: en half_open solo pasa el primer llamador.
+        """
+        now = time.monotonic()
+        if not self.available(now):
+            return False
+        if self.opened_at is not None:
+            self.probe_at = now
+        return True
+
+    def release(self):
+        """
+        La prueba terminó sin resultado (cancelada): otro puede probar.
+        """
+        self.probe_at = None
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self, permanent=False):
+        self.failures += 1
+        self.probe_at = None
+        now = time.monotonic()
+
+        if permanent:
+            self.cooldown = self.max_cooldown
+            self.opened_at = now
+        elif self.opened_at is not None:
+            # Falló la prueba en half_open: volver a abrir con más espera
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.opened_at = now
+        elif self.failures >= self.failure_threshold:
+            self.opened_at = now
+
+
+class ModelRouter:
+    def __init__(self, models, failure_threshold=3, cooldown=30.0, max_cooldown=600.0,
+                 permanent_errors=()):
+        self.models = list(models)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.permanent_errors = tuple(permanent_errors)
+        self._breakers = {}
+        self._latency = {}
+        self._lock = threading.Lock()
+        self.counters = {"attempts": 0, "failures": 0, "timeouts": 0, "skipped": 0, "hedged": 0, "hedge_wins": 0}
+
+    def _breaker(self, model):
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.cooldown, self.max_cooldown)
+            self._breakers[model] = breaker
+        return breaker
+
+    def candidates(self, preferred):
+        """
+        Modelos a intentar, en orden, sin los que tienen el circuito abierto.
+        Antes de cada intento hay que llamar a acquire(model).
+        """
+        order = []
+        for model in [preferred] + self.models:
+            if model not in order:
+                order.append(model)
+
+        with self._lock:
+            allowed = [m for m in order if self._breaker(m).available()]
+            self.counters["skipped"] += len(order) - len(allowed)
+        return allowed
+
+    def acquire(self, model):
+        """
+        Reserva un intento con model. False si está en half_open y otro
+        llamador ya está haciendo la prueba (o si volvió a abrirse).
+        """
+        with self._lock:
+            allowed = self._breaker(model).allow()
+            if not allowed:
+                self.counters["skipped"] += 1
+            return allowed
+
+    def release(self, model):
+        """
+        Libera la prueba de un intento cancelado sin resultado.
+        """
+        with self._lock:
+            self._breaker(model).release()
+
+    def _next_model(self, candidates):
+        for model in candidates:
+            if self.acquire(model):
+                return model
+        return None
+
+    def record_success(self, model, latency):
+        with self._lock:
+            self._breaker(model).record_success()
+            # Media móvil exponencial de la latencia (solo para métricas)
+            previous = self._latency.get(model)
+            self._latency[model] = latency if previous is None else 0.8 * previous + 0.2 * latency
+
+    def record_failure(self, model, error=None):
+        permanent = isinstance(error, self.permanent_errors) if self.permanent_errors else False
+        with self._lock:
+            self.counters["failures"] += 1
+            if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+                self.counters["timeouts"] += 1
+            self._breaker(model).record_failure(permanent=permanent)
+
+    async def _attempt(self, model, call, timeout):
+        with self._lock:
+            self.counters["attempts"] += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(model, timeout), timeout)
+        except asyncio.CancelledError:
+            # run() ya registró el timeout si correspondía; si no, liberar la prueba
+            self.release(model)
+            raise
+        except Exception as e:
+            print(f"Error con modelo {model}: {str(e) or type(e).__name__}")
+            self.record_failure(model, e)
+            raise
+        self.record_success(model, time.monotonic() - started)
+        return result
+
+    async def run(self, preferred, call, attempt_timeout, deadline, hedge_delay=0):
+        """
+        Ejecuta call(model, timeout) (una corrutina) con fallback entre modelos.
+        Retorna (modelo, resultado) o lanza la última excepción.
+        """
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline
+        candidates = iter(self.candidates(preferred))
+        pending = {}
+        hedged = False
+        first_task = None
+        last_error = None
+        timed_out = []  # Intentos que se cancelan por lentos (cuentan como fallo)
+
+        def launch():
+            remaining = end - loop.time()
+            if remaining <= 0:
+                return None
+            model = self._next_model(candidates)
+            if model is None:
+                return None
+            print(f"Intentando con modelo: {model}")
+            task = asyncio.ensure_future(self._attempt(model, call, min(attempt_timeout, remaining)))
+            pending[task] = model
+            return task
+
+        try:
+            first_task = launch()
+            while pending:
+                wait_timeout = end - loop.time()
+                if hedge_delay > 0 and not hedged and len(pending) == 1:
+                    wait_timeout = min(wait_timeout, hedge_delay)
+
+                done, _ = await asyncio.wait(pending, timeout=max(wait_timeout, 0),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if loop.time() >= end:
+                        timed_out.extend(pending)
+                        break
+                    # El intento en curso tarda demasiado: lanzar otro en paralelo
+                    hedged = True
+                    if launch() is not None:
+                        with self._lock:
+                            self.counters["hedged"] += 1
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    if hedged and task is not first_task:
+                        # Ganó un intento lanzado en paralelo al original
+                        with self._lock:
+                            self.counters["hedge_wins"] += 1
+                        if first_task in pending:
+                            timed_out.append(first_task)
+                    return model, task.result()
+
+                # Reponer el intento fallido (hasta dos en vuelo si ya hubo hedging)
+                if len(pending) < (2 if hedged else 1):
+                    launch()
+        finally:
+            for task in timed_out:
+                model = pending[task]
+                print(f"Error con modelo {model}: cancelado por lento")
+                self.record_failure(model, asyncio.TimeoutError(f"{model} cancelado por lento"))
+            for task in pending:
+                task.cancel()
+
+        raise last_error or asyncio.TimeoutError("Sin modelos disponibles dentro del plazo")
+
+    def run_sync(self, preferred, call, attempt_timeout, deadline):
+        """
+        Versión síncrona (sin hedging): intentos secuenciales dentro del plazo.
+        call(model, timeout) debe respetar el timeout que recibe.
+        """
+        end = time.monotonic() + deadline
+        last_error = None
+
+        for model in self.candidates(preferred):
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.acquire(model):
+                continue
+            print(f"Intentando con modelo: {model}")
+            with self._lock:
+                self.counters["attempts"] += 1
+            started = time.monotonic()
+            try:
+                result = call(model, min(attempt_timeout, remaining))
+            except Exception as e:
+                print(f"Error con modelo {model}: {str(e) or type(e).__name__}")
+                self.record_failure(model, e)
+                last_error = e
+                continue
+            self.record_success(model, time.monotonic() - started)
+            return model, result
+
+        raise last_error or TimeoutError("Sin modelos disponibles dentro del plazo")
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "models": {
+                    model: {
+                        "state": breaker.state(),
+                        "failures": breaker.failures,
+                        "latency_s": round(self._latency[model], 3) if model in self._latency else None,
+                    }
+                    for model, breaker in self._breakers.items()
+                },
+            }
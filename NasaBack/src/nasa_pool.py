@@ -0,0 +1,215 @@
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import NASA_POOL_SIZE, NASA_POOL_MAX_TASKS
+
+"""
+Pool de procesos de larga vida para las descargas de NASA.
+
+Se crea una sola vez al arrancar la app (ver lifespan en main.py). Cada
+proceso inicia sesión en Earthdata al nacer y conserva la sesión para todas
+las tareas que ejecuta, de modo que las peticiones ya no pagan el costo de
+crear procesos ni de hacer login.
+
+Las cachés de búsquedas en CMR y de granulos se usan dentro de los
+procesos, así que cada tarea devuelve cuánto cambiaron sus contadores y la
+API los suma en worker_counters (ver worker_cache_stats).
+"""
+
+_pool = None
+_lock = threading.Lock()
+
+# Contadores sumados de las cachés de los procesos: {caché: {contador: total}}
+COUNTED_FIELDS = ("hits", "misses", "evictions")
+worker_counters = {}
+_counters_lock = threading.Lock()
+
+
+def _init_worker():
+    """
+    Inicializador de cada proceso: login en Earthdata una sola vez.
+    Si falla no se rompe el pool; search_granules reintenta el login
+    (ensure_authenticated) en la primera búsqueda del proceso.
+    """
+    from src.gcts import ensure_authenticated
+
+    try:
+        ensure_authenticated()
+        print("✅ [POOL] Proceso autenticado en Earthdata")
+    except Exception as e:
+        print(f"⚠️  [POOL] No se pudo autenticar al iniciar el proceso: {e}")
+
+    # gcts importa xarray solo al usarlo: cargarlo aquí, fuera de la primera tarea
+    import xarray  # noqa: F401
+
+
+def _warmup():
+    return True
+
+
+def _create_pool(size, max_tasks):
+    kwargs = {
+        "max_workers": size,
+        "initializer": _init_worker,
+    }
+    # max_tasks_per_child solo existe desde Python 3.11 y no funciona con 'fork'
+    if sys.version_info >= (3, 11) and max_tasks > 0:
+        kwargs["mp_context"] = multiprocessing.get_context("spawn")
+        kwargs["max_tasks_per_child"] = max_tasks
+
+    return ProcessPoolExecutor(**kwargs)
+
+
+def start_pool(size=None, max_tasks=None, wait=True):
+    """
+    Crea el pool (si no existe) y arranca sus procesos para que hagan login
+    antes de la primera petición.
+    wait=False no espera a que terminen: la app arranca de inmediato y los
+    procesos se autentican en segundo plano.
+    """
+    global _pool
+
+    size = size or NASA_POOL_SIZE
+    max_tasks = NASA_POOL_MAX_TASKS if max_tasks is None else max_tasks
+
+    with _lock:
+        if _pool is not None:
+            return _pool
+
+        print(f"🚀 [POOL] Iniciando pool de NASA: {size} procesos, reciclado cada {max_tasks} tareas")
+        _pool = _create_pool(size, max_tasks)
+
+    # Forzar la creación de los procesos (y su login) desde el arranque
+    warmups = [_pool.submit(_warmup) for _ in range(size)]
+    if not wait:
+        return _pool
+
+    for future in warmups:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"⚠️  [POOL] Error calentando el pool: {e}")
+
+    return _pool
+
+
+def _cache_counters():
+    """
+    Contadores actuales de las cachés del proceso (se llama en el worker).
+    """
+    from src.gcts import search_cache
+    from src.granule_cache import get_granule_cache
+
+    caches = {"search_cache": search_cache, "granule_cache": get_granule_cache()}
+    return {
+        name: {field: getattr(cache, field) for field in COUNTED_FIELDS}
+        for name, cache in caches.items() if cache is not None
+    }
+
+
+def _run_counted(fn, args, kwargs):
+    """
+    Ejecuta la tarea en el worker y retorna (resultado, cambio de los
+    contadores de sus cachés durante la tarea).
+    """
+    before = _cache_counters()
+    result = fn(*args, **kwargs)
+    after = _cache_counters()
+    deltas = {
+        name: {field: counters[field] - before.get(name, {}).get(field, 0) for field in COUNTED_FIELDS}
+        for name, counters in after.items()
+    }
+    return result, deltas
+
+
+def _add_counters(deltas):
+    with _counters_lock:
+        for name, counters in deltas.items():
+            totals = worker_counters.setdefault(name, dict.fromkeys(COUNTED_FIELDS, 0))
+            for field, value in counters.items():
+                totals[field] += value
+
+
+def _resolve_counted(inner, outer):
+    """
+    Pasa el resultado de la tarea (sin los contadores) al future del llamador.
+    """
+    if inner.cancelled():
+        outer.cancel()
+        return
+
+    try:
+        error = inner.exception()
+        if error is not None:
+            outer.set_exception(error)
+            return
+        result, deltas = inner.result()
+        _add_counters(deltas)
+        outer.set_result(result)
+    except InvalidStateError:
+        pass  # El llamador ya canceló su future
+
+
+def worker_cache_stats(name):
+    """
+    Contadores de la caché name sumados sobre todas las tareas del pool.
+    """
+    with _counters_lock:
+        totals = dict(worker_counters.get(name) or dict.fromkeys(COUNTED_FIELDS, 0))
+    lookups = totals["hits"] + totals["misses"]
+    totals["hit_rate"] = totals["hits"] / lookups if lookups else 0.0
+    return totals
+
+
+def get_pool():
+    """
+    Retorna el pool activo o None si la app no lo ha iniciado
+    (por ejemplo al usar gcts como script).
+    """
+    return _pool
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Envía una tarea al pool. Si el pool se rompió (un proceso murió),
+    se recrea una vez y se reintenta.
+    Retorna un future con el resultado de fn; los contadores de cachés de
+    la tarea se suman a worker_counters al terminar.
+    """
+    inner = _submit(_run_counted, fn, args, kwargs)
+    outer = Future()
+    inner.add_done_callback(lambda done: _resolve_counted(done, outer))
+    outer.add_done_callback(lambda done: done.cancelled() and inner.cancel())
+    return outer
+
+
+def _submit(fn, *args):
+    global _pool
+
+    pool = _pool or start_pool()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        print("⚠️  [POOL] Pool roto, recreando...")
+        with _lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return start_pool().submit(fn, *args)
+
+
+def shutdown_pool(wait=True):
+    """
+    Cierra el pool al apagar la app.
+    """
+    global _pool
+
+    with _lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        print("🛑 [POOL] Cerrando pool de NASA")
+        pool.shutdown(wait=wait, cancel_futures=True)
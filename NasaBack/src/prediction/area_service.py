@@ -0,0 +1,194 @@
+import base64
+
+import numpy as np
+
+from config import AREA_CACHE_MAX_BYTES, AREA_CACHE_TTL
+from entitys.models import AreaRequest
+from src.gcts import (
+    WEATHER_DATASETS, GLDAS_LAT_ORIGIN, GLDAS_LON_ORIGIN, GLDAS_RESOLUTION,
+    GLDAS_NLAT, GLDAS_NLON, grid_cell, get_area_data_async,
+)
+from src.result_cache import MemoryTTLCache
+
+"""
+Campos 2-D (mapas de calor) de las variables de GLDAS para un área.
+
+El área se reduce con un stride entero (promedio por bloques alineados a
+múltiplos del stride) para que ningún lado supere max_size celdas. La malla reducida se divide en
+teselas de TILE_SIZE x TILE_SIZE que se guardan en area_cache por
+(momento, variable, stride, tesela): mapas vecinos o desplazados reutilizan
+las teselas ya leídas y las que faltan se leen del granulo con un solo
+subset rectangular.
+Cada campo se codifica en uint8 (0-254 entre min y max, 255 = sin dato) y
+base64, con la fila 0 al sur.
+"""
+
+TILE_SIZE = 32
+NO_DATA = 255
+
+area_cache = MemoryTTLCache(AREA_CACHE_MAX_BYTES, AREA_CACHE_TTL, sizeof=lambda tile: tile.nbytes + 128)
+
+
+def _reduced_cells(first, last, stride):
+    """
+    Celdas de la malla reducida que cubren los índices [first, last].
+    """
+    return last // stride - first // stride + 1
+
+
+def _choose_stride(rows, cols, max_size):
+    """
+    Stride mínimo para que el área (rows y cols: primer y último índice de
+    la malla) quede en a lo sumo max_size celdas por lado. Parte de
+    ceil(n / max_size); como los bloques están alineados a múltiplos del
+    stride, el área puede tocar un bloque más y entonces se sube.
+    """
+    stride = max(
+        -(-(rows[1] - rows[0] + 1) // max_size),
+        -(-(cols[1] - cols[0] + 1) // max_size),
+        1,
+    )
+    while _reduced_cells(*rows, stride) > max_size or _reduced_cells(*cols, stride) > max_size:
+        stride += 1
+    return stride
+
+
+def _resolve_variables(names):
+    if not names:
+        return list(WEATHER_DATASETS)
+
+    unknown = [name for name in names if name not in WEATHER_DATASETS]
+    if unknown:
+        raise ValueError(f"Variables desconocidas: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def _encode(field):
+    """
+    Codifica un campo float32 en uint8 + base64 con su rango.
+    """
+    valid = ~np.isnan(field)
+    if not valid.any():
+        return {"min": None, "max": None, "values": base64.b64encode(np.full(field.shape, NO_DATA, np.uint8).tobytes()).decode("ascii")}
+
+    low = float(field[valid].min())
+    high = float(field[valid].max())
+    span = high - low
+    scaled = np.zeros(field.shape, dtype=np.float32) if span == 0 else (field - low) / span * (NO_DATA - 1)
+    q = np.where(valid, np.round(np.nan_to_num(scaled)), NO_DATA).astype(np.uint8)
+
+    return {
+        "min": round(low, 6),
+        "max": round(high, 6),
+        "values": base64.b64encode(q.tobytes()).decode("ascii"),
+    }
+
+
+async def _load_tiles(moment, variables, stride, tiles):
+    """
+    Retorna {(variable, tesela): matriz}. Las teselas que faltan en la
+    caché se leen juntas: un solo rectángulo que las cubre a todas.
+    """
+    tile_cells = TILE_SIZE * stride
+    loaded = {}
+    missing = set()
+
+    for name in variables:
+        for tile in tiles:
+            cached = area_cache.get((moment, name, stride, tile))
+            if cached is None:
+                missing.add(tile)
+            else:
+                loaded[(name, tile)] = cached
+
+    if not missing:
+        return loaded
+
+    first_row = min(t[0] for t in missing)
+    last_row = max(t[0] for t in missing)
+    first_col = min(t[1] for t in missing)
+    last_col = max(t[1] for t in missing)
+    rows = (first_row * tile_cells, min((last_row + 1) * tile_cells, GLDAS_NLAT))
+    cols = (first_col * tile_cells, min((last_col + 1) * tile_cells, GLDAS_NLON))
+
+    gldas_variables = [WEATHER_DATASETS[name]["variable"] for name in variables]
+    fields = await get_area_data_async(
+        WEATHER_DATASETS[variables[0]]["collection"], moment, gldas_variables, rows, cols, stride
+    )
+
+    for name in variables:
+        field = fields.get(WEATHER_DATASETS[name]["variable"])
+        if field is None:
+            continue
+        for tile in missing:
+            r = (tile[0] - first_row) * TILE_SIZE
+            c = (tile[1] - first_col) * TILE_SIZE
+            block = np.ascontiguousarray(field[r:r + TILE_SIZE, c:c + TILE_SIZE])
+            area_cache.set((moment, name, stride, tile), block)
+            loaded[(name, tile)] = block
+
+    return loaded
+
+
+async def area_forecast(request: AreaRequest):
+    """
+    Campos reducidos de cada variable pedida en el área y hora indicadas.
+    """
+    if request.lat_min >= request.lat_max or request.lon_min >= request.lon_max:
+        raise ValueError("El área debe cumplir lat_min < lat_max y lon_min < lon_max")
+    variables = _resolve_variables(request.variables)
+
+    # Granulo de 3 horas que contiene la hora pedida (año 2024, como /weather)
+    slot = request.hour - request.hour % 3
+    moment = f"2024-{str(request.month).zfill(2)}-{str(request.day).zfill(2)}T{str(slot).zfill(2)}:00:00"
+
+    i0, j0 = grid_cell(request.lat_min, request.lon_min)
+    i1, j1 = grid_cell(request.lat_max, request.lon_max)
+    stride = _choose_stride((i0, i1), (j0, j1), request.max_size)
+
+    # Rango de la malla reducida que cubre el área [r0, r1) x [c0, c1)
+    r0, r1 = i0 // stride, i1 // stride + 1
+    c0, c1 = j0 // stride, j1 // stride + 1
+    tiles = [
+        (tr, tc)
+        for tr in range(r0 // TILE_SIZE, (r1 - 1) // TILE_SIZE + 1)
+        for tc in range(c0 // TILE_SIZE, (c1 - 1) // TILE_SIZE + 1)
+    ]
+
+    loaded = await _load_tiles(moment, variables, stride, tiles)
+
+    fields = {}
+    for name in variables:
+        out = np.full((r1 - r0, c1 - c0), np.nan, dtype=np.float32)
+        found = False
+        for tr, tc in tiles:
+            block = loaded.get((name, (tr, tc)))
+            if block is None:
+                continue
+            found = True
+            # Intersección de la tesela con el área pedida
+            top, left = tr * TILE_SIZE, tc * TILE_SIZE
+            rs, re_ = max(r0, top), min(r1, top + block.shape[0])
+            cs, ce = max(c0, left), min(c1, left + block.shape[1])
+            if rs < re_ and cs < ce:
+                out[rs - r0:re_ - r0, cs - c0:ce - c0] = block[rs - top:re_ - top, cs - left:ce - left]
+        if found:
+            fields[name] = {
+                "variable": WEATHER_DATASETS[name]["variable"],
+                "units": WEATHER_DATASETS[name]["units"],
+                **_encode(out),
+            }
+
+    # Centro de la primera celda reducida y paso entre celdas
+    step = GLDAS_RESOLUTION * stride
+    return {
+        "time": moment,
+        "stride": stride,
+        "shape": [r1 - r0, c1 - c0],
+        "lat_start": round(GLDAS_LAT_ORIGIN + (r0 * stride + (stride - 1) / 2) * GLDAS_RESOLUTION, 4),
+        "lon_start": round(GLDAS_LON_ORIGIN + (c0 * stride + (stride - 1) / 2) * GLDAS_RESOLUTION, 4),
+        "step": step,
+        "encoding": "uint8-base64",
+        "no_data": NO_DATA,
+        "fields": fields,
+    }
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+"""
+Motor numérico del pronóstico por hora de /predict/weather.
+
+Construye las secciones 'data' y 'summary' de la respuesta directamente
+desde la serie de 3 horas de GLDAS: interpolación lineal por hora (cíclica
+en 24 horas, así el rango horario pedido siempre queda cubierto) y
+agregados sobre la ventana. El LLM solo escribe las recomendaciones.
+"""
+
+# Variables que se devuelven en 'data' (mismo orden que la respuesta histórica)
+FORECAST_VARIABLES = [
+    "velocidad_viento",
+    "precipitacion",
+    "humedad",
+    "temperatura",
+    "presion_superficie",
+    "radiacion_solar",
+    "radiacion_infrarroja",
+]
+
+SECONDS_PER_HOUR = 3600
+DAYLIGHT_MIN_RADIATION = 1.0  # W/m²: por debajo se considera de noche
+CLOUDY_NIGHT_LONGWAVE = 350.0  # W/m²: radiación infrarroja alta = nubes de noche
+
+
+class EmptyForecastError(Exception):
+    """
+    El frame no tiene datos de ninguna variable del pronóstico.
+    """
+
+
+def _hours(start_time, end_time):
+    """
+    Horas enteras desde start_time hasta end_time ("HH:MM"), inclusive.
+    Si end_time es menor que start_time la ventana cruza la medianoche
+    (22:00 a 02:00 son las horas 22, 23, 0, 1 y 2).
+    """
+    start = int(start_time.split(":")[0])
+    end = int(end_time.split(":")[0])
+    if end < start:
+        end += 24
+    return np.arange(start, end + 1) % 24
+
+
+def _hourly_values(frame, variable, hours):
+    """
+    Interpola la serie de 3 horas a cada hora pedida.
+    """
+    times, values = frame.valid(variable)
+    if not len(values):
+        return None
+
+    times = pd.DatetimeIndex(times)
+    sample_hours = (times.hour + times.minute / 60).to_numpy(dtype=np.float64)
+    values = values.astype(np.float64)
+
+    if len(values) == 1:
+        return np.full(hours.shape, values[0])
+
+    return np.interp(hours, sample_hours, values, period=24)
+
+
+def _cloudiness(solar, infrared):
+    """
+    Descripción textual de la nubosidad: de día según la radiación solar
+    (mismos umbrales que el análisis de gtc.py), de noche según la infrarroja.
+    """
+    if solar is not None:
+        daylight = solar[solar > DAYLIGHT_MIN_RADIATION]
+        if daylight.size:
+            average = daylight.mean()
+            if average < 150:
+                return "Very cloudy"
+            if average < 250:
+                return "Cloudy"
+            if average < 350:
+                return "Partly cloudy"
+            return "Clear"
+
+    if infrared is not None:
+        return "Cloudy" if infrared.mean() > CLOUDY_NIGHT_LONGWAVE else "Clear"
+    return "Unknown"
+
+
+def _accumulated(rates):
+    """
+    Integral (regla del trapecio) de las tasas por hora sobre la ventana:
+    n muestras horarias cubren n - 1 horas, no n.
+    """
+    rates = np.clip(rates, 0, None)
+    if rates.size < 2:
+        return 0.0
+    return float((rates[:-1] + rates[1:]).sum() / 2 * SECONDS_PER_HOUR)
+
+
+def _number(value, digits=6):
+    return float(f"{value:.{digits}g}") if value is not None and np.isfinite(value) else None
+
+
+def build_forecast(frame, start_time, end_time):
+    """
+    Calcula el pronóstico desde el WeatherFrame del día.
+    Retorna {'summary': {...}, 'data': {variable: [{'time', 'value'}]}}
+    para las horas entre start_time y end_time ("HH:MM").
+    Lanza EmptyForecastError si el frame no tiene ninguna variable.
+    """
+    hours = _hours(start_time, end_time)
+    labels = [f"{h:02d}:00" for h in hours]
+
+    hourly = {}
+    for variable in FORECAST_VARIABLES:
+        if variable in frame:
+            hourly[variable] = _hourly_values(frame, variable, hours)
+
+    if all(values is None for values in hourly.values()):
+        raise EmptyForecastError("No hay datos meteorológicos para esa ubicación y fecha")
+
+    data = {
+        variable: [
+            {"time": label, "value": _number(value)}
+            for label, value in zip(labels, values)
+        ]
+        for variable, values in hourly.items()
+        if values is not None
+    }
+
+    def mean_of(variable):
+        values = hourly.get(variable)
+        return _number(values.mean()) if values is not None else None
+
+    temperature = hourly.get("temperatura")
+    precipitation = hourly.get("precipitacion")
+
+    summary = {
+        "temperatura": mean_of("temperatura"),
+        "temperatura_min": _number(temperature.min()) if temperature is not None else None,
+        "temperatura_max": _number(temperature.max()) if temperature is not None else None,
+        "nubosidad": _cloudiness(hourly.get("radiacion_solar"), hourly.get("radiacion_infrarroja")),
+        # Tasa en kg/m²/s integrada sobre la duración de la ventana = mm
+        "precipitacion": _number(_accumulated(precipitation)) if precipitation is not None else None,
+        "humedad": mean_of("humedad"),
+        "radiacion_solar": mean_of("radiacion_solar"),
+        "velocidad_viento": mean_of("velocidad_viento"),
+    }
+
+    return {"summary": summary, "data": data}
@@ -1,11 +1,85 @@
-from fastapi import APIRouter, Depends, Request, UploadFile, File, Form
+import asyncio
+
+from fastapi import APIRouter, Depends, Request, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from entitys.models import *
-from src.prediction.prediction_service import predict
+from src.prediction.prediction_service import predict, predict_stream, predict_batch
+from src.prediction.forecast_engine import EmptyForecastError
+from src.sse import SSE_HEADERS
+from src.prediction.probability_service import exceedance_probabilities
+from src.prediction.area_service import area_forecast, area_cache
+from src.weather_handles import handle_store
+from src.chat.chat_sessions import session_store
+from src.granule_cache import get_granule_cache
+from src.llm_cache import get_llm_cache
+from src.chatgpt_querys import token_usage, model_router
+from src import gcts, nasa_pool
 
 prediction_router = APIRouter()
 
 @prediction_router.post("/weather")
 @prediction_router.post("/weather/")  # Manejar ambas versiones
 async def predictWeather(request: WeatherPredictionRequest):
-    return predict(request.time, request.location, request.plan)
+    try:
+        return await predict(request.time, request.location, request.plan)
+    except EmptyForecastError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@prediction_router.post("/weather/stream")
+async def predictWeatherStream(request: WeatherPredictionRequest):
+    return StreamingResponse(
+        predict_stream(request.time, request.location, request.plan),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@prediction_router.post("/batch")
+@prediction_router.post("/batch/")
+async def predictWeatherBatch(request: BatchPredictionRequest):
+    return {"results": await predict_batch(request.items, request.recommendations)}
+
+@prediction_router.post("/area")
+@prediction_router.post("/area/")
+async def predictArea(request: AreaRequest):
+    try:
+        return await area_forecast(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@prediction_router.post("/probability")
+@prediction_router.post("/probability/")
+async def predictProbability(request: ProbabilityRequest):
+    try:
+        return await exceedance_probabilities(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+@prediction_router.get("/metrics")
+async def predictionMetrics():
+    """
+    Contadores de cachés (datos y ChatGPT) y de coalescencia del proceso de la API.
+    search_cache y granule_cache se usan en los procesos del pool: sus
+    contadores son la suma de lo que reporta cada tarea.
+    """
+    granule_cache = get_granule_cache()
+    llm_cache = get_llm_cache()
+    giovanni_stats = None
+    if gcts.WEATHER_PROVIDER == "giovanni":
+        from src import giovanni
+        giovanni_stats = giovanni.stats()
+    return {
+        "coalescing": gcts.weather_flight.stats(),
+        "point_cache": gcts.point_cache.stats(),
+        "search_cache": nasa_pool.worker_cache_stats("search_cache"),
+        "area_cache": area_cache.stats(),
+        "data_handles": handle_store.stats(),
+        "chat_sessions": session_store.stats(),
+        "granule_cache": {
+            **granule_cache.stats(), **nasa_pool.worker_cache_stats("granule_cache")
+        } if granule_cache is not None else None,
+        "llm_cache": await asyncio.to_thread(llm_cache.stats) if llm_cache is not None else None,
+        "llm_tokens": dict(token_usage),
+        "llm_models": model_router.stats(),
+        "weather_provider": gcts.WEATHER_PROVIDER,
+        "giovanni": giovanni_stats,
+    }
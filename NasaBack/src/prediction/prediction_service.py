@@ -1,20 +1,16 @@
-from src.chatgpt_querys import chatgpt_query
+from src.chatgpt_querys import achatgpt_query, achatgpt_query_stream
+from src.sse import sse_event
 from entitys.models import *
-from src.gcts import get_weather_data
-import pandas as pd
+from src.gcts import get_weather_data_async, get_weather_data_batch_async
+from src.climatology import get_climatology_data
+from src.prompt_data import encode_weather_data
+from src.prediction.forecast_engine import build_forecast
+from src.weather_stats import weather_stats
+from src.weather_handles import store_weather_data
+import asyncio
 import json
 
-def getStats(data):
-    df = pd.DataFrame(data)
-    valores = df.iloc[:, 1]
-    
-    return {
-        'min': float(valores.min()),
-        'max': float(valores.max()),
-        'mean': float(valores.mean())
-    }
-
-def weather(data, start_time, end_time, user_plan=""):
+def weather_prompt(data, summary, start_time, end_time, user_plan=""):
     plan_context = f"\n\nPlan del usuario: {user_plan}\nGenera recomendaciones específicas considerando este plan." if user_plan.strip() else ""
     
     prompt = f"""
@@ -22,147 +18,224 @@ def weather(data, start_time, end_time, user_plan=""):
     
     CRITICAL INSTRUCTION: ALL RECOMMENDATIONS MUST BE WRITTEN IN ENGLISH LANGUAGE ONLY.
     
-    Eres un meteorólogo experto que analiza datos climáticos para generar predicciones y recomendaciones útiles para actividades al aire libre.
-    
-    Se desea hacer una predicción meteorológica de las siguientes variables:
-    - Velocidad del viento
-    - Precipitación
-    - Humedad
-    - Temperatura
-    - Presión superficial
-    - Radiación solar
-    - Radiación infrarroja
+    Eres un meteorólogo experto que genera recomendaciones útiles para actividades al aire libre.
+    El pronóstico numérico ya está calculado; NO generes datos por hora ni resúmenes.
+
+    Resumen del pronóstico para el período (temperaturas en Kelvin, precipitación en mm,
+    humedad específica en kg/kg, radiación en W/m², viento en m/s): {json.dumps(summary, ensure_ascii=False)}
 
-    Datos meteorológicos históricos del día (con estadísticas): {data}
+    Datos meteorológicos históricos del día (con estadísticas), en JSON columnar
+    ("d": fecha, "t": horas UTC, "v": valores por variable en el orden de "t", "s": estadísticas): {data}
 
     Período de predicción: 
     - Hora de inicio: {start_time}
     - Hora de fin: {end_time}{plan_context}
     
-    INSTRUCCIONES ESPECÍFICAS:
-    
-    1. Genera un JSON con predicciones por hora desde {start_time} hasta {end_time}
-    2. Crea un resumen general (summary) con promedios y condiciones generales
-    3. Usa presion_superficie, radiacion_infrarroja y radiacion_solar para determinar nubosidad
-    4. GENERA RECOMENDACIONES PERSONALIZADAS Y ESPECÍFICAS basadas en:
-       - Las condiciones climáticas predichas
-       - El rango horario específico
-       - Actividades típicas para ese período del día
-       - Precauciones de seguridad si es necesario
-       - Consejos de vestimenta y preparación
-       - El plan específico del usuario si fue proporcionado
+    GENERA RECOMENDACIONES PERSONALIZADAS Y ESPECÍFICAS basadas en:
+    - Las condiciones climáticas del resumen
+    - El rango horario específico
+    - Actividades típicas para ese período del día
+    - Precauciones de seguridad si es necesario
+    - Consejos de vestimenta y preparación
+    - El plan específico del usuario si fue proporcionado
     
     Las recomendaciones deben ser:
     - Específicas y accionables
     - Relacionadas directamente con los datos meteorológicos
-    - Útiles para planificar actividades
     - EN INGLÉS y con un tono amigable pero profesional
     - Entre 3-5 recomendaciones por respuesta
-    - Personalizadas según el plan del usuario cuando sea relevante
     
-    Ejemplo de estructura:
+    Estructura EXACTA de la respuesta:
     {{
-        "summary": {{
-            "temperatura": <valor_kelvin>,
-            "temperatura_min": <valor_kelvin>,
-            "temperatura_max": <valor_kelvin>,
-            "nubosidad": "<descripción_textual>",
-            "precipitacion": <valor_mm>,
-            "humedad": <valor_kg_kg>,
-            "radiacion_solar": <valor_w_m2>,
-            "velocidad_viento": <valor_m_s>
-        }},
-        "data": {{
-            "velocidad_viento": [
-                {{"time": "<hora>", "value": <valor>}},
-                {{"time": "<hora>", "value": <valor>}}
-            ],
-            "precipitacion": [
-                {{"time": "<hora>", "value": <valor>}},
-                {{"time": "<hora>", "value": <valor>}}
-            ],
-            "humedad": [
-                {{"time": "<hora>", "value": <valor>}},
-                {{"time": "<hora>", "value": <valor>}}
-            ],
-            "temperatura": [
-                {{"time": "<hora>", "value": <valor>}},
-                {{"time": "<hora>", "value": <valor>}}
-            ],
-            "presion_superficie": [
-                {{"time": "<hora>", "value": <valor>}},
-                {{"time": "<hora>", "value": <valor>}}
-            ],
-            "radiacion_solar": [
-                {{"time": "<hora>", "value": <valor>}},
-                {{"time": "<hora>", "value": <valor>}}
-            ],
-            "radiacion_infrarroja": [
-                {{"time": "<hora>", "value": <valor>}},
-                {{"time": "<hora>", "value": <valor>}}
-            ]
-        }},
         "recomendations": [
             "Specific recommendation based on temperature and humidity conditions",
             "Clothing advice considering wind and precipitation levels", 
-            "Activity suggestions appropriate for these weather conditions",
-            "Solar radiation precaution if necessary for UV protection",
-            "Hydration or protection recommendation based on conditions"
+            "Activity suggestions appropriate for these weather conditions"
         ]
     }}
     
-    IMPORTANTE: Cada variable en 'data' debe tener registros para cada hora desde {start_time} hasta {end_time}.
     CRITICAL: All recommendations MUST be written in ENGLISH language only.
-    Las recomendaciones deben ser contextuales, específicas y útiles para el usuario.
-    TOMA EN CUENTA QUE DATA DEBE TERNER POR CADA VARIABLE UN REGISTRO DE CADA HORA DESDE LA HORA INICIAL HASTA LA FINAL
     """
     
-    return chatgpt_query(prompt=prompt)
+    return prompt
+
+async def weather(data, summary, start_time, end_time, user_plan=""):
+    return await achatgpt_query(prompt=weather_prompt(data, summary, start_time, end_time, user_plan))
     
 """
 time_start - inicio del período en formato YYYY-MM-DDThh:mm:ss (UTC)
 time_end - fin del período en formato YYYY-MM-DDThh:mm:ss (UTC)
 """
-def predict(time: Time, location: Location, plan: str = ""):
-
+def _day_window(time: Time):
+    # Día completo: el motor numérico interpola cualquier rango horario
     start_time = f'2024-{str(time.month).zfill(2)}-{str(time.day).zfill(2)}T00:00:00'
-    end_time = f'2024-{str(time.month).zfill(2)}-{str(time.day).zfill(2)}T{time.start_time}:00'
-    
-    weather_data = get_weather_data(
-                        location.lat,
-                        location.lon,
-                        start_time,
-                        end_time
-                        )
-
-    simplified_data = {}
-
-    for variable, details in weather_data.items():
-        data_values_df = details['data']
-        
-        if data_values_df.empty:
-            continue
-            
-        value_column_name = data_values_df.columns[-1]
-        filtered_data = data_values_df[['time', value_column_name]].copy()
-        
-        simplified_data[variable] = {
-            'stats': getStats(filtered_data),
-            'data': filtered_data.to_dict(orient='records')
-        }
-        
-    
-    res = weather(simplified_data, time.start_time, time.end_time, plan)
-    print("📤 Plan del usuario:", plan)
-    print("🤖 Respuesta de ChatGPT:", res)
+    end_time = f'2024-{str(time.month).zfill(2)}-{str(time.day).zfill(2)}T23:59:59'
+    return start_time, end_time
+
+def _forecast_from_data(frame, time: Time):
+    """
+    Calcula el pronóstico numérico a partir del WeatherFrame del día.
+    Retorna (forecast, data_text) donde data_text son los datos compactos
+    para el prompt.
+    """
+    # 'data' y 'summary' se calculan numéricamente; el LLM solo escribe recomendaciones
+    forecast = build_forecast(frame, time.start_time, time.end_time)
+
+    # Estadísticas de todas las variables en una sola pasada
+    data_text, _ = encode_weather_data(frame, weather_stats(frame))
+    return forecast, data_text
+
+async def load_day_data(time: Time, location: Location):
+    """
+    WeatherFrame del día completo de (time, location). Es el frame que se
+    guarda con data_handle; /chat/weather/ lo usa igual cuando no recibe
+    handle, así los dos caminos ven los mismos datos.
+    """
+    start_time, end_time = _day_window(time)
     
+    # Primero la climatología precalculada (microsegundos); si no está
+    # disponible para la celda, descarga en vivo desde NASA
+    weather_data = get_climatology_data(location.lat, location.lon, start_time, end_time)
+    if weather_data is None:
+        weather_data = await get_weather_data_async(
+                            location.lat,
+                            location.lon,
+                            start_time,
+                            end_time,
+                            max_files=None
+                            )
+    return weather_data
+
+async def _load_forecast(time: Time, location: Location):
+    """
+    Obtiene los datos del día y calcula el pronóstico numérico.
+    Retorna (forecast, data_text, weather_data).
+    """
+    weather_data = await load_day_data(time, location)
+    forecast, data_text = _forecast_from_data(weather_data, time)
+    return forecast, data_text, weather_data
+
+def _parse_recomendations(res):
     # Intentar parsear el JSON y verificar recomendaciones
     try:
-        parsed_response = json.loads(res)
+        recomendations = json.loads(res).get('recomendations', [])
         print("✅ JSON parseado exitosamente")
-        print("📋 Recomendaciones encontradas:", parsed_response.get('recomendations', []))
-        return parsed_response
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, AttributeError) as e:
         print("❌ Error al parsear JSON:", str(e))
         print("🔍 Respuesta cruda:", res)
-        raise
\ No newline at end of file
+        recomendations = [res] if res else []
+
+    print("📋 Recomendaciones encontradas:", recomendations)
+    return recomendations
+
+async def predict(time: Time, location: Location, plan: str = ""):
+    forecast, data_text, weather_data = await _load_forecast(time, location)
+
+    res = await weather(data_text, forecast['summary'], time.start_time, time.end_time, plan)
+    print("📤 Plan del usuario:", plan)
+    print("🤖 Respuesta de ChatGPT:", res)
+    
+    return {
+        "summary": forecast['summary'],
+        "data": forecast['data'],
+        "recomendations": _parse_recomendations(res),
+        # Para /chat/weather/: reutiliza estos datos sin volver a descargarlos
+        "data_handle": store_weather_data(weather_data, location, time),
+    }
+
+async def predict_stream(time: Time, location: Location, plan: str = ""):
+    """
+    Versión en streaming de predict (eventos SSE):
+    - 'status' inmediatamente, antes de descargar datos
+    - 'summary' y 'data' en cuanto el pronóstico numérico está listo
+    - 'token' con cada fragmento de las recomendaciones del LLM
+    - 'recomendations' con la lista final y 'done' al terminar (con el
+      data_handle para /chat/weather/)
+    """
+    yield sse_event({"status": "loading"}, event="status")
+
+    try:
+        forecast, data_text, weather_data = await _load_forecast(time, location)
+        data_handle = store_weather_data(weather_data, location, time)
+        yield sse_event(forecast['summary'], event="summary")
+        yield sse_event(forecast['data'], event="data")
+
+        prompt = weather_prompt(data_text, forecast['summary'], time.start_time, time.end_time, plan)
+        parts = []
+        async for delta in achatgpt_query_stream(prompt=prompt):
+            parts.append(delta)
+            yield sse_event(delta, event="token")
+
+        yield sse_event(_parse_recomendations("".join(parts)), event="recomendations")
+        yield sse_event({"status": "success", "data_handle": data_handle}, event="done")
+    except Exception as e:
+        print(f"❌ Error en predict_stream: {e}")
+        yield sse_event({"status": "error", "detail": str(e)}, event="error")
+
+async def _predict_day_batch(items):
+    """
+    Datos de un mismo día para varios items: los que no están en la
+    climatología precalculada se leen juntos (cada granulo se abre una vez).
+    Retorna una lista de WeatherFrame en el orden de items.
+    """
+    start_time, end_time = _day_window(items[0].time)
+
+    weather_by_item = [
+        get_climatology_data(item.location.lat, item.location.lon, start_time, end_time)
+        for item in items
+    ]
+    missing = [i for i, weather_data in enumerate(weather_by_item) if weather_data is None]
+
+    if missing:
+        points = [(items[i].location.lat, items[i].location.lon) for i in missing]
+        fetched = await get_weather_data_batch_async(points, start_time, end_time, max_files=None)
+        for i, weather_data in zip(missing, fetched):
+            weather_by_item[i] = weather_data
+
+    return weather_by_item
+
+async def predict_batch(items, recommendations: bool = False):
+    """
+    Pronóstico para varios (location, time). Los items se agrupan por día
+    para compartir la lectura de los granulos; las recomendaciones de
+    ChatGPT (una llamada por item) solo se generan si se piden.
+    Retorna una lista de resultados en el orden de items.
+    """
+    groups = {}
+    for i, item in enumerate(items):
+        groups.setdefault((item.time.month, item.time.day), []).append(i)
+
+    group_keys = list(groups)
+    group_data = await asyncio.gather(
+        *(_predict_day_batch([items[i] for i in groups[key]]) for key in group_keys),
+        return_exceptions=True
+    )
+
+    weather_by_item = [None] * len(items)
+    errors = {}
+    for key, data in zip(group_keys, group_data):
+        for position, i in enumerate(groups[key]):
+            if isinstance(data, Exception):
+                errors[i] = str(data)
+            else:
+                weather_by_item[i] = data[position]
+
+    async def build(i, item):
+        if i in errors:
+            return {"status": "error", "detail": errors[i]}
+        try:
+            forecast, data_text = _forecast_from_data(weather_by_item[i], item.time)
+            result = {
+                "status": "success",
+                "summary": forecast['summary'],
+                "data": forecast['data'],
+            }
+            if recommendations:
+                res = await weather(data_text, forecast['summary'], item.time.start_time, item.time.end_time, item.plan)
+                result["recomendations"] = _parse_recomendations(res)
+            return result
+        except Exception as e:
+            print(f"❌ Error en item {i} del batch: {e}")
+            return {"status": "error", "detail": str(e)}
+
+    return await asyncio.gather(*(build(i, item) for i, item in enumerate(items)))
@@ -0,0 +1,205 @@
+import asyncio
+import itertools
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from config import NASA_POOL_SIZE
+from entitys.models import ProbabilityRequest
+from src.gcts import get_weather_data_async
+from src.weather_frame import WeatherFrame
+
+"""
+Motor de probabilidades de excedencia sobre varios años de GLDAS.
+
+Para una ubicación se lee la misma ventana de días (día pedido ± window_days)
+en cada año, se reduce cada año a métricas diarias (máximos, mínimos,
+totales) con operaciones vectorizadas de NumPy y solo se conservan esas
+métricas: los datos crudos de cada año se descartan en cuanto se reducen.
+Cada año se pide con get_weather_data_async, así que las descargas pasan
+por el mismo límite NASA_MAX_CONCURRENT_FETCHES que el resto de endpoints
+y por la coalescencia, pero sin guardarse en point_cache. A lo sumo
+NASA_POOL_SIZE años están en vuelo a la vez y se consumen a medida que
+terminan, así que en memoria solo quedan unos pocos años crudos.
+"""
+
+# Métricas diarias: nombre -> (variable de WEATHER_DATASETS, reducción)
+DAILY_METRICS = {
+    "temperatura_max": ("temperatura", "max"),
+    "temperatura_min": ("temperatura", "min"),
+    "precipitacion_total_mm": ("precipitacion", "sum_mm"),
+    "velocidad_viento_max": ("velocidad_viento", "max"),
+    "humedad_media": ("humedad", "mean"),
+    "radiacion_solar_max": ("radiacion_solar", "max"),
+}
+
+# Umbrales por defecto: nombre -> (métrica, operador, valor)
+DEFAULT_THRESHOLDS = {
+    "muy_caluroso": ("temperatura_max", ">", 305.15),     # > 32 °C
+    "muy_frio": ("temperatura_min", "<", 273.15),         # < 0 °C
+    "muy_humedo": ("precipitacion_total_mm", ">", 10.0),  # > 10 mm en el día
+    "muy_ventoso": ("velocidad_viento_max", ">", 10.0),   # > 10 m/s
+}
+
+PERCENTILES = [10, 25, 50, 75, 90]
+SECONDS_PER_STEP = 3 * 3600  # Tasas de GLDAS (kg/m²/s) en pasos de 3 horas
+
+
+def _year_window(year, month, day, window_days):
+    try:
+        center = pd.Timestamp(year, month, day)
+    except ValueError:
+        center = pd.Timestamp(year, month, 28)  # 29 de febrero en año no bisiesto
+
+    start = center - pd.Timedelta(days=window_days)
+    end = center + pd.Timedelta(days=window_days, hours=23, minutes=59)
+    return start.isoformat(), end.isoformat()
+
+
+async def _stream_years(lat, lon, month, day, years, window_days):
+    """
+    Genera (año, WeatherFrame) a medida que cada año termina, con a lo sumo
+    NASA_POOL_SIZE años en vuelo: cada año que termina deja lugar al
+    siguiente. Las descargas simultáneas las acota además el semáforo de NASA.
+    """
+    async def fetch_year(year):
+        start, end = _year_window(year, month, day, window_days)
+        try:
+            return year, await get_weather_data_async(lat, lon, start, end, max_files=None, cache=False)
+        except Exception as e:
+            print(f"❌ [PROB] Año {year}: {e}")
+            return year, WeatherFrame.empty()
+
+    remaining = iter(years)
+    pending = {asyncio.ensure_future(fetch_year(year)) for year in itertools.islice(remaining, NASA_POOL_SIZE)}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for year in itertools.islice(remaining, len(done)):
+                pending.add(asyncio.ensure_future(fetch_year(year)))
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _daily_metrics(frame):
+    """
+    Reduce un año a una matriz (días x métricas) con reduceat vectorizado.
+    Los tiempos del frame ya están ordenados.
+    """
+    if frame.is_empty:
+        return np.full((0, len(DAILY_METRICS)), np.nan, dtype=np.float32)
+
+    day_of_sample = frame.times.astype('datetime64[D]')
+    days, starts = np.unique(day_of_sample, return_index=True)
+    metrics = np.full((days.size, len(DAILY_METRICS)), np.nan, dtype=np.float32)
+
+    for k, (var_name, reduction) in enumerate(DAILY_METRICS.values()):
+        if var_name not in frame:
+            continue
+
+        values = frame.column(var_name).astype(np.float64)
+
+        if reduction == "max":
+            reduced = np.fmax.reduceat(values, starts)
+        elif reduction == "min":
+            reduced = np.fmin.reduceat(values, starts)
+        else:
+            # Los días sin ninguna muestra válida quedan en NaN (no en 0 mm)
+            sums = np.add.reduceat(np.nan_to_num(values), starts)
+            counts = np.add.reduceat(np.isfinite(values).astype(np.float64), starts)
+            if reduction == "sum_mm":
+                reduced = np.where(counts > 0, sums * SECONDS_PER_STEP, np.nan)
+            else:
+                reduced = np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)
+
+        metrics[:, k] = reduced
+
+    return metrics
+
+
+def _number(value):
+    """
+    float JSON-compatible (NaN -> None).
+    """
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _resolve_thresholds(overrides):
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for name, value in (overrides or {}).items():
+        if name not in thresholds:
+            raise ValueError(f"Umbral desconocido: {name}. Disponibles: {list(DEFAULT_THRESHOLDS)}")
+        metric, op, _ = thresholds[name]
+        thresholds[name] = (metric, op, float(value))
+    return thresholds
+
+
+async def exceedance_probabilities(request: ProbabilityRequest):
+    """
+    Percentiles de cada métrica diaria y probabilidad de superar cada umbral
+    en la ventana del día pedido, sobre todos los años solicitados.
+    Los días sin datos de una métrica no cuentan en sus muestras.
+    """
+    if request.end_year < request.start_year:
+        raise ValueError("end_year debe ser mayor o igual a start_year")
+
+    thresholds = _resolve_thresholds(request.thresholds)
+    years = list(range(request.start_year, request.end_year + 1))
+    metric_names = list(DAILY_METRICS)
+
+    per_year = []
+    years_with_data = []
+    async for year, frame in _stream_years(
+        request.location.lat, request.location.lon, request.month, request.day, years, request.window_days
+    ):
+        metrics = _daily_metrics(frame)
+        if metrics.size:
+            per_year.append(metrics)
+            years_with_data.append(year)
+        print(f"📊 [PROB] Año {year} reducido: {metrics.shape[0]} días")
+
+    if not per_year:
+        raise ValueError("No se obtuvieron datos para ningún año")
+
+    samples = np.concatenate(per_year, axis=0)  # (días totales x métricas)
+    valid_counts = np.isfinite(samples).sum(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Métricas sin ninguna muestra (NaN)
+        percentiles = np.nanpercentile(samples, PERCENTILES, axis=0)
+        means = np.nanmean(samples, axis=0)
+
+    statistics = {
+        name: {
+            "mean": _number(means[k]),
+            "percentiles": {f"p{p}": _number(percentiles[n, k]) for n, p in enumerate(PERCENTILES)},
+            "samples": int(valid_counts[k]),
+        }
+        for k, name in enumerate(metric_names)
+    }
+
+    probabilities = {}
+    for name, (metric, op, value) in thresholds.items():
+        column = samples[:, metric_names.index(metric)]
+        valid = np.isfinite(column)
+        hits = column[valid] > value if op == ">" else column[valid] < value
+        probabilities[name] = {
+            "metric": metric,
+            "condition": f"{op} {value}",
+            "probability": float(hits.mean()) if hits.size else None,
+            "samples": int(hits.size),
+        }
+
+    return {
+        "location": {"lat": request.location.lat, "lon": request.location.lon},
+        "day": request.day,
+        "month": request.month,
+        "window_days": request.window_days,
+        "years": years_with_data,
+        "statistics": statistics,
+        "probabilities": probabilities,
+    }
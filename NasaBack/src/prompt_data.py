@@ -0,0 +1,93 @@
+import json
+
+import pandas as pd
+
+from config import PROMPT_DATA_TOKEN_BUDGET
+
+"""
+Serialización compacta de datos meteorológicos para los prompts.
+
+Desde las columnas del WeatherFrame (sin pasar por registros) se genera un
+JSON columnar:
+    {"d":"2024-04-10","t":["00:00","03:00"],
+     "v":{"temperatura":[281.2,283.9]},
+     "s":{"temperatura":{"min":281.2,"max":283.9,"mean":282.55}}}
+Si el texto supera el presupuesto de tokens, las series se submuestrean
+(las estadísticas siempre se calculan con todos los datos).
+"""
+
+CHARS_PER_TOKEN = 4  # Aproximación para texto JSON en los modelos de OpenAI
+SIGNIFICANT_DIGITS = 4
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _round(value):
+    return float(f"{float(value):.{SIGNIFICANT_DIGITS}g}")
+
+
+def encode_weather_data(frame, stats=None, token_budget=None):
+    """
+    Codifica un WeatherFrame (y sus estadísticas de weather_stats) como
+    JSON columnar compacto dentro del presupuesto de tokens.
+    Retorna (texto, tokens_estimados).
+    """
+    token_budget = token_budget or PROMPT_DATA_TOKEN_BUDGET
+    stats = stats or {}
+
+    series = {}
+    all_times = []
+    for variable in frame.variables:
+        times, values = frame.valid(variable)
+        if not len(values):
+            continue
+        times = list(pd.DatetimeIndex(times))
+        series[variable] = (times, [_round(v) for v in values])
+        all_times.extend(times)
+
+    stats = {
+        variable: {k: _round(v) for k, v in variable_stats.items() if isinstance(v, (int, float))}
+        for variable, variable_stats in stats.items()
+    }
+
+    # Eje de tiempo compartido si todas las variables tienen los mismos tiempos
+    reference_times = next((times for times, _ in series.values() if times), [])
+    shared_axis = all(times == reference_times for times, _ in series.values())
+    same_day = len({t.date() for t in all_times}) <= 1
+
+    def time_label(t):
+        return t.strftime("%H:%M") if same_day else t.strftime("%Y-%m-%dT%H:%M")
+
+    def build(step):
+        payload = {}
+        if same_day and all_times:
+            payload["d"] = all_times[0].strftime("%Y-%m-%d")
+        if step is not None:
+            if shared_axis:
+                payload["t"] = [time_label(t) for t in reference_times[::step]]
+                payload["v"] = {variable: values[::step] for variable, (_, values) in series.items()}
+            else:
+                payload["v"] = {
+                    variable: {"t": [time_label(t) for t in times[::step]], "v": values[::step]}
+                    for variable, (times, values) in series.items()
+                }
+            if step > 1:
+                payload["step"] = step
+        payload["s"] = stats
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+    # Submuestrear hasta caber en el presupuesto; como último recurso solo estadísticas
+    longest = max((len(values) for _, values in series.values()), default=0)
+    step = 1
+    text = build(step)
+    while estimate_tokens(text) > token_budget and step < longest:
+        step += 1
+        text = build(step)
+    if estimate_tokens(text) > token_budget:
+        text = build(None)
+
+    tokens = estimate_tokens(text)
+    print(f"🧮 Datos del prompt: ~{tokens} tokens (presupuesto {token_budget}, paso {step})")
+    return text, tokens
@@ -0,0 +1,44 @@
+import asyncio
+
+"""
+Coalescencia de peticiones idénticas en vuelo ("single flight").
+
+Si varias peticiones concurrentes piden la misma clave, solo la primera
+ejecuta el trabajo; las demás esperan el mismo resultado. El trabajo corre
+en una tarea propia (protegida con shield) para que la cancelación de una
+petición no cancele a las demás.
+"""
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._in_flight = {}
+
+    async def do(self, key, factory):
+        """
+        Ejecuta factory() (una corrutina) una sola vez por clave en vuelo.
+        """
+        self.calls += 1
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            print(f"🔗 Petición coalescida con una descarga en curso: {key}")
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
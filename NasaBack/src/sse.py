@@ -0,0 +1,20 @@
+import json
+
+"""
+Utilidades para Server-Sent Events (StreamingResponse con text/event-stream).
+"""
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Evita que proxies (nginx) acumulen la respuesta
+}
+
+
+def sse_event(data, event=None):
+    """
+    Formatea un evento SSE. Los datos se envían como JSON en una sola línea.
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
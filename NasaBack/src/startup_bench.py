@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+"""
+Benchmark del arranque en frío de la API.
+
+Cada corrida es un proceso nuevo de Python (como un worker recién escalado)
+que mide:
+- import_s: tiempo de `import main` (módulos de la app y sus dependencias).
+- startup_s: tiempo del lifespan (creación del pool de NASA), con --lifespan.
+- first_request_s: latencia de la primera petición a --path.
+- heavy_loaded: dependencias pesadas que quedaron cargadas tras el import
+  (deben cargarse solo al usarse).
+- process_s: tiempo total del proceso, incluido el arranque del intérprete.
+
+Uso:
+    python -m src.startup_bench --runs 5
+    python -m src.startup_bench --runs 5 --lifespan --json
+    python -m src.startup_bench --importtime
+"""
+
+HEAVY_MODULES = ("earthaccess", "xarray", "h5py", "matplotlib", "openai", "pyarrow")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+heavy = [m for m in {heavy!r} if m in sys.modules]
+
+from fastapi.testclient import TestClient
+
+result = {{"import_s": imported - started, "heavy_loaded": heavy}}
+client = TestClient(main.app)
+if {lifespan!r}:
+    t = time.perf_counter()
+    client.__enter__()
+    result["startup_s"] = time.perf_counter() - t
+
+t = time.perf_counter()
+response = client.get({path!r})
+result["first_request_s"] = time.perf_counter() - t
+result["status"] = response.status_code
+
+if {lifespan!r}:
+    client.__exit__(None, None, None)
+print("@@" + json.dumps(result))
+"""
+
+
+def _run_once(path, lifespan):
+    code = CHILD.format(heavy=HEAVY_MODULES, path=path, lifespan=lifespan)
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+
+    for line in completed.stdout.splitlines():
+        if line.startswith("@@"):
+            result = json.loads(line[2:])
+            result["process_s"] = elapsed
+            return result
+
+    raise RuntimeError(f"La corrida falló:\n{completed.stderr[-2000:]}")
+
+
+def _summary(runs):
+    summary = {}
+    for key in ("import_s", "startup_s", "first_request_s", "process_s"):
+        values = [run[key] for run in runs if key in run]
+        if values:
+            summary[key] = {
+                "median": round(statistics.median(values), 4),
+                "min": round(min(values), 4),
+                "max": round(max(values), 4),
+            }
+    summary["heavy_loaded"] = sorted({m for run in runs for m in run["heavy_loaded"]})
+    summary["status"] = sorted({run["status"] for run in runs})
+    summary["runs"] = len(runs)
+    return summary
+
+
+def _importtime(top):
+    """
+    Módulos con mayor tiempo acumulado de import (python -X importtime).
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), module.strip()))
+
+    rows.sort(reverse=True)
+    for cumulative, module in rows[:top]:
+        print(f"{cumulative / 1000:9.1f} ms  {module}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío de la API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/predict/metrics", help="Ruta de la primera petición")
+    parser.add_argument("--lifespan", action="store_true", help="Incluir el arranque del pool de NASA")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    parser.add_argument("--importtime", action="store_true", help="Mostrar los imports más lentos")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        _importtime(args.top)
+        return
+
+    runs = [_run_once(args.path, args.lifespan) for _ in range(args.runs)]
+    summary = _summary(runs)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"⏱️  {summary['runs']} corridas ({args.path})")
+    for key in ("import_s", "startup_s", "first_request_s", "process_s"):
+        if key in summary:
+            s = summary[key]
+            print(f"   {key:<16} mediana {s['median'] * 1000:8.1f} ms  (min {s['min'] * 1000:.1f}, max {s['max'] * 1000:.1f})")
+    heavy = ", ".join(summary["heavy_loaded"]) or "ninguna"
+    print(f"   Dependencias pesadas cargadas al importar: {heavy}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+"""
+Representación en memoria de los datos meteorológicos de un punto.
+
+Un WeatherFrame es un eje de tiempo compartido (ordenado) y una matriz
+float32 tiempo x variable, más los metadatos de cada variable (código de
+GLDAS, descripción, unidades, colección) y el centro de la celda. Si los
+valores de origen son float64 (p. ej. los que llegan al CSV) se conservan
+en float64 para no perder precisión.
+Es lo que producen gcts y la climatología y lo que consumen el motor de
+pronóstico, las estadísticas, los prompts y el CSV; la conversión a
+DataFrame, registros o CSV se hace solo en los bordes (to_dataframe).
+
+column() y window() devuelven vistas (sin copiar); los tiempos suelen ser
+datetime64[ns], aunque el CSV también acepta etiquetas de texto ordenables.
+"""
+
+
+class WeatherFrame:
+    __slots__ = ("times", "variables", "values", "meta", "lat", "lon", "_positions")
+
+    def __init__(self, times, variables, values, meta=None, lat=None, lon=None):
+        self.times = np.asarray(times)
+        self.variables = tuple(variables)
+        values = np.asarray(values)
+        if values.dtype != np.float64:
+            values = values.astype(np.float32, copy=False)
+        self.values = values.reshape(len(self.times), len(self.variables))
+        self.meta = meta or {}
+        self.lat = lat
+        self.lon = lon
+        self._positions = {name: k for k, name in enumerate(self.variables)}
+
+    @classmethod
+    def empty(cls):
+        return cls(np.array([], dtype="datetime64[ns]"), [], np.empty((0, 0), dtype=np.float32))
+
+    @classmethod
+    def from_columns(cls, columns, meta=None, lat=None, lon=None):
+        """
+        Construye el frame desde {variable: (tiempos, valores)}; los tiempos
+        de todas las variables se unen en un solo eje (NaN donde falta dato).
+        """
+        columns = {name: (np.asarray(t), np.asarray(v)) for name, (t, v) in columns.items()}
+        if not columns:
+            return cls.empty()
+
+        times = np.unique(np.concatenate([t for t, _ in columns.values()]))
+        dtype = np.float64 if any(v.dtype == np.float64 for _, v in columns.values()) else np.float32
+        values = np.full((len(times), len(columns)), np.nan, dtype=dtype)
+        for k, (t, v) in enumerate(columns.values()):
+            values[np.searchsorted(times, t), k] = v
+
+        return cls(times, list(columns), values, meta, lat, lon)
+
+    @classmethod
+    def merge(cls, frames):
+        """
+        Une frames con variables distintas (p. ej. una por colección) y/o
+        períodos distintos en un solo frame.
+        """
+        frames = [f for f in frames if f is not None and not f.is_empty]
+        if not frames:
+            return cls.empty()
+        if len(frames) == 1:
+            return frames[0]
+
+        columns = {}
+        meta = {}
+        for frame in frames:
+            meta.update(frame.meta)
+            for name in frame.variables:
+                t, v = frame.times, frame.column(name)
+                if name in columns:
+                    t = np.concatenate([columns[name][0], t])
+                    v = np.concatenate([columns[name][1], v])
+                columns[name] = (t, v)
+
+        return cls.from_columns(columns, meta, frames[0].lat, frames[0].lon)
+
+    @property
+    def is_empty(self):
+        return len(self.times) == 0 or not self.variables
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.times.nbytes + 256 * len(self.variables)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def column(self, name):
+        """
+        Vista de los valores de una variable (sin copiar).
+        """
+        return self.values[:, self._positions[name]]
+
+    def valid(self, name):
+        """
+        (tiempos, valores) de la variable sin los NaN.
+        """
+        values = self.column(name)
+        mask = ~np.isnan(values)
+        return self.times[mask], values[mask]
+
+    def window(self, start, end):
+        """
+        Vista de las filas con start <= tiempo <= end.
+        """
+        if np.issubdtype(self.times.dtype, np.datetime64):
+            start, end = np.datetime64(pd.Timestamp(start)), np.datetime64(pd.Timestamp(end))
+        first = np.searchsorted(self.times, start, side="left")
+        last = np.searchsorted(self.times, end, side="right")
+        return WeatherFrame(self.times[first:last], self.variables, self.values[first:last], self.meta, self.lat, self.lon)
+
+    def select(self, names):
+        """
+        Frame con solo las variables pedidas (las que existan).
+        """
+        names = [name for name in names if name in self._positions]
+        positions = [self._positions[name] for name in names]
+        return WeatherFrame(self.times, names, self.values[:, positions], self.meta, self.lat, self.lon)
+
+    def to_dataframe(self, time_column="time"):
+        """
+        DataFrame ancho (tiempo + una columna por variable), para los bordes.
+        """
+        df = pd.DataFrame(self.values, columns=list(self.variables))
+        df.insert(0, time_column, self.times)
+        return df
@@ -0,0 +1,54 @@
+import secrets
+
+from config import DATA_HANDLE_MAX_BYTES, DATA_HANDLE_TTL
+from src.gcts import grid_cell
+from src.result_cache import MemoryTTLCache
+
+"""
+Datos de /predict/weather guardados en el servidor para reutilizarlos.
+
+predict guarda el WeatherFrame del día con un identificador corto
+(data_handle) que se devuelve al cliente; /chat/weather/ lo recibe y lee
+los datos de aquí en lugar de volver a descargarlos de NASA.
+Las entradas viven DATA_HANDLE_TTL segundos dentro de un presupuesto de
+DATA_HANDLE_MAX_BYTES (desalojo LRU).
+"""
+
+handle_store = MemoryTTLCache(
+    DATA_HANDLE_MAX_BYTES, DATA_HANDLE_TTL, sizeof=lambda entry: entry["frame"].nbytes + 256
+)
+
+
+def store_weather_data(frame, location, time):
+    """
+    Guarda el frame del día de (location, time) y retorna su data_handle.
+    """
+    handle = secrets.token_urlsafe(9)
+    handle_store.set(handle, {
+        "frame": frame,
+        "cell": grid_cell(location.lat, location.lon),
+        "month": time.month,
+        "day": time.day,
+    })
+    return handle
+
+
+def load_weather_data(handle, location, time):
+    """
+    WeatherFrame guardado con handle, o None si no existe, expiró o es de
+    otra celda u otro día (en ese caso se descarga como siempre).
+    """
+    if not handle:
+        return None
+
+    entry = handle_store.get(handle)
+    if entry is None:
+        print(f"⚠️  data_handle {handle} no encontrado o expirado; se descargan los datos")
+        return None
+
+    if entry["cell"] != grid_cell(location.lat, location.lon) or (entry["month"], entry["day"]) != (time.month, time.day):
+        print(f"⚠️  data_handle {handle} es de otra ubicación o fecha; se descargan los datos")
+        return None
+
+    print(f"♻️  Datos reutilizados con data_handle {handle}")
+    return entry["frame"]
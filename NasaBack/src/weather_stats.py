@@ -0,0 +1,65 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+"""
+Estadísticas de todas las variables en una sola pasada vectorizada.
+
+Sobre la matriz tiempo x variable de un WeatherFrame (float32, NaN donde
+falta el dato) se calculan a la vez, por columnas, mínimo, máximo, media,
+desviación estándar, percentiles y el momento de los extremos.
+"""
+
+PERCENTILES = (10, 50, 90)
+
+
+def compute_stats(times, names, matrix, percentiles=PERCENTILES):
+    """
+    Retorna {variable: {min, max, mean, std, p10.., count, time_min, time_max}}.
+    Las variables sin ningún dato se omiten.
+    """
+    if matrix.size == 0:
+        return {}
+
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=0)
+    has_data = counts > 0
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Columnas sin datos
+        mins = np.nanmin(matrix, axis=0)
+        maxs = np.nanmax(matrix, axis=0)
+        means = np.nanmean(matrix, axis=0, dtype=np.float64)
+        stds = np.nanstd(matrix, axis=0, dtype=np.float64)
+        pcts = np.nanpercentile(matrix, percentiles, axis=0)
+
+    # Posición de los extremos (NaN se reemplaza para que no gane)
+    argmin = np.where(valid, matrix, np.inf).argmin(axis=0)
+    argmax = np.where(valid, matrix, -np.inf).argmax(axis=0)
+
+    stats = {}
+    for k, name in enumerate(names):
+        if not has_data[k]:
+            continue
+        entry = {
+            'min': float(mins[k]),
+            'max': float(maxs[k]),
+            'mean': float(means[k]),
+            'std': float(stds[k]),
+        }
+        for p, values in zip(percentiles, pcts):
+            entry[f'p{p}'] = float(values[k])
+        entry['count'] = int(counts[k])
+        entry['time_min'] = times[argmin[k]].isoformat()
+        entry['time_max'] = times[argmax[k]].isoformat()
+        stats[name] = entry
+
+    return stats
+
+
+def weather_stats(frame):
+    """
+    Estadísticas de todas las variables de un WeatherFrame.
+    """
+    return compute_stats(pd.DatetimeIndex(frame.times), frame.variables, frame.values)
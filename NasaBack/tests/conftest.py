@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Los módulos de la app se importan como en main.py (config, src.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test")
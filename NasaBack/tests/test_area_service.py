@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from src.gcts import GLDAS_NLAT, GLDAS_NLON
+from src.prediction.area_service import _choose_stride, _reduced_cells
+
+
+@pytest.mark.parametrize("max_size", [8, 9, 17, 64, 100, 256])
+def test_reduced_area_never_exceeds_max_size(max_size):
+    rng = np.random.default_rng(max_size)
+    for _ in range(2000):
+        i0, i1 = sorted(rng.integers(0, GLDAS_NLAT, 2))
+        j0, j1 = sorted(rng.integers(0, GLDAS_NLON, 2))
+        stride = _choose_stride((i0, i1), (j0, j1), max_size)
+
+        assert _reduced_cells(i0, i1, stride) <= max_size
+        assert _reduced_cells(j0, j1, stride) <= max_size
+        if stride > 1:
+            # El stride anterior no alcanzaba: es el mínimo
+            smaller = stride - 1
+            assert _reduced_cells(i0, i1, smaller) > max_size or _reduced_cells(j0, j1, smaller) > max_size
+
+
+def test_stride_is_not_limited_to_powers_of_two():
+    # Malla completa a 8 celdas por lado: 1440 / 8 = 180 (antes se quedaba en 32)
+    assert _choose_stride((0, GLDAS_NLAT - 1), (0, GLDAS_NLON - 1), 8) == 180
+    assert _choose_stride((0, 99), (0, 99), 64) == 2
+    assert _choose_stride((10, 73), (0, 63), 64) == 1
@@ -0,0 +1,144 @@
+import asyncio
+import json
+
+from config import CHAT_PROMPT_TOKEN_BUDGET
+from src.chat import chat_service
+from src.chat.chat_sessions import ChatSession, get_or_create_session, record_turn, session_store
+from src.chatgpt_querys import ERROR_MESSAGE
+from src.prompt_data import estimate_tokens
+
+
+def _event_data(event):
+    return json.loads(event.split("data: ", 1)[1])
+
+
+def test_session_is_stored_only_after_its_first_turn():
+    size = len(session_store)
+    session = get_or_create_session(None, "contexto")
+    assert session.id is None and len(session_store) == size
+
+    record_turn(session, "¿Llueve?", "No")
+    assert session.id is not None
+    assert get_or_create_session(session.id) is session
+
+
+def test_failed_chat_does_not_create_a_session(monkeypatch):
+    async def failing(prompt, **kwargs):
+        return ERROR_MESSAGE
+
+    monkeypatch.setattr(chat_service, "achatgpt_query", failing)
+    size = len(session_store)
+
+    result = asyncio.run(chat_service.simple_chat("hola", current_time="2024-06-01T10:00"))
+
+    assert result["session_id"] is None
+    assert len(session_store) == size
+
+
+def test_prompt_fits_the_budget_with_a_large_context():
+    session = ChatSession(context="datos " * (CHAT_PROMPT_TOKEN_BUDGET * 4))
+    session.summary = "El usuario planea un picnic."
+    session.turns = [("¿Llueve?", "No")]
+
+    prompt = chat_service.build_session_prompt(session, "¿Qué llevo?")
+
+    assert estimate_tokens(prompt) <= CHAT_PROMPT_TOKEN_BUDGET
+    assert "El usuario planea un picnic." in prompt
+    assert prompt.rstrip().endswith("¿Qué llevo?")
+
+
+def test_stream_error_event_keeps_the_existing_session_id(monkeypatch):
+    session = get_or_create_session(None, "contexto")
+    record_turn(session, "¿Llueve?", "No")
+
+    async def broken(prompt, **kwargs):
+        raise RuntimeError("sin conexión")
+        yield
+
+    monkeypatch.setattr(chat_service, "achatgpt_query_stream", broken)
+
+    async def events():
+        return [event async for event in chat_service.simple_chat_stream("hola", session_id=session.id)]
+
+    result = asyncio.run(events())
+
+    assert result[-1].startswith("event: error")
+    assert _event_data(result[-1])["session_id"] == session.id
+
+
+def test_chat_and_summaries_skip_the_llm_cache(monkeypatch):
+    from src.chat import chat_sessions
+
+    calls = []
+
+    async def query(prompt, **kwargs):
+        calls.append(kwargs.get("use_cache", True))
+        return "respuesta"
+
+    async def stream(prompt, **kwargs):
+        calls.append(kwargs.get("use_cache", True))
+        yield "respuesta"
+
+    monkeypatch.setattr(chat_service, "achatgpt_query", query)
+    monkeypatch.setattr(chat_service, "achatgpt_query_stream", stream)
+    monkeypatch.setattr(chat_sessions, "achatgpt_query", query)
+
+    async def run():
+        await chat_service.simple_chat("hola")
+        [event async for event in chat_service.simple_chat_stream("hola")]
+        await chat_sessions._summarize("", [("¿Llueve?", "No")])
+
+    asyncio.run(run())
+
+    assert calls == [False, False, False]
+
+
+def test_expired_session_without_context_asks_for_it(monkeypatch):
+    calls = []
+
+    async def query(prompt, **kwargs):
+        calls.append(prompt)
+        return "respuesta"
+
+    monkeypatch.setattr(chat_service, "achatgpt_query", query)
+    size = len(session_store)
+
+    result = asyncio.run(chat_service.simple_chat("¿Y mañana?", session_id="expirada"))
+
+    assert result["status"] == "session_expired" and result["session_expired"] is True
+    assert result["session_id"] is None
+    assert calls == [] and len(session_store) == size  # Sin respuesta ni sesión sin contexto
+
+
+def test_expired_session_with_resent_context_starts_a_new_one(monkeypatch):
+    prompts = []
+
+    async def query(prompt, **kwargs):
+        prompts.append(prompt)
+        return "respuesta"
+
+    monkeypatch.setattr(chat_service, "achatgpt_query", query)
+    location = {"lat": 19.4, "lon": -99.1, "address": "CDMX"}
+
+    result = asyncio.run(chat_service.simple_chat("¿Y mañana?", location=location, session_id="expirada"))
+
+    assert result["status"] == "success" and result["session_expired"] is True
+    assert result["session_id"] not in (None, "expirada")
+    assert "CDMX" in prompts[0]
+    assert get_or_create_session(result["session_id"]).context
+
+
+def test_expired_session_stream_emits_a_single_event(monkeypatch):
+    async def stream(prompt, **kwargs):
+        raise AssertionError("no debe llamar a ChatGPT sin contexto")
+        yield
+
+    monkeypatch.setattr(chat_service, "achatgpt_query_stream", stream)
+
+    async def events():
+        return [event async for event in chat_service.simple_chat_stream("¿Y mañana?", session_id="expirada")]
+
+    result = asyncio.run(events())
+
+    assert len(result) == 1 and result[0].startswith("event: session_expired")
+    assert _event_data(result[0])["session_expired"] is True
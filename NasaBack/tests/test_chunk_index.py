@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+h5py = pytest.importorskip("h5py")
+xr = pytest.importorskip("xarray")
+
+from src.chunk_index import build_chunk_index, read_point
+
+FILL = -9999.0
+
+
+class LocalRangeSession:
+    """
+    Sesión falsa que responde peticiones Range leyendo el archivo local.
+    """
+
+    class _Response:
+        status_code = 206
+
+        def __init__(self, content):
+            self.content = content
+
+        def raise_for_status(self):
+            pass
+
+    def __init__(self, path):
+        self.path = path
+        self.requests = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests += 1
+        start, end = (int(v) for v in headers["Range"][len("bytes="):].split("-"))
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return self._Response(f.read(end - start + 1))
+
+
+@pytest.fixture
+def granule(tmp_path):
+    """
+    Granulo pequeño con la estructura de GLDAS: (time, lat, lon), chunks,
+    shuffle + deflate + fletcher32, valores de relleno y scale_factor.
+    """
+    rng = np.random.default_rng(1)
+    lat = -59.875 + 0.25 * np.arange(12)
+    lon = -179.875 + 0.25 * np.arange(20)
+    values = rng.uniform(200, 320, size=(4, 12, 20)).astype("float32")
+    values[1, 3, 5] = FILL
+    packed = rng.integers(0, 5000, size=(4, 12, 20)).astype("int16")
+
+    path = tmp_path / "granule.nc4"
+    with h5py.File(path, "w") as f:
+        f.create_dataset("lat", data=lat.astype("float32"))
+        f.create_dataset("lon", data=lon.astype("float32"))
+        time = f.create_dataset("time", data=np.arange(4, dtype="int32") * 180)
+        time.attrs["units"] = b"minutes since 2024-04-10 00:00:00"
+
+        tair = f.create_dataset(
+            "Tair_f_inst", data=values, chunks=(1, 5, 7), compression="gzip",
+            shuffle=True, fletcher32=True, fillvalue=FILL,
+        )
+        tair.attrs["_FillValue"] = np.float32(FILL)
+
+        rain = f.create_dataset("Rainf_f_tavg", data=packed, chunks=(2, 4, 8), compression="gzip")
+        rain.attrs["scale_factor"] = np.float32(0.5)
+        rain.attrs["add_offset"] = np.float32(1.0)
+
+        # Sin _FillValue y casi todo en cero, como la lluvia real
+        dry = np.zeros((4, 12, 20), dtype="float32")
+        dry[2, 6, 10] = 1.5e-5
+        f.create_dataset("Rainf_tavg", data=dry, chunks=(1, 6, 10), compression="gzip")
+
+        for name in ("lat", "lon", "time"):
+            f[name].make_scale(name)
+        for name in ("Tair_f_inst", "Rainf_f_tavg", "Rainf_tavg"):
+            for axis, dim in enumerate(("time", "lat", "lon")):
+                f[name].dims[axis].attach_scale(f[dim])
+
+    return path
+
+
+@pytest.mark.parametrize("i, j", [(0, 0), (3, 5), (7, 13), (11, 19)])
+def test_read_point_matches_xarray(granule, i, j):
+    with open(granule, "rb") as fileobj:
+        index = build_chunk_index(fileobj, "granule", "https://example/granule.nc4")
+
+    session = LocalRangeSession(granule)
+    results = read_point(index, session, ["Tair_f_inst", "Rainf_f_tavg", "Rainf_tavg"], i, j)
+
+    with xr.open_dataset(granule) as ds:
+        expected = ds.isel(lat=i, lon=j).load()
+
+    for name in ("Tair_f_inst", "Rainf_f_tavg", "Rainf_tavg"):
+        column = expected[name].values.astype("float64")
+        valid = ~np.isnan(column)
+        times, values = results[name]
+        np.testing.assert_array_equal(times, expected["time"].values[valid])
+        np.testing.assert_allclose(values, column[valid].astype("float32"), rtol=0, atol=0)
+
+
+def test_read_point_masks_fill_values(granule):
+    with open(granule, "rb") as fileobj:
+        index = build_chunk_index(fileobj, "granule", "https://example/granule.nc4")
+
+    times, _ = read_point(index, LocalRangeSession(granule), ["Tair_f_inst"], 3, 5)["Tair_f_inst"]
+    assert len(times) == 3
+    assert pd.Timestamp(times[0]) == pd.Timestamp("2024-04-10 00:00")
+    assert pd.Timestamp("2024-04-10 03:00") not in set(pd.to_datetime(times))
+
+
+def test_zeros_are_kept_without_fill_value_attribute(granule):
+    with open(granule, "rb") as fileobj:
+        index = build_chunk_index(fileobj, "granule", "https://example/granule.nc4")
+
+    assert index["variables"]["Rainf_tavg"]["fill_values"] == []
+    times, values = read_point(index, LocalRangeSession(granule), ["Rainf_tavg"], 6, 10)["Rainf_tavg"]
+    assert len(times) == 4
+    np.testing.assert_array_equal(values, np.array([0, 0, 1.5e-5, 0], dtype="float32"))
+
+
+def test_read_point_rejects_cells_outside_the_grid(granule):
+    with open(granule, "rb") as fileobj:
+        index = build_chunk_index(fileobj, "granule", "https://example/granule.nc4")
+
+    with pytest.raises(ValueError):
+        read_point(index, LocalRangeSession(granule), ["Tair_f_inst"], 12, 0)
+
+
+def test_collection_data_reads_cached_granules_before_byte_ranges(granule, tmp_path, monkeypatch):
+    from src import gcts
+    from src.granule_cache import GranuleCache
+
+    cache = GranuleCache(str(tmp_path / "cache"), 1024**3)
+    with open(granule, "rb") as src, open(cache.path_for("cached"), "wb") as dst:
+        dst.write(src.read())
+
+    granules = [{"id": "cached", "url": "https://example/cached"}, {"id": "remote", "url": "https://example/remote"}]
+    ranged = []
+
+    def fake_read_point_with_index(collection_name, missing, variable_names, lat, lon):
+        ranged.extend(g["id"] for g in missing)
+        return {}
+
+    monkeypatch.setattr(gcts, "get_granule_cache", lambda: cache)
+    monkeypatch.setattr(gcts, "search_granules", lambda *args, **kwargs: granules)
+    monkeypatch.setattr(gcts, "read_point_with_index", fake_read_point_with_index)
+    monkeypatch.setattr(gcts, "CHUNK_INDEX_ENABLED", True)
+
+    configs = {"temperatura": gcts.WEATHER_DATASETS["temperatura"]}
+    frame = gcts._process_get_collection_data(
+        "GLDAS_NOAH025_3H", configs, -59.0, -178.0, "2024-04-10T00:00:00", "2024-04-10T12:00:00"
+    )
+
+    assert ranged == ["remote"]
+    assert cache.hits == 1
+    assert len(frame.valid("temperatura")[0]) == 4
+
+
+def test_batch_reads_byte_ranges_like_single_points(granule, monkeypatch):
+    import earthaccess
+
+    from src import gcts
+
+    with open(granule, "rb") as fileobj:
+        index = build_chunk_index(fileobj, "granule", "https://example/granule.nc4")
+    session = LocalRangeSession(granule)
+
+    def no_full_download(*args):
+        raise AssertionError("el batch no debe descargar granulos completos")
+
+    monkeypatch.setattr(earthaccess, "get_fsspec_https_session", lambda: None)
+    monkeypatch.setattr(earthaccess, "get_requests_https_session", lambda: session)
+    monkeypatch.setattr(gcts, "get_chunk_index", lambda granule_id, url, fs: index)
+    monkeypatch.setattr(gcts, "get_granule_cache", lambda: None)
+    monkeypatch.setattr(gcts, "search_granules", lambda *args, **kwargs: [{"id": "granule", "url": index["url"]}])
+    monkeypatch.setattr(gcts, "open_granules", no_full_download)
+    monkeypatch.setattr(gcts, "CHUNK_INDEX_ENABLED", True)
+
+    configs = {"temperatura": gcts.WEATHER_DATASETS["temperatura"]}
+    window = ("2024-04-10T00:00:00", "2024-04-10T12:00:00")
+    points = [(-59.0, -178.0), (-57.5, -175.5)]
+
+    singles = [gcts._process_get_collection_data("GLDAS_NOAH025_3H", configs, lat, lon, *window) for lat, lon in points]
+    single_requests = session.requests
+    session.requests = 0
+
+    batch = gcts._process_get_collection_points("GLDAS_NOAH025_3H", configs, points, *window)
+
+    assert 0 < session.requests <= single_requests
+    for single, frame in zip(singles, batch):
+        np.testing.assert_array_equal(frame.valid("temperatura")[1], single.valid("temperatura")[1])
+        assert len(frame.valid("temperatura")[1]) > 0
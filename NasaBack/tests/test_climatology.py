@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from src import climatology
+from src.climatology import (
+    DAYS, FILL, QUANTIZATION_RANGES, SLOTS, ClimatologyStore, _dequantize, _quantization, _quantize, day_index
+)
+from src.gcts import GLDAS_NLAT, GLDAS_NLON, grid_cell
+
+
+@pytest.mark.parametrize("variable", sorted(QUANTIZATION_RANGES))
+def test_quantize_round_trip_within_one_step(variable):
+    low, high = QUANTIZATION_RANGES[variable]
+    _, scale = _quantization(variable)
+    values = np.linspace(low, high, 1001)
+
+    restored = _dequantize(_quantize(values, variable), variable)
+
+    assert np.abs(restored - values).max() <= scale
+    assert _quantize(np.array([np.nan]), variable)[0] == FILL
+    assert np.isnan(_dequantize(np.array([FILL], dtype=np.int16), variable)[0])
+
+
+def test_out_of_range_values_are_clipped():
+    restored = _dequantize(_quantize(np.array([-5.0, 500.0]), "Tair_f_inst"), "Tair_f_inst")
+    np.testing.assert_allclose(restored, QUANTIZATION_RANGES["Tair_f_inst"], atol=_quantization("Tair_f_inst")[1])
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    Almacén con una sola celda de tierra en (19.4, -99.1).
+    """
+    variables = ["Tair_f_inst", "Rainf_f_tavg"]
+    cells = np.full((GLDAS_NLAT, GLDAS_NLON), -1, dtype=np.int32)
+    cells[grid_cell(19.4, -99.1)] = 0
+    np.save(tmp_path / "cells.npy", cells)
+
+    shape = (1, DAYS, SLOTS, len(variables))
+    values = np.memmap(tmp_path / "values.dat", dtype=np.int16, mode="w+", shape=shape)
+    values[:] = FILL
+    day = day_index(4, 10)
+    values[0, day, :, 0] = _quantize(280.0 + np.arange(SLOTS), "Tair_f_inst")
+    values[0, day, :, 1] = _quantize(np.where(np.arange(SLOTS) == 5, np.nan, 1e-4), "Rainf_f_tavg")
+    values.flush()
+    del values
+
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"variables": variables, "shape": list(shape)}, f)
+
+    store = ClimatologyStore(str(tmp_path))
+    monkeypatch.setattr(climatology, "_store", store)
+    return store
+
+
+def test_read_day_returns_the_slots_of_the_cell(store):
+    matrix = store.read_day(19.4, -99.1, 4, 10)
+
+    assert matrix.shape == (SLOTS, 2)
+    np.testing.assert_allclose(matrix[:, 0], 280.0 + np.arange(SLOTS), atol=_quantization("Tair_f_inst")[1])
+    assert np.isnan(matrix[5, 1]) and not np.isnan(matrix[4, 1])
+    assert store.read_day(0.0, -30.0, 4, 10) is None  # Océano
+
+
+def test_climatology_frame_window(store):
+    frame = climatology.get_climatology_data(19.4, -99.1, "2024-04-10T04:30:00", "2024-04-10T12:00:00")
+
+    assert set(frame.variables) == {"precipitacion", "temperatura"}
+    assert [str(t)[11:16] for t in frame.times] == ["03:00", "06:00", "09:00", "12:00"]
+    _, values = frame.valid("temperatura")
+    np.testing.assert_allclose(values, [281.0, 282.0, 283.0, 284.0], atol=_quantization("Tair_f_inst")[1])
+
+    # Día sin datos en el almacén: se usa la descarga en vivo
+    assert climatology.get_climatology_data(19.4, -99.1, "2024-04-11T00:00:00", "2024-04-11T23:59:59") is None
@@ -0,0 +1,64 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from entitys.models import WeatherData
+from src.csv.csv_service import generate_weather_export, iter_weather_csv, weather_frame_from_data
+
+VARIABLES = list(WeatherData.model_fields)
+
+
+def baseline_csv(weather_data):
+    """
+    CSV como lo generaba la versión con DataFrames (un merge por variable).
+    """
+    data_frames = []
+    timestamps = set()
+    for var_name, var_info in weather_data.model_dump().items():
+        df = pd.DataFrame(var_info.items(), columns=["Timestamp", var_name])
+        timestamps.update(df["Timestamp"])
+        data_frames.append(df)
+
+    consolidated_df = pd.DataFrame(sorted(timestamps), columns=["Timestamp"])
+    for df in data_frames:
+        consolidated_df = pd.merge(consolidated_df, df, on="Timestamp", how="left")
+
+    buffer = io.StringIO()
+    consolidated_df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _weather_data(rows, seed=0, gaps=True):
+    rng = np.random.default_rng(seed)
+    times = [f"2024-04-{10 + k // 8:02d}T{3 * (k % 8):02d}:00:00" for k in range(rows)]
+    data = {}
+    for n, name in enumerate(VARIABLES):
+        values = rng.normal(0, 10.0 ** rng.integers(-6, 6), rows)
+        keep = rng.random(rows) > (0.2 if gaps else 0)  # Variables con huecos distintos
+        data[name] = {t: float(v) for t, v, k in zip(times, values, keep) if k}
+    data["humedad"][times[0]] = 0.0123456789
+    data["temperatura"][times[0]] = 293.15000000000003
+    return WeatherData(**data)
+
+
+@pytest.mark.parametrize("rows, gaps", [(1, False), (16, True), (240, True)])
+def test_csv_is_byte_identical_to_baseline(rows, gaps):
+    weather_data = _weather_data(rows, seed=rows, gaps=gaps)
+    expected = baseline_csv(weather_data)
+
+    _, _, chunks = generate_weather_export(31.0, -116.0, weather_data, "csv")
+    assert "".join(chunks) == expected
+
+    # También al partir en bloques pequeños
+    assert "".join(iter_weather_csv(weather_frame_from_data(weather_data), chunk_rows=7)) == expected
+
+
+def test_csv_keeps_full_precision():
+    weather_data = _weather_data(1, gaps=False)
+    _, _, chunks = generate_weather_export(31.0, -116.0, weather_data, "csv")
+    content = "".join(chunks)
+
+    assert "0.0123456789" in content
+    assert "293.15000000000003" in content
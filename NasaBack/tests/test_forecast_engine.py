@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.prediction import prediction_service
+from src.prediction.forecast_engine import SECONDS_PER_HOUR, EmptyForecastError, _hours, build_forecast
+from src.weather_frame import WeatherFrame
+
+
+def _day_frame(**columns):
+    times = np.datetime64("2024-04-10T00:00", "ns") + np.arange(8) * np.timedelta64(3, "h")
+    return WeatherFrame.from_columns({
+        name: (times, np.full(8, value, dtype=np.float32)) for name, value in columns.items()
+    })
+
+
+def test_window_wraps_midnight():
+    assert list(_hours("22:00", "02:30")) == [22, 23, 0, 1, 2]
+    assert list(_hours("09:00", "11:00")) == [9, 10, 11]
+    assert list(_hours("15:00", "15:00")) == [15]
+
+
+def test_wrapped_window_labels_and_values():
+    forecast = build_forecast(_day_frame(temperatura=290.0), "23:00", "01:00")
+
+    assert [row["time"] for row in forecast["data"]["temperatura"]] == ["23:00", "00:00", "01:00"]
+    assert forecast["summary"]["temperatura"] == pytest.approx(290.0)
+
+
+@pytest.mark.parametrize("start, end, hours", [("10:00", "14:00", 4), ("22:00", "02:00", 4), ("08:00", "08:00", 0)])
+def test_precipitation_uses_window_duration(start, end, hours):
+    rate = 1e-4  # kg/m²/s
+    forecast = build_forecast(_day_frame(precipitacion=rate), start, end)
+
+    assert forecast["summary"]["precipitacion"] == pytest.approx(rate * hours * SECONDS_PER_HOUR, rel=1e-5)
+
+
+def test_empty_frame_is_an_error():
+    with pytest.raises(EmptyForecastError):
+        build_forecast(WeatherFrame.empty(), "10:00", "12:00")
+
+
+def test_weather_endpoint_returns_404_without_data(monkeypatch):
+    import main
+
+    monkeypatch.setattr(prediction_service, "get_climatology_data", lambda *args: WeatherFrame.empty())
+    response = TestClient(main.app).post("/predict/weather", json={
+        "time": {"day": 10, "month": 4, "start_time": "10:00", "end_time": "12:00"},
+        "location": {"lat": 31.0, "lon": -116.0},
+    })
+
+    assert response.status_code == 404
@@ -0,0 +1,177 @@
+import numpy as np
+import pytest
+
+from src import giovanni
+from src.giovanni import TimeSeriesParser, parse_time_series
+
+BODY = (
+    "prod_name,GLDAS_NOAH025_3H_2_1\n"
+    "param_name,GLDAS_NOAH025_3H_2_1_Tair_f_inst\n"
+    "unit,K\n"
+    "begin_time,2024-04-10T00:00:00Z\n"
+    "end_time,2024-04-10T12:00:00Z\n"
+    "lat,19.375\n"
+    "lon,-99.125\n"
+    "fill_value,-9999.0\n"
+    "\n"
+    "Timestamp (UTC),GLDAS_NOAH025_3H_2_1_Tair_f_inst\n"
+    "2024-04-10T00:00:00Z,285.5\n"
+    "2024-04-10T03:00:00Z,-9999.0\n"
+    "2024-04-10T06:00:00Z,283.25\n"
+    "2024-04-10T09:00:00Z,288.0\n"
+    "2024-04-10T12:00:00Z,292.75\n"
+)
+
+EXPECTED_TIMES = np.array(
+    ["2024-04-10T00:00", "2024-04-10T03:00", "2024-04-10T06:00", "2024-04-10T09:00", "2024-04-10T12:00"],
+    dtype="datetime64[ns]",
+)
+EXPECTED_VALUES = np.array([285.5, np.nan, 283.25, 288.0, 292.75], dtype=np.float32)
+
+
+def _parse_chunks(body, sizes):
+    parser = TimeSeriesParser()
+    position = 0
+    for size in sizes:
+        parser.feed(body[position:position + size])
+        position += size
+    parser.feed(body[position:])
+    return parser.close()
+
+
+def _check(result):
+    headers, times, values = result
+    assert headers["param_name"] == "GLDAS_NOAH025_3H_2_1_Tair_f_inst"
+    assert headers["fill_value"] == "-9999.0"
+    np.testing.assert_array_equal(times, EXPECTED_TIMES)
+    np.testing.assert_array_equal(values, EXPECTED_VALUES)  # El valor de relleno queda en NaN
+
+
+def test_whole_body():
+    _check(parse_time_series(BODY))
+
+
+@pytest.mark.parametrize("line_ending", ["\n", "\r\n"])
+@pytest.mark.parametrize("seed", range(5))
+def test_body_split_at_arbitrary_byte_boundaries(line_ending, seed):
+    body = BODY.replace("\n", line_ending).encode("utf-8")
+    sizes = np.random.default_rng(seed).integers(1, 40, size=len(body)).tolist()
+
+    _check(_parse_chunks(body, sizes))
+
+
+def test_blocks_larger_than_parse_block(monkeypatch):
+    monkeypatch.setattr(giovanni, "PARSE_BLOCK_BYTES", 64)  # Obliga a parsear por bloques
+    body = BODY.encode("utf-8")
+
+    _check(_parse_chunks(body, [7] * (len(body) // 7)))
+
+
+def test_error_body_raises():
+    html = b"<html><head><title>503 Service Unavailable</title></head><body>Try later</body></html>"
+
+    with pytest.raises(ValueError):
+        _parse_chunks(html, [10, 10, 10])
+
+
+def test_header_only_body_is_empty():
+    headers, times, values = parse_time_series(BODY.split("2024-04-10T00:00:00Z,285.5")[0])
+
+    assert headers["param_name"] == "GLDAS_NOAH025_3H_2_1_Tair_f_inst"
+    assert times.size == 0 and values.size == 0
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def iter_content(self, size):
+        data = self.text.encode("utf-8")
+        return (data[k:k + size] for k in range(0, len(data), size))
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeGiovanniSession:
+    """
+    Signin entrega tokens tok-1, tok-2, ...; la serie rechaza los tokens
+    en revoked con 401.
+    """
+
+    def __init__(self, revoked=()):
+        self.revoked = set(revoked)
+        self.signins = 0
+        self.series_tokens = []
+
+    def get(self, url, params=None, headers=None, auth=None, timeout=None, stream=False, allow_redirects=True):
+        if url == giovanni.SIGNIN_URL:
+            self.signins += 1
+            return FakeResponse(200, f'"tok-{self.signins}"')
+
+        token = headers["authorizationtoken"]
+        self.series_tokens.append(token)
+        if token in self.revoked:
+            return FakeResponse(401, "unauthorized")
+        return FakeResponse(200, BODY)
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    def install(revoked=()):
+        session = FakeGiovanniSession(revoked)
+        monkeypatch.setattr(giovanni, "_session", session)
+        monkeypatch.setattr(giovanni, "_token", None)
+        monkeypatch.setattr(giovanni, "_token_expires", 0.0)
+        monkeypatch.setattr(giovanni, "counters", dict.fromkeys(giovanni.counters, 0))
+        return session
+    return install
+
+
+def test_token_is_reused_between_requests(fake_session):
+    session = fake_session()
+
+    for _ in range(3):
+        _check(giovanni.fetch_time_series(19.4, -99.1, "2024-04-10T00:00:00", "2024-04-10T12:00:00", "code"))
+
+    assert session.signins == 1
+    assert session.series_tokens == ["tok-1"] * 3
+
+
+def test_401_refreshes_the_token_once_and_retries(fake_session):
+    session = fake_session(revoked={"tok-1"})
+
+    _check(giovanni.fetch_time_series(19.4, -99.1, "2024-04-10T00:00:00", "2024-04-10T12:00:00", "code"))
+
+    assert session.signins == 2
+    assert session.series_tokens == ["tok-1", "tok-2"]
+    assert giovanni.counters["token_refreshes"] == 1 and giovanni.counters["requests"] == 2
+
+
+def test_stale_token_from_another_thread_is_not_refreshed_again(fake_session):
+    session = fake_session()
+    first = giovanni.get_token()
+    second = giovanni.get_token(stale=first)
+
+    # Otro hilo reporta el mismo token vencido: ya se renovó, no hay otro signin
+    assert giovanni.get_token(stale=first) == second
+    assert session.signins == 2
+
+
+def test_repeated_401_raises(fake_session):
+    fake_session(revoked={"tok-1", "tok-2"})
+
+    with pytest.raises(RuntimeError):
+        giovanni.fetch_time_series(19.4, -99.1, "2024-04-10T00:00:00", "2024-04-10T12:00:00", "code")
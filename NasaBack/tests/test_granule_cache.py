@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from src.granule_cache import GranuleCache
+
+
+class FakeSession:
+    """
+    Sesión falsa: cada URL devuelve su contenido en bytes.
+    """
+
+    class _Response:
+        def __init__(self, body, fail):
+            self.body = body
+            self.fail = fail
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def raise_for_status(self):
+            if self.fail:
+                raise RuntimeError("HTTP 500")
+
+        def iter_content(self, chunk_size):
+            for k in range(0, len(self.body), chunk_size):
+                yield self.body[k:k + chunk_size]
+
+    def __init__(self, bodies, fail=()):
+        self.bodies = bodies
+        self.fail = set(fail)
+        self.downloads = []
+
+    def get(self, url, stream=False, timeout=None):
+        self.downloads.append(url)
+        return self._Response(self.bodies.get(url, b""), url in self.fail)
+
+
+def _age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_fetch_downloads_once(tmp_path):
+    cache = GranuleCache(str(tmp_path), 1024)
+    session = FakeSession({"u1": b"granule-1"})
+
+    first = cache.fetch("g1", "u1", session)
+    second = cache.fetch("g1", "u1", session)
+
+    assert first == second
+    assert session.downloads == ["u1"]
+    with open(first, "rb") as f:
+        assert f.read() == b"granule-1"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["files"]) == (1, 1, 1)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = GranuleCache(str(tmp_path), 25)
+    session = FakeSession({"u1": b"a" * 10, "u2": b"b" * 10, "u3": b"c" * 10})
+
+    path1 = cache.fetch("g1", "u1", session)
+    path2 = cache.fetch("g2", "u2", session)
+    _age(path1, 20)
+    _age(path2, 10)
+    cache.get("g1")  # g1 pasa a ser el más reciente
+
+    path3 = cache.fetch("g3", "u3", session)
+
+    assert os.path.exists(path1) and os.path.exists(path3)
+    assert not os.path.exists(path2)
+    assert cache.evictions == 1
+    assert cache.stats()["bytes"] <= 25
+
+
+def test_failed_download_leaves_no_files(tmp_path):
+    cache = GranuleCache(str(tmp_path), 1024)
+    session = FakeSession({"u1": b"partial"}, fail={"u1"})
+
+    with pytest.raises(RuntimeError):
+        cache.fetch("g1", "u1", session)
+
+    assert os.listdir(tmp_path) == []
+    assert cache.get("g1") is None
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.gcts import (
+    grid_cell, GLDAS_LAT_ORIGIN, GLDAS_LON_ORIGIN, GLDAS_NLAT, GLDAS_NLON, GLDAS_RESOLUTION
+)
+
+LATS = pd.Index(GLDAS_LAT_ORIGIN + GLDAS_RESOLUTION * np.arange(GLDAS_NLAT))
+LONS = pd.Index(GLDAS_LON_ORIGIN + GLDAS_RESOLUTION * np.arange(GLDAS_NLON))
+
+
+def _xarray_cell(lat, lon):
+    # Lo que hace sel(method='nearest') sobre las coordenadas del granulo
+    return (
+        int(LATS.get_indexer([lat], method="nearest")[0]),
+        int(LONS.get_indexer([lon], method="nearest")[0]),
+    )
+
+
+@pytest.mark.parametrize("lat, lon, expected", [
+    (32.0, -116.0, (368, 256)),     # Empate a media celda: gana el índice mayor
+    (10.25, 0.0, (281, 720)),
+    (31.8578, -116.6058, (367, 253)),
+    (-90.0, -180.0, (0, 0)),        # Fuera de la malla: celda del borde
+    (90.0, 180.0, (GLDAS_NLAT - 1, GLDAS_NLON - 1)),
+])
+def test_grid_cell_known_points(lat, lon, expected):
+    assert grid_cell(lat, lon) == expected
+    assert grid_cell(lat, lon) == _xarray_cell(lat, lon)
+
+
+def test_grid_cell_matches_xarray_on_ties_and_random_points():
+    rng = np.random.default_rng(0)
+    edges_lat = GLDAS_LAT_ORIGIN + GLDAS_RESOLUTION * (np.arange(GLDAS_NLAT) + 0.5)
+    edges_lon = GLDAS_LON_ORIGIN + GLDAS_RESOLUTION * (np.arange(GLDAS_NLON) + 0.5)
+    lats = np.concatenate([edges_lat[::7], rng.uniform(-60, 90, 500)])
+    lons = np.concatenate([edges_lon[::29], rng.uniform(-180, 180, 500)])
+
+    for lat, lon in zip(lats, lons):
+        assert grid_cell(lat, lon) == _xarray_cell(lat, lon), (lat, lon)
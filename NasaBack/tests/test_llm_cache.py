@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+from src import llm_cache
+from src.llm_cache import LLMCache
+
+
+def test_running_size_tracks_inserts_replacements_and_evictions(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), 3600, 25)
+
+    cache.set("a", "m", "x" * 10)
+    cache.set("b", "m", "y" * 10)
+    cache.set("a", "m", "z" * 5)  # Reemplazo: cuenta solo el nuevo tamaño
+    assert cache._bytes == 15
+
+    cache.get("a")  # "b" pasa a ser la de acceso más antiguo
+    cache.set("c", "m", "w" * 12)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "z" * 5
+    assert cache.evictions == 1
+    assert cache._bytes == cache.stats()["bytes"] == 17
+
+
+def test_size_is_resynced_with_other_writers(tmp_path, monkeypatch):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMCache(path, 3600, 1000)
+    other_worker = LLMCache(path, 3600, 1000)
+
+    other_worker.set("a", "m", "x" * 100)
+    cache.set("b", "m", "y" * 10)
+    assert cache._bytes == 10  # Todavía no ve lo que escribió el otro worker
+
+    monkeypatch.setattr(llm_cache, "SYNC_INTERVAL", 0)
+    cache.set("c", "m", "z" * 10)
+    assert cache._bytes == 120
+
+
+def test_async_calls_run_off_the_event_loop(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), 3600, 1000)
+    threads = []
+    original_get = LLMCache.get
+
+    def recording_get(self, key):
+        threads.append(threading.current_thread())
+        return original_get(self, key)
+
+    monkeypatch.setattr(LLMCache, "get", recording_get)
+
+    async def run():
+        await cache.aset("k", "m", "respuesta")
+        return await cache.aget("k")
+
+    assert asyncio.run(run()) == "respuesta"
+    assert threads and threads[0] is not threading.main_thread()
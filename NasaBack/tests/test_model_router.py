@@ -0,0 +1,196 @@
+import asyncio
+import time
+
+import pytest
+
+from src import chatgpt_querys
+from src.model_router import CircuitBreaker, ModelRouter
+
+
+def test_breaker_opens_then_half_opens_after_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10.0)
+
+    breaker.record_failure()
+    assert breaker.state() == "closed"
+    breaker.record_failure()
+    assert breaker.state() == "open" and not breaker.allow()
+
+    now[0] += 10.0
+    assert breaker.state() == "half_open"
+    assert breaker.allow()          # Primer llamador: hace la prueba
+    assert not breaker.allow()      # Los demás esperan su resultado
+
+    breaker.record_failure()        # Falló la prueba: abre con el doble de espera
+    assert breaker.state() == "open" and breaker.cooldown == 20.0
+    now[0] += 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state() == "closed" and breaker.cooldown == 10.0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_released_or_stale_probe_lets_another_caller_try(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=5.0)
+    breaker.record_failure()
+    now[0] += 5.0
+
+    assert breaker.allow()
+    breaker.release()               # La prueba se canceló sin resultado
+    assert breaker.allow()
+    now[0] += 5.0                   # Nunca reportó: se da por perdida
+    assert breaker.allow()
+
+
+def test_permanent_error_opens_with_max_cooldown():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=1.0, max_cooldown=60.0)
+    breaker.record_failure(permanent=True)
+    assert breaker.state() == "open" and breaker.cooldown == 60.0
+
+
+def test_losing_primary_counts_as_timeout():
+    router = ModelRouter(["slow", "fast"], failure_threshold=1, cooldown=60.0)
+
+    async def call(model, timeout):
+        await asyncio.sleep(10 if model == "slow" else 0.01)
+        return model
+
+    result = asyncio.run(router.run("slow", call, attempt_timeout=5.0, deadline=5.0, hedge_delay=0.05))
+
+    assert result == ("fast", "fast")
+    stats = router.stats()
+    assert stats["hedge_wins"] == 1 and stats["timeouts"] == 1
+    assert stats["models"]["slow"]["state"] == "open"
+    assert stats["models"]["fast"]["state"] == "closed"
+
+
+def test_half_open_allows_a_single_concurrent_trial(monkeypatch):
+    router = ModelRouter(["flaky", "backup"], failure_threshold=1, cooldown=0.05)
+    router.record_failure("flaky")
+    calls = []
+
+    async def call(model, timeout):
+        calls.append(model)
+        await asyncio.sleep(0.05)
+        return model
+
+    async def run_many():
+        await asyncio.sleep(0.06)
+        return await asyncio.gather(*(router.run("flaky", call, 1.0, 1.0) for _ in range(5)))
+
+    results = asyncio.run(run_many())
+
+    assert calls.count("flaky") == 1
+    assert sorted(model for model, _ in results) == ["backup"] * 4 + ["flaky"]
+    assert router.stats()["models"]["flaky"]["state"] == "closed"
+
+
+class _Delta:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.delta = _Delta(content)
+
+
+class _Chunk:
+    usage = None
+
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+class _FakeStream:
+    def __init__(self, pieces, fail_after=None, delay=0.0):
+        self.pieces = pieces
+        self.fail_after = fail_after
+        self.delay = delay
+        self.closed = False
+
+    async def __aiter__(self):
+        for k, piece in enumerate(self.pieces):
+            if k == self.fail_after:
+                raise ConnectionError("conexión cerrada")
+            await asyncio.sleep(self.delay)
+            yield _Chunk(piece)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeClient:
+    def __init__(self, stream):
+        self.stream = stream
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        return self.stream
+
+
+def _use_stream(monkeypatch, stream, deadline=5.0):
+    router = ModelRouter(["m1", "m2"], failure_threshold=1, cooldown=60.0)
+    monkeypatch.setattr(chatgpt_querys, "model_router", router)
+    monkeypatch.setattr(chatgpt_querys, "get_async_client", lambda: _FakeClient(stream))
+    monkeypatch.setattr(chatgpt_querys, "LLM_DEADLINE", deadline)
+    monkeypatch.setattr(chatgpt_querys, "_openai_semaphore", None)
+    return router
+
+
+async def _collect(prompt="hola"):
+    parts = []
+    try:
+        async for delta in chatgpt_querys.achatgpt_query_stream(prompt, model="m1", use_cache=False):
+            parts.append(delta)
+    except Exception as e:
+        return parts, e
+    return parts, None
+
+
+def test_stream_failure_after_tokens_is_an_error(monkeypatch):
+    stream = _FakeStream(["Hola", " mundo", "!"], fail_after=2)
+    router = _use_stream(monkeypatch, stream)
+
+    parts, error = asyncio.run(_collect())
+
+    assert parts == ["Hola", " mundo"]
+    assert isinstance(error, chatgpt_querys.StreamTruncatedError)
+    assert router.stats()["models"]["m1"]["state"] == "open"
+    assert stream.closed
+
+
+def test_stream_reading_is_bounded_by_the_deadline(monkeypatch):
+    stream = _FakeStream(["a"] * 100, delay=0.05)
+    router = _use_stream(monkeypatch, stream, deadline=0.3)
+
+    started = time.monotonic()
+    parts, error = asyncio.run(_collect())
+
+    assert time.monotonic() - started < 1.0
+    assert 0 < len(parts) < 100
+    assert isinstance(error, chatgpt_querys.StreamTruncatedError)
+    assert router.stats()["timeouts"] == 1
+
+
+def test_truncated_chat_stream_ends_with_an_error_event(monkeypatch):
+    from src.chat import chat_service
+
+    async def truncated(prompt, **kwargs):
+        yield "Parcial"
+        raise chatgpt_querys.StreamTruncatedError("se interrumpió")
+
+    monkeypatch.setattr(chat_service, "achatgpt_query_stream", truncated)
+
+    async def events():
+        return [event async for event in chat_service.simple_chat_stream("hola")]
+
+    result = asyncio.run(events())
+
+    assert result[0].startswith("event: token")
+    assert result[-1].startswith("event: error")
+    assert not any(event.startswith("event: done") for event in result)
@@ -0,0 +1,52 @@
+from concurrent.futures import Future
+
+import pytest
+
+from src import gcts, nasa_pool
+
+
+@pytest.fixture(autouse=True)
+def clean_counters(monkeypatch):
+    monkeypatch.setattr(nasa_pool, "worker_counters", {})
+
+
+def _search_twice():
+    gcts.search_cache.get(("missing",))
+    gcts.search_cache.set(("found",), [])
+    gcts.search_cache.get(("found",))
+    return "ok"
+
+
+def test_task_reports_its_cache_counter_deltas():
+    result, deltas = nasa_pool._run_counted(_search_twice, (), {})
+
+    assert result == "ok"
+    assert deltas["search_cache"] == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_counters_are_summed_when_the_task_finishes():
+    inner, outer = Future(), Future()
+    inner.add_done_callback(lambda done: nasa_pool._resolve_counted(done, outer))
+
+    inner.set_result(("frame", {"search_cache": {"hits": 2, "misses": 1, "evictions": 0}}))
+    nasa_pool._resolve_counted(inner, Future())  # Segunda tarea con los mismos contadores
+
+    assert outer.result() == "frame"
+    stats = nasa_pool.worker_cache_stats("search_cache")
+    assert (stats["hits"], stats["misses"]) == (4, 2)
+    assert stats["hit_rate"] == pytest.approx(4 / 6)
+
+
+def test_errors_and_cancellation_reach_the_caller():
+    inner, outer = Future(), Future()
+    inner.set_exception(RuntimeError("granulo roto"))
+    nasa_pool._resolve_counted(inner, outer)
+    with pytest.raises(RuntimeError):
+        outer.result()
+
+    inner, outer = Future(), Future()
+    outer.cancel()
+    inner.set_result(("frame", {}))
+    nasa_pool._resolve_counted(inner, outer)  # No falla si el llamador ya canceló
+    assert outer.cancelled()
+    assert nasa_pool.worker_cache_stats("granule_cache")["hits"] == 0
@@ -0,0 +1,123 @@
+import asyncio
+import concurrent.futures
+
+import numpy as np
+import pytest
+
+from entitys.models import ProbabilityRequest
+from src import gcts
+from src.prediction import probability_service
+from src.prediction.probability_service import DAILY_METRICS, SECONDS_PER_STEP, _daily_metrics
+from src.weather_frame import WeatherFrame
+
+PRECIP = list(DAILY_METRICS).index("precipitacion_total_mm")
+TMAX = list(DAILY_METRICS).index("temperatura_max")
+
+
+def _frame(start, rain, temperature):
+    times = np.datetime64(start, "ns") + np.arange(len(rain)) * np.timedelta64(3, "h")
+    return WeatherFrame.from_columns({
+        "precipitacion": (times, np.asarray(rain, dtype=np.float32)),
+        "temperatura": (times, np.asarray(temperature, dtype=np.float32)),
+    })
+
+
+def test_daily_precipitation_ignores_missing_samples():
+    nan = np.nan
+    rain = [1e-4, nan, 2e-4, nan, nan, nan, nan, nan] + [nan] * 8
+    frame = _frame("2024-04-10T00:00", rain, [300.0] * 16)
+
+    metrics = _daily_metrics(frame)
+
+    assert metrics.shape[0] == 2
+    assert metrics[0, PRECIP] == pytest.approx(3e-4 * SECONDS_PER_STEP, rel=1e-5)
+    assert np.isnan(metrics[1, PRECIP])  # Día sin datos: NaN, no 0 mm
+    assert metrics[1, TMAX] == pytest.approx(300.0)
+
+
+def test_days_without_data_are_excluded_from_probabilities(monkeypatch):
+    async def fake_get_weather_data(lat, lon, start, end, max_files=2, cache=True):
+        year = int(start[:4])
+        # 2001 sin precipitación; 2002 con 12 mm el único día
+        rain = [np.nan] * 8 if year == 2001 else [12.0 / (8 * SECONDS_PER_STEP)] * 8
+        return _frame(f"{year}-04-10T00:00", rain, [300.0] * 8)
+
+    monkeypatch.setattr(probability_service, "get_weather_data_async", fake_get_weather_data)
+    request = ProbabilityRequest(
+        location={"lat": 31.0, "lon": -116.0}, month=4, day=10, window_days=0, start_year=2001, end_year=2002
+    )
+
+    result = asyncio.run(probability_service.exceedance_probabilities(request))
+
+    wet = result["probabilities"]["muy_humedo"]
+    assert wet["samples"] == 1
+    assert wet["probability"] == 1.0
+    assert result["statistics"]["precipitacion_total_mm"]["samples"] == 1
+    assert result["statistics"]["temperatura_max"]["samples"] == 2
+
+
+def test_years_share_the_nasa_fetch_limit(monkeypatch):
+    active = 0
+    peak = 0
+    submitted = []
+
+    def fake_submit(lat, lon, start, end, max_files=2):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        submitted.append(start[:4])
+        future = concurrent.futures.Future()
+
+        def finish():
+            nonlocal active
+            active -= 1
+            future.set_result(_frame(start[:16], [0.0] * 8, [290.0] * 8))
+
+        asyncio.get_running_loop().call_later(0.01, finish)
+        return {future: "GLDAS_NOAH025_3H"}
+
+    async def run():
+        monkeypatch.setattr(gcts, "_nasa_semaphore", asyncio.Semaphore(2))
+        request = ProbabilityRequest(
+            location={"lat": 31.0, "lon": -116.0}, month=4, day=10, window_days=0, start_year=2001, end_year=2008
+        )
+        return await probability_service.exceedance_probabilities(request)
+
+    monkeypatch.setattr(gcts, "WEATHER_PROVIDER", "granules")
+    monkeypatch.setattr(gcts, "submit_weather_tasks", fake_submit)
+    monkeypatch.setattr(gcts, "point_cache", gcts.MemoryTTLCache(1024**2, 60, sizeof=lambda frame: frame.nbytes))
+
+    result = asyncio.run(run())
+
+    assert sorted(submitted) == [str(year) for year in range(2001, 2009)]
+    assert peak == 2
+    assert result["years"] and sorted(result["years"]) == list(range(2001, 2009))
+    assert len(gcts.point_cache) == 0  # Los años no se guardan en point_cache
+
+
+def test_at_most_pool_size_years_in_flight(monkeypatch):
+    active = 0
+    peak = 0
+    fetched = []
+
+    async def fake_get_weather_data(lat, lon, start, end, max_files=2, cache=True):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        fetched.append((start[:4], cache))
+        return _frame(f"{start[:10]}T00:00", [0.0] * 8, [290.0] * 8)
+
+    monkeypatch.setattr(probability_service, "NASA_POOL_SIZE", 3)
+    monkeypatch.setattr(probability_service, "get_weather_data_async", fake_get_weather_data)
+    request = ProbabilityRequest(
+        location={"lat": 31.0, "lon": -116.0}, month=4, day=10, window_days=0, start_year=2001, end_year=2010
+    )
+
+    result = asyncio.run(probability_service.exceedance_probabilities(request))
+
+    assert peak == 3
+    assert sorted(year for year, _ in fetched) == [str(year) for year in range(2001, 2011)]
+    assert not any(cache for _, cache in fetched)
+    assert sorted(result["years"]) == list(range(2001, 2011))
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import PROMPT_DATA_TOKEN_BUDGET
+from src.prompt_data import encode_weather_data, estimate_tokens
+from src.weather_frame import WeatherFrame
+from src.weather_stats import weather_stats
+
+
+def _frame(steps, start="2024-04-10T00:00", **columns):
+    times = np.datetime64(start, "ns") + np.arange(steps) * np.timedelta64(3, "h")
+    return WeatherFrame.from_columns({name: (times, np.asarray(values, dtype=np.float32)) for name, values in columns.items()})
+
+
+def test_day_frame_decodes_back_to_the_frame():
+    frame = _frame(8, temperatura=280 + np.arange(8) * 1.25, humedad=np.linspace(0.004, 0.011, 8))
+
+    text, tokens = encode_weather_data(frame, weather_stats(frame))
+    payload = json.loads(text)
+
+    assert tokens == estimate_tokens(text) <= PROMPT_DATA_TOKEN_BUDGET
+    assert payload["d"] == "2024-04-10"
+    assert payload["t"] == [f"{h:02d}:00" for h in range(0, 24, 3)]
+    for name in ("temperatura", "humedad"):
+        np.testing.assert_allclose(payload["v"][name], frame.column(name), rtol=1e-3)
+    assert payload["s"]["temperatura"]["max"] == pytest.approx(288.75, rel=1e-3)  # 4 cifras significativas
+    assert "step" not in payload
+
+
+def test_long_series_are_subsampled_within_the_budget():
+    steps = 8 * 30
+    rng = np.random.default_rng(3)
+    frame = _frame(steps, temperatura=rng.uniform(270, 310, steps), velocidad_viento=rng.uniform(0, 15, steps))
+
+    text, tokens = encode_weather_data(frame, weather_stats(frame))
+    payload = json.loads(text)
+
+    assert tokens <= PROMPT_DATA_TOKEN_BUDGET
+    step = payload["step"]
+    assert step > 1 and "d" not in payload
+    times = pd.DatetimeIndex(frame.times[::step])
+    assert payload["t"] == [t.strftime("%Y-%m-%dT%H:%M") for t in times]
+    np.testing.assert_allclose(payload["v"]["temperatura"], frame.column("temperatura")[::step], rtol=1e-3)
+    # Las estadísticas siempre usan todos los datos
+    assert payload["s"]["temperatura"]["max"] == pytest.approx(float(frame.column("temperatura").max()), rel=1e-3)
+
+
+def test_variables_with_different_times_get_their_own_axis():
+    rain = [1e-5, np.nan, 2e-5, np.nan, 0.0, 0.0, np.nan, 0.0]
+    frame = _frame(8, temperatura=[290.0] * 8, precipitacion=rain)
+
+    payload = json.loads(encode_weather_data(frame)[0])
+
+    assert "t" not in payload
+    assert payload["v"]["precipitacion"]["t"] == ["00:00", "06:00", "12:00", "15:00", "21:00"]
+    assert payload["v"]["precipitacion"]["v"] == [1e-5, 2e-5, 0.0, 0.0, 0.0]
+    assert len(payload["v"]["temperatura"]["t"]) == 8
+
+
+def test_tiny_budget_keeps_only_statistics():
+    frame = _frame(8, temperatura=280 + np.arange(8))
+
+    payload = json.loads(encode_weather_data(frame, weather_stats(frame), token_budget=30)[0])
+
+    assert "v" not in payload
+    assert payload["s"]["temperatura"]["min"] == pytest.approx(280.0)
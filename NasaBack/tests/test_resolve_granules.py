@@ -0,0 +1,44 @@
+import pandas as pd
+
+from src.gcts import resolve_granules
+
+
+def _names(refs):
+    return [ref["id"].split(":", 1)[1] for ref in refs]
+
+
+def test_full_day_maps_to_eight_granules():
+    refs = resolve_granules("GLDAS_NOAH025_3H", "2024-04-10T00:00:00", "2024-04-10T23:59:59")
+
+    assert _names(refs) == [f"GLDAS_NOAH025_3H.A20240410.{h:02d}00.021.nc4" for h in range(0, 24, 3)]
+    assert refs[0]["url"] == (
+        "https://data.gesdisc.earthdata.nasa.gov/data/GLDAS/GLDAS_NOAH025_3H.2.1/2024/101/"
+        "GLDAS_NOAH025_3H.A20240410.0000.021.nc4"
+    )
+
+
+def test_unaligned_start_includes_the_granule_that_contains_it():
+    refs = resolve_granules("GLDAS_NOAH025_3H", "2024-04-10T04:30:00", "2024-04-10T09:00:00")
+
+    assert _names(refs) == [
+        "GLDAS_NOAH025_3H.A20240410.0300.021.nc4",
+        "GLDAS_NOAH025_3H.A20240410.0600.021.nc4",
+        "GLDAS_NOAH025_3H.A20240410.0900.021.nc4",
+    ]
+
+
+def test_year_edge_uses_day_of_year_directories():
+    refs = resolve_granules("GLDAS_NOAH025_3H", "2024-12-31T21:00:00", "2025-01-01T00:00:00")
+
+    assert [ref["url"].rsplit("/", 3)[1:3] for ref in refs] == [["2024", "366"], ["2025", "001"]]
+    assert _names(refs) == [
+        "GLDAS_NOAH025_3H.A20241231.2100.021.nc4",
+        "GLDAS_NOAH025_3H.A20250101.0000.021.nc4",
+    ]
+
+
+def test_recent_periods_and_unknown_collections_fall_back_to_cmr():
+    now = pd.Timestamp.now().floor("h")
+
+    assert resolve_granules("GLDAS_NOAH025_3H", str(now - pd.Timedelta(hours=6)), str(now)) is None
+    assert resolve_granules("M2T1NXSLV", "2024-04-10T00:00:00", "2024-04-10T23:59:59") is None
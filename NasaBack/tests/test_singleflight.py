@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from src.singleflight import SingleFlight
+
+
+def test_concurrent_calls_run_once_and_share_the_result():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "frame"
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        other = await flight.do("other", work)
+        return results, other
+
+    results, other = asyncio.run(run())
+
+    assert results == ["frame"] * 5 and other == "frame"
+    assert len(runs) == 2
+    assert flight.stats() == {"calls": 6, "executions": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_concurrent_calls_all_see_the_exception():
+    flight = SingleFlight()
+    runs = []
+
+    async def failing():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("NASA no responde")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert len(runs) == 1
+    assert all(isinstance(r, RuntimeError) and str(r) == "NASA no responde" for r in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_finished_key_runs_again():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        return len(runs)
+
+    async def run():
+        return await flight.do("key", work), await flight.do("key", work)
+
+    assert asyncio.run(run()) == (1, 2)
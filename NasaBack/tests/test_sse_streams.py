@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import numpy as np
+
+from entitys.models import Location, Time
+from src.chat import chat_service
+from src.prediction import prediction_service
+from src.weather_frame import WeatherFrame
+
+TIME = Time(day=10, month=4, start_time="09:00", end_time="15:00")
+LOCATION = Location(lat=19.4, lon=-99.1)
+
+
+def _parse(events):
+    """
+    [(evento, datos)] de los eventos SSE generados.
+    """
+    parsed = []
+    for event in events:
+        name, data = event.strip().split("\n")
+        parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def _collect(stream):
+    async def run():
+        return [event async for event in stream]
+    return _parse(asyncio.run(run()))
+
+
+def _day_frame():
+    times = np.datetime64("2024-04-10T00:00", "ns") + np.arange(8) * np.timedelta64(3, "h")
+    return WeatherFrame.from_columns({"temperatura": (times, 280 + np.arange(8, dtype=np.float32))})
+
+
+def test_predict_stream_event_order(monkeypatch):
+    async def load_day_data(time, location):
+        return _day_frame()
+
+    async def stream(prompt, **kwargs):
+        yield '{"recomendations": ["Lleva'
+        yield ' agua"]}'
+
+    monkeypatch.setattr(prediction_service, "load_day_data", load_day_data)
+    monkeypatch.setattr(prediction_service, "achatgpt_query_stream", stream)
+
+    events = _collect(prediction_service.predict_stream(TIME, LOCATION, "caminar"))
+
+    assert [name for name, _ in events] == ["status", "summary", "data", "token", "token", "recomendations", "done"]
+    assert events[0][1] == {"status": "loading"}
+    assert events[1][1]["temperatura"] is not None
+    assert events[5][1] == ["Lleva agua"]
+    assert events[6][1]["status"] == "success" and events[6][1]["data_handle"]
+
+
+def test_predict_stream_reports_failures_as_an_error_event(monkeypatch):
+    async def load_day_data(time, location):
+        raise RuntimeError("NASA no responde")
+
+    monkeypatch.setattr(prediction_service, "load_day_data", load_day_data)
+
+    events = _collect(prediction_service.predict_stream(TIME, LOCATION))
+
+    assert [name for name, _ in events] == ["status", "error"]
+    assert events[1][1] == {"status": "error", "detail": "NASA no responde"}
+
+
+def test_simple_chat_stream_event_order(monkeypatch):
+    async def stream(prompt, **kwargs):
+        for part in ("Hoy ", "no ", "llueve"):
+            yield part
+
+    monkeypatch.setattr(chat_service, "achatgpt_query_stream", stream)
+
+    events = _collect(chat_service.simple_chat_stream("¿Llueve?", current_time="2024-04-10T09:00"))
+
+    assert [name for name, _ in events] == ["token", "token", "token", "done"]
+    assert events[-1][1]["response"] == "Hoy no llueve"
+    assert events[-1][1]["session_id"]
+
+
+def test_simple_chat_stream_error_before_any_token(monkeypatch):
+    async def stream(prompt, **kwargs):
+        raise RuntimeError("sin conexión")
+        yield
+
+    monkeypatch.setattr(chat_service, "achatgpt_query_stream", stream)
+
+    events = _collect(chat_service.simple_chat_stream("¿Llueve?"))
+
+    assert [name for name, _ in events] == ["error"]
+    assert events[0][1]["status"] == "error"
@@ -0,0 +1,45 @@
+import asyncio
+
+import numpy as np
+
+from entitys.models import Location, Time
+from src.chat import chat_service
+from src.prediction import prediction_service
+from src.weather_frame import WeatherFrame
+from src.weather_handles import store_weather_data
+
+
+def _day_frame():
+    times = np.datetime64("2024-04-10T00:00", "ns") + np.arange(8) * np.timedelta64(3, "h")
+    return WeatherFrame.from_columns({
+        "temperatura": (times, 280 + np.arange(8, dtype=np.float32)),
+        "humedad": (times, np.linspace(0.004, 0.011, 8, dtype=np.float32)),
+    })
+
+
+def test_handle_and_download_give_the_same_chat_data(monkeypatch):
+    frame = _day_frame()
+    location = Location(lat=19.4, lon=-99.1)
+    time = Time(day=10, month=4, start_time="13:00", end_time="16:00")
+    downloads = []
+    sent = []
+
+    async def download(lat, lon, start_date, end_date, max_files=2):
+        downloads.append((start_date, end_date, max_files))
+        return frame
+
+    async def feedback(data, start_time, end_time, prompt):
+        sent.append(data)
+        return "ok"
+
+    monkeypatch.setattr(prediction_service, "get_climatology_data", lambda *args: None)
+    monkeypatch.setattr(prediction_service, "get_weather_data_async", download)
+    monkeypatch.setattr(chat_service, "feedback", feedback)
+
+    asyncio.run(chat_service.clima_feedback("picnic", time, location))
+    handle = store_weather_data(frame, location, time)
+    asyncio.run(chat_service.clima_feedback("picnic", time, location, handle))
+
+    # La descarga pide el día completo, igual que /predict/weather
+    assert downloads == [("2024-04-10T00:00:00", "2024-04-10T23:59:59", None)]
+    assert sent[0] == sent[1]
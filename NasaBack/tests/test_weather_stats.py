@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.weather_frame import WeatherFrame
+from src.weather_stats import PERCENTILES, weather_stats
+
+
+def _frame(columns, steps=16):
+    times = np.datetime64("2024-04-10T00:00", "ns") + np.arange(steps) * np.timedelta64(3, "h")
+    return WeatherFrame.from_columns({name: (times, np.asarray(values, dtype=np.float32)) for name, values in columns.items()})
+
+
+def test_stats_match_numpy_reference():
+    rng = np.random.default_rng(7)
+    temperature = rng.uniform(270, 310, 16).astype(np.float32)
+    rain = rng.uniform(0, 1e-4, 16).astype(np.float32)
+    rain[[2, 5, 11]] = np.nan
+    frame = _frame({"temperatura": temperature, "precipitacion": rain})
+
+    stats = weather_stats(frame)
+
+    for name, column in (("temperatura", temperature), ("precipitacion", rain)):
+        valid = column[~np.isnan(column)].astype(np.float64)
+        entry = stats[name]
+        assert entry["count"] == valid.size
+        assert entry["min"] == pytest.approx(valid.min())
+        assert entry["max"] == pytest.approx(valid.max())
+        assert entry["mean"] == pytest.approx(valid.mean(), rel=1e-6)
+        assert entry["std"] == pytest.approx(valid.std(), rel=1e-5)
+        for p in PERCENTILES:
+            assert entry[f"p{p}"] == pytest.approx(np.percentile(valid, p), rel=1e-6)
+
+        times = pd.DatetimeIndex(frame.times)
+        assert entry["time_min"] == times[np.nanargmin(column)].isoformat()
+        assert entry["time_max"] == times[np.nanargmax(column)].isoformat()
+
+
+def test_all_nan_columns_are_omitted():
+    frame = _frame({"temperatura": np.full(16, 290.0), "humedad": np.full(16, np.nan)})
+
+    stats = weather_stats(frame)
+
+    assert set(stats) == {"temperatura"}
+    assert stats["temperatura"]["std"] == 0.0
+
+
+def test_empty_frame_has_no_stats():
+    assert weather_stats(WeatherFrame.empty()) == {}
@@ -24,6 +24,8 @@ const PlanScreen = () => {
 
   const [messageList, setMessage] = useState<Array<MessageItemType>>([])
   const [message, setMessageText] = useState('');
+  // Sesión del servidor: guarda el contexto y el historial de la conversación
+  const [sessionId, setSessionId] = useState<string | undefined>(undefined);
 
   useEffect(() => {
     let botMessage: MessageItemType = { id: messageList.length, author: 'Ramon', content: "Hi, welcome ✌️! Ask me anything - I'll use your current location and time to give you better answers! 😺" }
@@ -45,6 +47,8 @@ const PlanScreen = () => {
     let list = [...messageList];
     list.push(botMessage);
     setMessage(list)
+    // Contexto nuevo: la siguiente pregunta abre otra sesión con él
+    setSessionId(undefined);
   }, [eventData.location, eventData.weatherData])
 
   // Función simplificada para enviar mensaje a ChatGPT con contexto
@@ -65,14 +69,24 @@ const PlanScreen = () => {
 
       const currentTime = new Date().toISOString();
 
-      // Enviar prompt a ChatGPT con contexto completo (incluyendo datos meteorológicos)
-      const chatRequest: SimpleChatRequest = {
+      // Primer mensaje: contexto completo (incluyendo datos meteorológicos).
+      // Los siguientes solo envían la pregunta y el session_id.
+      const contextRequest: SimpleChatRequest = {
         prompt: userMessage,
         location: locationContext,
         current_time: currentTime,
         weather_data: eventData.weatherData // Incluir datos meteorológicos del contexto
       };
-      const response = await sendMessage(chatRequest);
+      let response = await sendMessage(sessionId ? { prompt: userMessage, session_id: sessionId } : contextRequest);
+
+      // La sesión expiró en el servidor (o vive en otro worker): reenviar una vez con el contexto
+      if (response?.session_expired && sessionId) {
+        response = await sendMessage(contextRequest);
+      }
+
+      if (response?.session_id) {
+        setSessionId(response.session_id);
+      }
 
       // Procesar respuesta del backend
       let responseText = "I received your message! 🌤️";
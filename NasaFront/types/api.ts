@@ -38,11 +38,14 @@ export interface SimpleChatRequest {
     };
     current_time?: string;
     weather_data?: any; // Datos meteorológicos completos de la predicción
+    session_id?: string; // Sesión de la respuesta anterior: el contexto ya está en el servidor
 }
 
 export interface ChatResponse {
     response: string;
     status: string;
+    session_id?: string | null; // null si la sesión todavía no existe (p. ej. error en el primer mensaje)
+    session_expired?: boolean; // El session_id enviado ya no existe: reenviar el contexto
 }
 
 export interface WeatherPredictionRequest {